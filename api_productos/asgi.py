@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_productos.settings')
 
+# Bajo ASGI las lecturas se atienden con las vistas async (productos.views_async)
+os.environ.setdefault('PRODUCTOS_VISTAS_ASYNC', 'True')
+
 application = get_asgi_application()
@@ -0,0 +1,10 @@
+"""
+Backend MySQL con pool de conexiones.
+
+Se activa con ENGINE = 'api_productos.db_pool' y las opciones del pool en
+OPTIONS['pool'] (ver pool.Pool). El backend (base.py) solo se importa al
+conectarse, por lo que este paquete no requiere el driver de MySQL.
+"""
+from .pool import Pool, PoolAgotado, estadisticas
+
+__all__ = ['Pool', 'PoolAgotado', 'estadisticas']
@@ -0,0 +1,77 @@
+"""
+DatabaseWrapper de MySQL que toma las conexiones de un pool.
+
+Con CONN_MAX_AGE = 0 Django cierra la conexión de cada hilo al terminar la
+petición; aquí "cerrar" la devuelve al pool, así que la siguiente petición
+no paga la conexión TCP, la autenticación ni init_command. La preparación
+de la sesión (init_connection_state) se hace solo la primera vez que se usa
+cada conexión física.
+"""
+from django.db import OperationalError
+from django.db.backends.mysql import base
+
+from .pool import Pool, PoolAgotado, obtener_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    _prestada = None
+    _pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def crear_pool(self, conn_params):
+        """Pool para los parámetros de conexión actuales"""
+        def conectar():
+            return base.DatabaseWrapper.get_new_connection(self, conn_params)
+
+        def reiniciar(conexion):
+            conexion.rollback()
+
+        def comprobar(conexion):
+            conexion.ping()
+
+        def cerrar(conexion):
+            conexion.close()
+
+        return Pool(
+            conectar, cerrar, comprobar, reiniciar,
+            **self.settings_dict['OPTIONS'].get('pool', {})
+        )
+
+    def get_new_connection(self, conn_params):
+        clave = tuple(
+            self.settings_dict[dato] for dato in ('NAME', 'HOST', 'PORT', 'USER')
+        )
+        self._pool = obtener_pool(self.alias, clave, lambda: self.crear_pool(conn_params))
+        try:
+            self._prestada = self._pool.obtener()
+        except PoolAgotado as error:
+            raise OperationalError(str(error)) from error
+        return self._prestada.conexion
+
+    def init_connection_state(self):
+        if self._prestada.inicializada:
+            return
+        super().init_connection_state()
+        self._prestada.inicializada = True
+
+    def _set_autocommit(self, autocommit):
+        # Las conexiones devueltas conservan el modo; evita una ida y vuelta
+        if self.connection.get_autocommit() != autocommit:
+            super()._set_autocommit(autocommit)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        prestada, self._prestada = self._prestada, None
+        # Cerrada dentro de un atomic, Django conserva la conexión hasta salir
+        # del bloque para hacer rollback: no puede pasar a otro hilo
+        self._pool.devolver(
+            prestada,
+            descartar=self.errors_occurred or self.in_atomic_block,
+            reiniciar=not self.autocommit,
+        )
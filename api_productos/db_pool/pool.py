@@ -0,0 +1,315 @@
+"""
+Pool de conexiones físicas a la base de datos, independiente del motor.
+
+Cada hilo de Django toma una conexión del pool al conectarse y la devuelve
+al cerrar (al terminar la petición con CONN_MAX_AGE = 0), en lugar de abrir
+y cerrar una conexión por petición.
+
+- minimo: conexiones que se abren al crear el pool y que se conservan
+  aunque estén inactivas
+- maximo: conexiones abiertas a la vez (prestadas + libres); al alcanzarlo
+  las peticiones esperan a que se devuelva una
+- espera: segundos máximos de espera por una conexión (PoolAgotado)
+- vida_maxima: segundos tras los que una conexión se cierra al devolverla
+  o al encontrarla libre (debe ser menor que wait_timeout del servidor)
+- inactividad_maxima: segundos libre tras los que se cierra una conexión
+  por encima de minimo
+- verificar: comprobar cada conexión libre (ping) antes de prestarla; las
+  que fallan se reemplazan por una nueva
+"""
+import threading
+import time
+
+
+class PoolAgotado(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera"""
+
+
+class ConexionAgrupada:
+    """Conexión física del pool y sus tiempos"""
+
+    __slots__ = ('conexion', 'creada', 'devuelta', 'inicializada')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = self.devuelta = time.monotonic()
+        # El backend la marca tras preparar la sesión la primera vez
+        self.inicializada = False
+
+
+class Pool:
+    """
+    Pool de conexiones seguro entre hilos.
+
+    Args:
+        conectar: Función sin argumentos que abre una conexión física
+        cerrar: Función que cierra una conexión física
+        comprobar: Función que lanza una excepción si la conexión no sirve
+        reiniciar: Función que deja la sesión lista para otro uso (rollback)
+        minimo, maximo, espera, vida_maxima, inactividad_maxima, verificar:
+            Ver la documentación del módulo
+    """
+
+    def __init__(self, conectar, cerrar, comprobar, reiniciar, minimo=0, maximo=10,
+                 espera=10.0, vida_maxima=1800.0, inactividad_maxima=300.0, verificar=True):
+        if maximo < 1 or minimo < 0 or minimo > maximo:
+            raise ValueError('Se requiere 0 <= minimo <= maximo y maximo >= 1')
+        self._conectar = conectar
+        self._cerrar = cerrar
+        self._comprobar = comprobar
+        self._reiniciar = reiniciar
+        self.minimo = minimo
+        self.maximo = maximo
+        self.espera = espera
+        self.vida_maxima = vida_maxima
+        self.inactividad_maxima = inactividad_maxima
+        self.verificar = verificar
+
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._abiertas = 0
+        self._en_uso = 0
+        self._esperando = 0
+
+        self.prestamos = 0
+        self.creadas = 0
+        self.cerradas = 0
+        self.esperas = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_espera_maximo = 0.0
+        self.agotados = 0
+        self.verificaciones_fallidas = 0
+
+    def llenar(self):
+        """Abre las conexiones que faltan para llegar a minimo"""
+        while True:
+            with self._condicion:
+                if self._abiertas >= self.minimo:
+                    return
+                self._abiertas += 1
+            try:
+                conexion = self._crear()
+            except Exception:
+                with self._condicion:
+                    self._abiertas -= 1
+                raise
+            with self._condicion:
+                self._libres.append(conexion)
+                self._condicion.notify()
+
+    def obtener(self):
+        """
+        Presta una conexión: la libre usada más recientemente, una nueva si
+        hay lugar, o la primera que se devuelva dentro de espera.
+
+        Returns:
+            ConexionAgrupada: Conexión prestada (devolverla con devolver())
+
+        Raises:
+            PoolAgotado: Si no hubo una conexión disponible a tiempo
+        """
+        inicio = time.monotonic()
+        limite = inicio + self.espera
+        vencidas = []
+        conexion = None
+        espero = False
+        try:
+            with self._condicion:
+                while True:
+                    ahora = time.monotonic()
+                    while self._libres:
+                        candidata = self._libres.pop()
+                        if self._vencida(candidata, ahora):
+                            vencidas.append(candidata)
+                            self._abiertas -= 1
+                            continue
+                        conexion = candidata
+                        break
+                    if conexion is not None or self._abiertas < self.maximo:
+                        if conexion is None:
+                            self._abiertas += 1
+                        self._en_uso += 1
+                        break
+
+                    restante = limite - ahora
+                    if restante <= 0:
+                        self.agotados += 1
+                        self._registrar_espera(inicio)
+                        raise PoolAgotado(
+                            f'Sin conexiones libres tras {self.espera:g} s '
+                            f'({self.maximo} en uso)'
+                        )
+                    espero = True
+                    self._esperando += 1
+                    try:
+                        self._condicion.wait(restante)
+                    finally:
+                        self._esperando -= 1
+
+                self.prestamos += 1
+                if espero:
+                    self._registrar_espera(inicio)
+        finally:
+            for vencida in vencidas:
+                self._cerrar_fisica(vencida)
+
+        try:
+            return self._preparar(conexion)
+        except Exception:
+            with self._condicion:
+                self._abiertas -= 1
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+    def devolver(self, conexion, descartar=False, reiniciar=True):
+        """
+        Devuelve una conexión prestada.
+
+        Args:
+            conexion (ConexionAgrupada): Conexión obtenida con obtener()
+            descartar (bool): Cerrarla en lugar de volver a prestarla
+                (por ejemplo, tras un error de la base de datos)
+            reiniciar (bool): Deshacer una posible transacción abierta
+        """
+        if not descartar and reiniciar:
+            try:
+                self._reiniciar(conexion.conexion)
+            except Exception:
+                descartar = True
+
+        ahora = time.monotonic()
+        with self._condicion:
+            self._en_uso -= 1
+            descartar = descartar or ahora - conexion.creada >= self.vida_maxima
+            if descartar:
+                self._abiertas -= 1
+            else:
+                conexion.devuelta = ahora
+                self._libres.append(conexion)
+            self._condicion.notify()
+
+        if descartar:
+            self._cerrar_fisica(conexion)
+
+    def cerrar(self):
+        """Cierra las conexiones libres (las prestadas se cierran al devolverse)"""
+        with self._condicion:
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+            self.vida_maxima = 0
+        for conexion in libres:
+            self._cerrar_fisica(conexion)
+
+    def estadisticas(self):
+        """
+        Estado y contadores del pool.
+
+        Returns:
+            dict: Conexiones en uso, libres y abiertas, peticiones esperando y
+                tiempos de espera (en milisegundos) desde la creación
+        """
+        with self._condicion:
+            return {
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'abiertas': self._abiertas,
+                'esperando': self._esperando,
+                'prestamos': self.prestamos,
+                'conexiones_creadas': self.creadas,
+                'conexiones_cerradas': self.cerradas,
+                'esperas': self.esperas,
+                'espera_total_ms': round(self.tiempo_espera_total * 1000, 3),
+                'espera_maxima_ms': round(self.tiempo_espera_maximo * 1000, 3),
+                'espera_promedio_ms': round(
+                    self.tiempo_espera_total * 1000 / self.esperas, 3
+                ) if self.esperas else 0.0,
+                'agotados': self.agotados,
+                'verificaciones_fallidas': self.verificaciones_fallidas,
+            }
+
+    def _registrar_espera(self, inicio):
+        """Acumula una espera (se llama con el candado tomado)"""
+        espera = time.monotonic() - inicio
+        self.esperas += 1
+        self.tiempo_espera_total += espera
+        self.tiempo_espera_maximo = max(self.tiempo_espera_maximo, espera)
+
+    def _vencida(self, conexion, ahora):
+        """Superó vida_maxima, o inactividad_maxima estando por encima de minimo"""
+        if ahora - conexion.creada >= self.vida_maxima:
+            return True
+        return (ahora - conexion.devuelta >= self.inactividad_maxima
+                and self._abiertas > self.minimo)
+
+    def _crear(self):
+        conexion = ConexionAgrupada(self._conectar())
+        with self._condicion:
+            self.creadas += 1
+        return conexion
+
+    def _preparar(self, conexion):
+        """Conexión lista para prestar: nueva, o libre verificada"""
+        if conexion is None:
+            return self._crear()
+        if self.verificar:
+            try:
+                self._comprobar(conexion.conexion)
+            except Exception:
+                with self._condicion:
+                    self.verificaciones_fallidas += 1
+                self._cerrar_fisica(conexion)
+                return self._crear()
+        return conexion
+
+    def _cerrar_fisica(self, conexion):
+        with self._condicion:
+            self.cerradas += 1
+        try:
+            self._cerrar(conexion.conexion)
+        except Exception:
+            pass
+
+
+# Pools del proceso por alias de base de datos
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(alias, clave, crear):
+    """
+    Pool del alias, creándolo (y llenándolo hasta minimo) la primera vez.
+
+    Args:
+        alias (str): Alias de la base de datos
+        clave (tuple): Datos de conexión; si cambian (por ejemplo, al crear
+            la base de pruebas) se crea un pool nuevo y se cierra el anterior
+        crear: Función sin argumentos que construye el Pool
+
+    Returns:
+        Pool: Pool del alias
+    """
+    with _pools_lock:
+        anterior = _pools.get(alias)
+        if anterior is not None and anterior[0] == clave:
+            return anterior[1]
+        pool = crear()
+        _pools[alias] = (clave, pool)
+    if anterior is not None:
+        anterior[1].cerrar()
+    pool.llenar()
+    return pool
+
+
+def estadisticas():
+    """
+    Estadísticas de los pools del proceso.
+
+    Returns:
+        dict: Alias -> estadísticas del pool (vacío si no hay pools)
+    """
+    with _pools_lock:
+        pools = {alias: pool for alias, (_, pool) in _pools.items()}
+    return {alias: pool.estadisticas() for alias, pool in pools.items()}
@@ -0,0 +1,202 @@
+"""
+Lecturas en réplicas con consistencia de las propias escrituras.
+
+Las peticiones seguras (GET, HEAD, OPTIONS) de ProductoViewSet, y las
+acciones POST que solo leen (como lote), leen de una réplica de
+PRODUCTOS_REPLICAS, elegida al azar una vez por petición para que el conteo
+y la página salgan de la misma copia. Todo lo demás (escrituras, peticiones
+que escriben, comandos y señales) usa la base primaria.
+
+Después de una escritura, la respuesta fija al cliente a la primaria con la
+cookie COOKIE durante PRODUCTOS_REPLICAS_VENTANA segundos, para que vea sus
+propios cambios aunque las réplicas vayan con retraso.
+
+Si una réplica no acepta conexiones se marca como caída durante
+PRODUCTOS_REPLICAS_REINTENTO segundos y las lecturas pasan a otra réplica o,
+si no queda ninguna, a la primaria.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+COOKIE = 'productos_primaria'
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+# Réplica de la petición en curso (None: leer de la primaria)
+_lectura = contextvars.ContextVar('productos_lectura_replica', default=None)
+
+
+def obtener_replicas():
+    """Alias de las réplicas de lectura (PRODUCTOS_REPLICAS)"""
+    return list(getattr(settings, 'PRODUCTOS_REPLICAS', []))
+
+
+def obtener_ventana():
+    """Segundos que un cliente lee de la primaria tras escribir"""
+    return getattr(settings, 'PRODUCTOS_REPLICAS_VENTANA', 5)
+
+
+def obtener_reintento():
+    """Segundos que una réplica caída queda fuera de uso"""
+    return getattr(settings, 'PRODUCTOS_REPLICAS_REINTENTO', 30)
+
+
+class Disponibilidad:
+    """Réplicas marcadas como caídas en este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caidas = {}
+
+    def disponible(self, alias):
+        with self._lock:
+            return self._caidas.get(alias, 0) <= time.monotonic()
+
+    def marcar_caida(self, alias):
+        with self._lock:
+            self._caidas[alias] = time.monotonic() + obtener_reintento()
+
+    def reiniciar(self):
+        with self._lock:
+            self._caidas.clear()
+
+
+disponibilidad = Disponibilidad()
+
+
+def elegir_replica():
+    """
+    Elige una réplica disponible que acepte conexiones.
+
+    Returns:
+        str: Alias de la réplica, o el de la primaria si no hay ninguna
+    """
+    candidatas = [alias for alias in obtener_replicas() if disponibilidad.disponible(alias)]
+    random.shuffle(candidatas)
+    for alias in candidatas:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            disponibilidad.marcar_caida(alias)
+            continue
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+class Lectura:
+    """Base de datos de las lecturas de una petición (se elige al primer uso)"""
+
+    __slots__ = ('alias',)
+
+    def __init__(self):
+        self.alias = None
+
+    def resolver(self):
+        if self.alias is None:
+            self.alias = elegir_replica()
+        return self.alias
+
+
+def fijada_a_primaria(request):
+    """Indica si el cliente escribió dentro de la ventana (cookie COOKIE)"""
+    try:
+        return float(request.COOKIES.get(COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def lectura_en_replica():
+    """Indica si las lecturas de la petición en curso salieron de una réplica"""
+    lectura = _lectura.get()
+    return lectura is not None and lectura.alias not in (None, DEFAULT_DB_ALIAS)
+
+
+def es_segura(request):
+    """Indica si la petición solo lee según su método"""
+    return request.method in METODOS_SEGUROS
+
+
+@contextmanager
+def lecturas(request, segura=None):
+    """
+    Envía a una réplica las lecturas hechas dentro del bloque si la
+    petición es segura y el cliente no está fijado a la primaria.
+
+    Args:
+        request: Petición HTTP
+        segura (bool): Si la petición solo lee; por defecto según el método
+
+    Yields:
+        Lectura: Réplica de la petición, o None si se lee de la primaria
+    """
+    if segura is None:
+        segura = es_segura(request)
+    if not segura or not obtener_replicas() or fijada_a_primaria(request):
+        yield None
+        return
+
+    lectura = Lectura()
+    token = _lectura.set(lectura)
+    try:
+        yield lectura
+    finally:
+        _lectura.reset(token)
+
+
+@asynccontextmanager
+async def alecturas(request):
+    """
+    Versión async de lecturas.
+
+    La réplica se elige (y su conexión se comprueba) al entrar, en un hilo,
+    ya que el ORM async resuelve la base de datos fuera del event loop pero
+    otros usos del router no.
+    """
+    with lecturas(request) as lectura:
+        if lectura is not None:
+            await sync_to_async(lectura.resolver)()
+        yield lectura
+
+
+def fijar_primaria(response):
+    """
+    Fija al cliente a la primaria durante la ventana de lectura de sus
+    propias escrituras.
+
+    Args:
+        response: Respuesta de una petición que escribe
+    """
+    ventana = obtener_ventana()
+    if ventana > 0 and obtener_replicas():
+        response.set_cookie(
+            COOKIE, f'{time.time() + ventana:.3f}',
+            max_age=ventana, httponly=True, samesite='Lax'
+        )
+
+
+class RouterReplicas:
+    """
+    Router de bases de datos: lecturas de la petición en curso a su réplica,
+    escrituras a la primaria.
+    """
+
+    def db_for_read(self, model, **hints):
+        lectura = _lectura.get()
+        if lectura is None:
+            return None
+        return lectura.resolver()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas contienen los mismos datos que la primaria
+        return True
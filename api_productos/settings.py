@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también al resto de los middleware
+    'productos.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,9 +82,13 @@ WSGI_APPLICATION = 'api_productos.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Pool de conexiones (api_productos.db_pool): cada petición toma una conexión
+# abierta en lugar de conectarse y ejecutar init_command de nuevo
+DB_POOL = os.getenv('DB_POOL', 'True').lower() == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'api_productos.db_pool' if DB_POOL else 'django.db.backends.mysql',
         'NAME': os.getenv('DB_NAME', 'db_productos'),
         'USER': os.getenv('DB_USER', 'root'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'mysqljavier'),
@@ -95,6 +101,49 @@ DATABASES = {
     }
 }
 
+if DB_POOL:
+    # vida_maxima debe ser menor que wait_timeout de MySQL (28800 s por defecto)
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'minimo': int(os.getenv('DB_POOL_MINIMO', '2')),
+        'maximo': int(os.getenv('DB_POOL_MAXIMO', '20')),
+        'espera': float(os.getenv('DB_POOL_ESPERA', '10')),
+        'vida_maxima': float(os.getenv('DB_POOL_VIDA_MAXIMA', '1800')),
+        'inactividad_maxima': float(os.getenv('DB_POOL_INACTIVIDAD_MAXIMA', '300')),
+        'verificar': os.getenv('DB_POOL_VERIFICAR', 'True').lower() == 'true',
+    }
+
+# Réplicas de lectura: DB_REPLICAS=host1,host2:3307 agrega los alias
+# replica_1, replica_2, ... con las credenciales de default
+for indice, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    host, _, puerto = replica.strip().partition(':')
+    DATABASES[f'replica_{indice}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': puerto or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Las lecturas de la API van a las réplicas; las escrituras, a default
+DATABASE_ROUTERS = ['api_productos.replicas.RouterReplicas']
+PRODUCTOS_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+# Segundos que un cliente lee de default después de escribir
+PRODUCTOS_REPLICAS_VENTANA = int(os.getenv('PRODUCTOS_REPLICAS_VENTANA', '5'))
+# Segundos que una réplica que no responde queda fuera de uso
+PRODUCTOS_REPLICAS_REINTENTO = int(os.getenv('PRODUCTOS_REPLICAS_REINTENTO', '30'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios procesos de aplicación usar un backend compartido (Redis o Memcached)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'api-productos'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,7 +196,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'productos.renderers.ProductoJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -162,3 +211,65 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Configuración de la app productos
+# Estrategia de conteo para la paginación: exacto, cache o estimado
+PRODUCTOS_CONTEO = os.getenv('PRODUCTOS_CONTEO', 'exacto')
+PRODUCTOS_CONTEO_CACHE_TIMEOUT = int(os.getenv('PRODUCTOS_CONTEO_CACHE_TIMEOUT', '300'))
+
+# Modo por defecto de los filtros categoria/marca: exacto, prefijo o contiene
+PRODUCTOS_COINCIDENCIA = os.getenv('PRODUCTOS_COINCIDENCIA', 'prefijo')
+
+# Backend de búsqueda: índice en base de datos o en memoria del proceso
+PRODUCTOS_BUSQUEDA_BACKEND = os.getenv(
+    'PRODUCTOS_BUSQUEDA_BACKEND', 'productos.busqueda.BackendBaseDatos'
+)
+
+# Cargas masivas: filas por sentencia INSERT/UPDATE y máximo de elementos por petición
+PRODUCTOS_TAMANO_LOTE = int(os.getenv('PRODUCTOS_TAMANO_LOTE', '500'))
+PRODUCTOS_MAX_ELEMENTOS_LOTE = int(os.getenv('PRODUCTOS_MAX_ELEMENTOS_LOTE', '10000'))
+
+# Máximo de productos por página que acepta el parámetro por_pagina
+PRODUCTOS_MAX_POR_PAGINA = int(os.getenv('PRODUCTOS_MAX_POR_PAGINA', '100'))
+
+# Exportación en streaming: filas leídas por consulta
+PRODUCTOS_EXPORTACION_LOTE = int(os.getenv('PRODUCTOS_EXPORTACION_LOTE', '2000'))
+
+# Respuestas JSON compactas (sin espacios entre separadores)
+PRODUCTOS_JSON_COMPACTO = os.getenv('PRODUCTOS_JSON_COMPACTO', 'True').lower() == 'true'
+
+# Cache de respuestas de listados: LRU por proceso (entradas) delante de CACHES
+PRODUCTOS_CACHE_RESPUESTAS = os.getenv('PRODUCTOS_CACHE_RESPUESTAS', 'True').lower() == 'true'
+PRODUCTOS_CACHE_RESPUESTAS_TIMEOUT = int(os.getenv('PRODUCTOS_CACHE_RESPUESTAS_TIMEOUT', '60'))
+PRODUCTOS_CACHE_RESPUESTAS_LRU = int(os.getenv('PRODUCTOS_CACHE_RESPUESTAS_LRU', '1000'))
+
+# Registro de filtros categoria/marca de la invalidación: posiciones por
+# dimensión y segundos de vida (nunca menos que PRODUCTOS_CACHE_RESPUESTAS_TIMEOUT)
+PRODUCTOS_CACHE_RESPUESTAS_FILTROS = int(os.getenv('PRODUCTOS_CACHE_RESPUESTAS_FILTROS', '256'))
+PRODUCTOS_CACHE_RESPUESTAS_REGISTRO_TIMEOUT = int(
+    os.getenv('PRODUCTOS_CACHE_RESPUESTAS_REGISTRO_TIMEOUT', '3600')
+)
+
+# Límites inferiores de los rangos de precio de las facetas (tras cambiarlos,
+# ejecutar recalcular_facetas)
+PRODUCTOS_FACETAS_RANGOS_PRECIO = os.getenv(
+    'PRODUCTOS_FACETAS_RANGOS_PRECIO', '0,50,100,250,500,1000'
+).split(',')
+
+# Cache de objetos Producto por id (detalle y reducir_stock)
+PRODUCTOS_CACHE_OBJETOS = os.getenv('PRODUCTOS_CACHE_OBJETOS', 'True').lower() == 'true'
+PRODUCTOS_CACHE_OBJETOS_TIMEOUT = int(os.getenv('PRODUCTOS_CACHE_OBJETOS_TIMEOUT', '300'))
+
+# Lecturas (listado, detalle, búsqueda y filtros) con vistas async; asgi.py
+# lo activa por defecto
+PRODUCTOS_VISTAS_ASYNC = os.getenv('PRODUCTOS_VISTAS_ASYNC', 'False').lower() == 'true'
+
+# Métricas por endpoint (GET /metrics) y cabecera Server-Timing en las respuestas
+PRODUCTOS_METRICAS = os.getenv('PRODUCTOS_METRICAS', 'True').lower() == 'true'
+PRODUCTOS_SERVER_TIMING = os.getenv('PRODUCTOS_SERVER_TIMING', 'True').lower() == 'true'
+
+# Admin para tablas grandes: filtros desde el resumen de facetas, totales
+# estimados, búsqueda con el índice y páginas siguientes con keyset
+PRODUCTOS_ADMIN_TABLA_GRANDE = os.getenv('PRODUCTOS_ADMIN_TABLA_GRANDE', 'False').lower() == 'true'
+PRODUCTOS_ADMIN_OPCIONES_FILTRO = int(os.getenv('PRODUCTOS_ADMIN_OPCIONES_FILTRO', '50'))
+PRODUCTOS_ADMIN_LIMITE_BUSQUEDA = int(os.getenv('PRODUCTOS_ADMIN_LIMITE_BUSQUEDA', '1000'))
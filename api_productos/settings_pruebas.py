@@ -0,0 +1,26 @@
+"""
+Configuración para ejecutar las pruebas sin MySQL.
+
+Usa dos bases SQLite: default (primaria) y replica, una base independiente
+con la que las pruebas de réplicas comprueban el enrutamiento de lecturas.
+Las réplicas están desactivadas salvo en esas pruebas.
+
+Uso:
+    python manage.py test --settings=api_productos.settings_pruebas
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'pruebas.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'pruebas_replica.sqlite3',
+    },
+}
+
+PRODUCTOS_REPLICAS = []
@@ -1,6 +1,143 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Producto
+from . import cache_objetos
+from .busqueda import obtener_backend
+from .conteo import CACHE, ESTIMADO, contar
+from .facetas import CATEGORIA, MARCA
+from .filtros import EXACTO, filtrar_texto
+from .lotes import crear_en_lotes
+from .models import Producto, ResumenFaceta
+from .signals import productos_modificados
+
+
+def tabla_grande():
+    """Indica si el admin usa el modo para tablas grandes (PRODUCTOS_ADMIN_TABLA_GRANDE)"""
+    return getattr(settings, 'PRODUCTOS_ADMIN_TABLA_GRANDE', False)
+
+
+class FiltroResumen(admin.SimpleListFilter):
+    """
+    Filtro lateral cuyas opciones se leen del resumen de facetas
+    (ResumenFaceta) en lugar de un SELECT DISTINCT sobre los productos.
+    
+    Muestra los PRODUCTOS_ADMIN_OPCIONES_FILTRO valores con más productos y
+    filtra por la columna normalizada, indexada junto con fecha_creacion.
+    """
+    
+    def lookups(self, request, model_admin):
+        limite = getattr(settings, 'PRODUCTOS_ADMIN_OPCIONES_FILTRO', 50)
+        filas = ResumenFaceta.objects.filter(
+            dimension=self.parameter_name, total__gt=0
+        ).order_by('-total', 'valor')[:limite]
+        return [(fila.valor, f'{fila.valor} ({fila.total})') for fila in filas]
+    
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return filtrar_texto(queryset, self.parameter_name, self.value(), EXACTO)
+
+
+class FiltroCategoria(FiltroResumen):
+    title = 'categoría'
+    parameter_name = CATEGORIA
+
+
+class FiltroMarca(FiltroResumen):
+    title = 'marca'
+    parameter_name = MARCA
+
+
+def _orden_keyset(queryset):
+    """
+    Orden del queryset si admite keyset: una columna no nula de Producto
+    seguida de la clave primaria (en cualquier sentido); None si no.
+    """
+    # El listado del admin puede repetir el campo del orden por defecto
+    orden = list(dict.fromkeys(queryset.query.order_by))
+    if (len(orden) != 2 or not all(isinstance(campo, str) for campo in orden)
+            or orden[1].lstrip('-') not in ('pk', 'id')):
+        return None
+    try:
+        campo = Producto._meta.get_field(orden[0].lstrip('-'))
+    except FieldDoesNotExist:
+        return None
+    if not campo.concrete or campo.null:
+        return None
+    return orden
+
+
+def _desde_ancla(queryset, orden, ancla):
+    """Filas posteriores a la fila ancla (valor del campo, id) en el orden dado"""
+    valor, pk = ancla
+    campo, desempate = orden
+    nombre = campo.lstrip('-')
+    comparador = 'lt' if campo.startswith('-') else 'gt'
+    comparador_pk = 'lt' if desempate.startswith('-') else 'gt'
+    return queryset.filter(
+        Q(**{f'{nombre}__{comparador}': valor}) |
+        Q(**{nombre: valor, f'pk__{comparador_pk}': pk})
+    )
+
+
+class PaginadorTablaGrande(Paginator):
+    """
+    Paginador del admin para tablas grandes.
+    
+    El total se estima sin filtros (estadísticas de la tabla) y con filtros
+    se guarda en cache por combinación de filtros (ver conteo.contar).
+    
+    Al servir una página se guarda en cache su última fila (ancla): la
+    página siguiente con los mismos filtros y orden continúa desde ella con
+    un WHERE (keyset), sin OFFSET. Sin ancla (por ejemplo al saltar a otra
+    página) se usa OFFSET.
+    """
+    
+    @cached_property
+    def count(self):
+        # Un queryset vacío (none()) no tiene SQL con el que formar la clave
+        if self.object_list.query.is_empty():
+            return 0
+        estrategia = CACHE if self.object_list.query.where else ESTIMADO
+        return contar(self.object_list, estrategia)[0]
+    
+    def _clave_ancla(self, numero):
+        consulta = str(self.object_list.query).encode('utf-8')
+        return f'productos:admin:ancla:{numero}:{hashlib.sha1(consulta).hexdigest()}'
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        orden = _orden_keyset(self.object_list)
+        ancla = None
+        if orden is not None and number > 1:
+            ancla = cache.get(self._clave_ancla(number - 1))
+        
+        if ancla is None:
+            pagina = super().page(number)
+        else:
+            filas = _desde_ancla(self.object_list, orden, ancla)[:self.per_page]
+            pagina = self._get_page(filas, number, self)
+        
+        # La página sigue siendo un QuerySet (list_editable lo necesita);
+        # list() la evalúa y deja las filas en su cache de resultados
+        filas = list(pagina.object_list)
+        if orden is not None and filas:
+            ultima = filas[-1]
+            cache.set(
+                self._clave_ancla(number),
+                (getattr(ultima, orden[0].lstrip('-')), ultima.pk),
+                getattr(settings, 'PRODUCTOS_CONTEO_CACHE_TIMEOUT', 300)
+            )
+        return pagina
 
 
 @admin.register(Producto)
@@ -10,6 +147,12 @@ class ProductoAdmin(admin.ModelAdmin):
     
     Proporciona una interfaz completa para gestionar productos
     con funcionalidades avanzadas de búsqueda, filtrado y visualización.
+    
+    Con PRODUCTOS_ADMIN_TABLA_GRANDE el listado evita las consultas que
+    recorren la tabla: las opciones de los filtros de categoría y marca se
+    leen del resumen de facetas, los totales se estiman o se guardan en
+    cache, la búsqueda usa el índice de búsqueda y las páginas siguientes
+    se leen con keyset (ver PaginadorTablaGrande).
     """
     
     # Campos a mostrar en la lista
@@ -85,7 +228,19 @@ class ProductoAdmin(admin.ModelAdmin):
     
     def marcar_sin_stock(self, request, queryset):
         """Acción para marcar productos como sin stock"""
-        updated = queryset.update(cantidad=0)
+        ahora = timezone.now()
+        with transaction.atomic():
+            # Bloquear las filas para que los valores anteriores sean exactos
+            filas = list(queryset.select_for_update().values('pk', *Producto.CAMPOS_RASTREADOS))
+            ids = [fila.pop('pk') for fila in filas]
+            updated = Producto.objects.filter(pk__in=ids).update(
+                cantidad=0, fecha_actualizacion=ahora
+            )
+            productos_modificados.send(
+                sender=Producto, ids=ids, campos=['cantidad'], anteriores=filas,
+                actuales=[dict(fila, cantidad=0) for fila in filas]
+            )
+        cache_objetos.fijar_cantidad(ids, 0, ahora)
         self.message_user(
             request,
             f'{updated} producto(s) marcado(s) como sin stock.'
@@ -93,19 +248,21 @@ class ProductoAdmin(admin.ModelAdmin):
     marcar_sin_stock.short_description = "Marcar como sin stock"
     
     def duplicar_productos(self, request, queryset):
-        """Acción para duplicar productos seleccionados"""
-        duplicados = 0
-        for producto in queryset:
-            # Crear copia del producto
-            nuevo_producto = Producto(
-                nombre=f"{producto.nombre} (Copia)",
-                categoria=producto.categoria,
-                marca=producto.marca,
-                precio=producto.precio,
+        """Acción para duplicar productos seleccionados con INSERT de varias filas"""
+        copias = [
+            Producto(
+                nombre=f"{nombre} (Copia)",
+                categoria=categoria,
+                marca=marca,
+                precio=precio,
                 cantidad=0  # Stock inicial en 0
             )
-            nuevo_producto.save()
-            duplicados += 1
+            for nombre, categoria, marca, precio in queryset.values_list(
+                'nombre', 'categoria', 'marca', 'precio'
+            )
+        ]
+        crear_en_lotes(copias)
+        duplicados = len(copias)
         
         self.message_user(
             request,
@@ -113,6 +270,36 @@ class ProductoAdmin(admin.ModelAdmin):
         )
     duplicar_productos.short_description = "Duplicar productos seleccionados"
     
+    @property
+    def show_full_result_count(self):
+        """Sin el COUNT(*) de la tabla completa en el modo para tablas grandes"""
+        return not tabla_grande()
+    
+    def get_list_filter(self, request):
+        """Filtros de categoría y marca desde el resumen en tablas grandes"""
+        if tabla_grande():
+            return [FiltroCategoria, FiltroMarca, 'fecha_creacion', 'fecha_actualizacion']
+        return super().get_list_filter(request)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        En tablas grandes busca con el índice de búsqueda de la API (los
+        PRODUCTOS_ADMIN_LIMITE_BUSQUEDA más relevantes) en lugar de icontains.
+        """
+        if not tabla_grande() or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        limite = getattr(settings, 'PRODUCTOS_ADMIN_LIMITE_BUSQUEDA', 1000)
+        ids = obtener_backend().buscar(search_term, limite)
+        if not ids:
+            return queryset.none(), False
+        return queryset.filter(pk__in=ids), False
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        """Paginador con totales estimados y keyset en tablas grandes"""
+        if tabla_grande():
+            return PaginadorTablaGrande(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+    
     def get_queryset(self, request):
         """Optimizar consultas con select_related si fuera necesario"""
         return super().get_queryset(request)
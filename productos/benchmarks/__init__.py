@@ -0,0 +1,45 @@
+"""
+Benchmarks de rendimiento de la app productos.
+
+Cada módulo registrado en BENCHMARKS expone:
+
+- agregar_argumentos(parser): opciones de línea de comandos del benchmark
+- ejecutar(opciones, salida): corre el benchmark y escribe los resultados
+- REQUIERE_BASE_DE_DATOS (opcional, True por defecto): False si el benchmark
+  no consulta la base de datos y no necesita la base de pruebas
+
+Se ejecutan con ``python manage.py benchmark <nombre>``.
+"""
+from contextlib import contextmanager
+
+
+BENCHMARKS = {
+    'stock': 'productos.benchmarks.stock',
+    'renderizado': 'productos.benchmarks.renderizado',
+    'asgi': 'productos.benchmarks.asgi',
+    'carga': 'productos.benchmarks.carga',
+}
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """
+    Crea bases de datos de prueba para el benchmark y las elimina al terminar.
+
+    Los benchmarks escriben muchas filas, por lo que nunca corren sobre la
+    base de datos configurada, sino sobre la de pruebas (prefijo test_).
+    """
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    configuracion = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(configuracion, verbosity=0)
+        teardown_test_environment()
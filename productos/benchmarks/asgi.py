@@ -0,0 +1,206 @@
+"""
+Benchmark de lecturas concurrentes: WSGI síncrono contra ASGI async.
+
+Se mezclan peticiones de listado, detalle, búsqueda y filtro por categoría
+y se comparan:
+
+- wsgi-sync: vistas síncronas atendidas por WSGIHandler desde un pool de
+  hilos (un hilo por petición en curso, como un servidor WSGI con hilos)
+- asgi-sync: las mismas vistas bajo ASGIHandler (Django las ejecuta en
+  hilos de asgiref)
+- asgi-async: vistas de views_async bajo ASGIHandler
+
+Cada consulta SQL espera --latencia milisegundos para simular una base de
+datos remota, que es donde la concurrencia marca la diferencia. Las caches
+de respuestas y de objetos se desactivan para que todas las peticiones
+lleguen a la base de datos.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from productos.lotes import crear_en_lotes
+from productos.models import Producto
+from productos.urls import rutas
+
+
+CATEGORIAS = ('Electrónicos', 'Accesorios', 'Hogar', 'Oficina')
+
+
+def agregar_argumentos(parser):
+    parser.add_argument(
+        '--peticiones', type=int, default=400, help='Peticiones por configuración'
+    )
+    parser.add_argument(
+        '--concurrencia', type=int, default=32,
+        help='Peticiones en curso a la vez (hilos en WSGI)'
+    )
+    parser.add_argument(
+        '--latencia', type=float, default=5.0,
+        help='Milisegundos de espera simulada por consulta SQL'
+    )
+    parser.add_argument(
+        '--productos', type=int, default=2000, help='Productos en la tabla'
+    )
+
+
+def _urls(asincronas):
+    """Configuración de URL con las rutas de la app (síncronas o async)"""
+    return type('Urls', (), {'urlpatterns': rutas(asincronas=asincronas)})
+
+
+def _rutas(productos, peticiones):
+    """Mezcla de lecturas: listado, detalle, búsqueda y filtro por categoría"""
+    ids = list(Producto.objects.values_list('pk', flat=True)[:productos])
+    plantillas = [
+        lambda i: ('/api/productos/', {'page': i % 10 + 1}),
+        lambda i: (f'/api/productos/{ids[i % len(ids)]}/', {}),
+        lambda i: ('/api/productos/buscar/', {'q': f'producto {i % 50}', 'limit': 10}),
+        lambda i: (f'/api/productos/categoria/{CATEGORIAS[i % len(CATEGORIAS)]}/', {}),
+    ]
+    return [plantillas[i % len(plantillas)](i) for i in range(peticiones)]
+
+
+def _percentil(valores, percentil):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * percentil))]
+
+
+def _correr_wsgi(rutas_peticiones, hilos):
+    """Atiende las peticiones con WSGIHandler desde un pool de hilos"""
+    manejador = WSGIHandler()
+
+    def peticion(ruta):
+        camino, parametros = ruta
+        environ = {
+            'PATH_INFO': camino,
+            'QUERY_STRING': urlencode(parametros),
+            'wsgi.input': BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        estados = []
+        inicio = time.perf_counter()
+        respuesta = manejador(environ, lambda estado, cabeceras: estados.append(estado))
+        try:
+            b''.join(respuesta)
+        finally:
+            respuesta.close()
+        return estados[0], time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(peticion, rutas_peticiones))
+
+
+def _correr_asgi(rutas_peticiones, concurrencia):
+    """Atiende las peticiones con ASGIHandler con hasta `concurrencia` en curso"""
+    manejador = ASGIHandler()
+
+    async def peticion(ruta, limite):
+        camino, parametros = ruta
+        alcance = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': camino,
+            'query_string': urlencode(parametros).encode('ascii'),
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        mensajes = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        estados = []
+
+        async def recibir():
+            if mensajes:
+                return mensajes.pop()
+            # Sin desconexión: el manejador cancela esta espera al responder
+            await asyncio.Future()
+
+        async def enviar(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estados.append(mensaje['status'])
+
+        async with limite:
+            inicio = time.perf_counter()
+            await manejador(alcance, recibir, enviar)
+            return estados[0], time.perf_counter() - inicio
+
+    async def todas():
+        limite = asyncio.Semaphore(concurrencia)
+        return await asyncio.gather(*(peticion(ruta, limite) for ruta in rutas_peticiones))
+
+    return asyncio.run(todas())
+
+
+def ejecutar(opciones, salida):
+    peticiones = opciones['peticiones']
+    concurrencia = opciones['concurrencia']
+    espera = opciones['latencia'] / 1000
+
+    crear_en_lotes([
+        Producto(
+            nombre=f'Producto {i}', categoria=CATEGORIAS[i % len(CATEGORIAS)],
+            marca=f'Marca {i % 20}', precio=Decimal('1.00') + i % 500, cantidad=i % 7
+        )
+        for i in range(opciones['productos'])
+    ])
+    rutas_peticiones = _rutas(opciones['productos'], peticiones)
+
+    def latencia(execute, sql, params, many, context):
+        time.sleep(espera)
+        return execute(sql, params, many, context)
+
+    def instalar(connection, **kwargs):
+        if latencia not in connection.execute_wrappers:
+            connection.execute_wrappers.append(latencia)
+
+    configuraciones = (
+        ('wsgi-sync', False, lambda: _correr_wsgi(rutas_peticiones, concurrencia)),
+        ('asgi-sync', False, lambda: _correr_asgi(rutas_peticiones, concurrencia)),
+        ('asgi-async', True, lambda: _correr_asgi(rutas_peticiones, concurrencia)),
+    )
+
+    salida.write(
+        f'{peticiones} peticiones, {concurrencia} en curso, '
+        f'{opciones["latencia"]:g} ms por consulta ({connections["default"].vendor})'
+    )
+    salida.write(f"{'configuracion':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>9}")
+
+    connection_created.connect(instalar)
+    for conexion in connections.all(initialized_only=True):
+        instalar(conexion)
+    try:
+        for nombre, asincronas, correr in configuraciones:
+            with override_settings(
+                ROOT_URLCONF=_urls(asincronas),
+                PRODUCTOS_CACHE_RESPUESTAS=False,
+                PRODUCTOS_CACHE_OBJETOS=False,
+            ):
+                inicio = time.perf_counter()
+                resultados = correr()
+                segundos = time.perf_counter() - inicio
+
+            duraciones = [duracion for _, duracion in resultados]
+            errores = sum(1 for estado, _ in resultados if not str(estado).startswith('200'))
+            salida.write(
+                f'{nombre:<14}{peticiones / segundos:>10.1f}'
+                f'{_percentil(duraciones, 0.5) * 1000:>10.1f}'
+                f'{_percentil(duraciones, 0.95) * 1000:>10.1f}{errores:>9}'
+            )
+    finally:
+        connection_created.disconnect(instalar)
+        for conexion in connections.all(initialized_only=True):
+            if latencia in conexion.execute_wrappers:
+                conexion.execute_wrappers.remove(latencia)
@@ -0,0 +1,392 @@
+"""
+Prueba de carga de todas las acciones de ProductoViewSet.
+
+Siembra el catálogo sintético de catalogo.py y atiende, para cada acción,
+--peticiones peticiones con WSGIHandler desde --concurrencia hilos. Informa
+el rendimiento (peticiones por segundo), la latencia p50/p95/p99, las
+consultas SQL por petición (de las métricas de MetricasMiddleware) y las
+respuestas con error.
+
+Primero se miden las lecturas y después las escrituras; destroy va al final
+y elimina productos reservados para él.
+
+Con --guardar-linea-base se escriben los resultados en un archivo JSON y con
+--linea-base se comparan contra uno guardado: si alguna acción empeora más
+que --umbral (latencia p95, rendimiento o consultas por petición), el
+comando termina con error. Las latencias dependen de la máquina y del motor
+de base de datos; --solo-consultas compara únicamente las consultas por
+petición y los errores, que no dependen de ellos.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from productos import metricas
+from productos.models import Producto
+from productos.views import ProductoViewSet
+
+from .catalogo import CATEGORIAS, sembrar
+
+
+ACCIONES_ESTANDAR = ('list', 'create', 'retrieve', 'update', 'partial_update', 'destroy')
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+# Métricas comparadas con la línea base: (un valor mayor es peor, diferencia
+# absoluta mínima para considerarlo regresión). La tolerancia absoluta evita
+# falsos positivos en valores pequeños, como 0.05 consultas por petición en
+# una acción que casi siempre responde desde la cache
+METRICAS_COMPARADAS = {
+    'p95_ms': (True, 1.0),
+    'rps': (False, 0.0),
+    'consultas': (True, 0.5),
+}
+
+
+def agregar_argumentos(parser):
+    parser.add_argument('--filas', type=int, default=20000, help='Productos del catálogo')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del catálogo')
+    parser.add_argument(
+        '--peticiones', type=int, default=200, help='Peticiones por acción'
+    )
+    parser.add_argument(
+        '--concurrencia', type=int, default=8, help='Peticiones en curso a la vez (hilos)'
+    )
+    parser.add_argument(
+        '--acciones', help='Acciones a medir separadas por comas (por defecto todas)'
+    )
+    parser.add_argument(
+        '--sin-cache', action='store_true',
+        help='Desactivar las caches de respuestas y de objetos'
+    )
+    parser.add_argument('--linea-base', help='Archivo JSON con el que comparar los resultados')
+    parser.add_argument('--guardar-linea-base', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument(
+        '--umbral', type=float, default=0.25,
+        help='Empeoramiento tolerado respecto de la línea base (0.25 = 25 %%)'
+    )
+    parser.add_argument(
+        '--solo-consultas', action='store_true',
+        help='Comparar solo las consultas por petición'
+    )
+
+
+def acciones_del_viewset():
+    """Acciones estándar y extra de ProductoViewSet (con sus métodos mapeados)"""
+    extra = [
+        nombre for accion in ProductoViewSet.get_extra_actions()
+        for nombre in dict.fromkeys(accion.mapping.values())
+    ]
+    return [*ACCIONES_ESTANDAR, *extra]
+
+
+def _datos(peticiones):
+    """
+    Ids y valores de filtro para los escenarios. Los productos de destroy,
+    de las escrituras y de las reducciones de stock no se solapan.
+    """
+    ids = list(Producto.objects.order_by('pk').values_list('pk', flat=True))
+    eliminables = ids[-peticiones:]
+    restantes = ids[:-peticiones]
+    paso = max(1, len(restantes) // 1500)
+    muestra = restantes[::paso]
+    tercio = len(muestra) // 3
+    marcas = list(
+        Producto.objects.values('marca').annotate(total=Count('id'))
+        .order_by('-total', 'marca').values_list('marca', flat=True)
+    )
+    return {
+        'lectura': muestra[:tercio],
+        'escritura': muestra[tercio:2 * tercio],
+        'stock': list(
+            Producto.objects.filter(cantidad__gte=10, pk__in=muestra[2 * tercio:])
+            .order_by('pk').values_list('pk', flat=True)
+        ),
+        'eliminables': eliminables,
+        'marcas': marcas[:20],
+        'marcas_pequenas': marcas[-20:],
+        'terminos': [tipo[:4].lower() for _, _, tipos in CATEGORIAS.values() for tipo in tipos],
+    }
+
+
+def _nuevo(i, prefijo):
+    categoria = list(CATEGORIAS)[i % len(CATEGORIAS)]
+    return {
+        'nombre': f'{prefijo} {i:06d}', 'categoria': categoria, 'marca': 'Carga',
+        'precio': f'{10 + i % 90}.50', 'cantidad': 5,
+    }
+
+
+def escenarios(datos):
+    """
+    Petición número i de cada acción.
+
+    Returns:
+        dict: Acción -> función (i) -> (método, ruta, parámetros, cuerpo JSON)
+    """
+    def elegir(lista, i):
+        return lista[i % len(lista)]
+
+    def detalle(nombre, lista):
+        return lambda i: reverse(nombre, kwargs={'pk': elegir(datos[lista], i)})
+
+    url_detalle = detalle('producto-detail', 'lectura')
+    url_escritura = detalle('producto-detail', 'escritura')
+    url_reducir = detalle('producto-reducir-stock', 'stock')
+    categorias = list(CATEGORIAS)
+
+    return {
+        'list': lambda i: ('GET', reverse('producto-list'), {
+            'page': i % 10 + 1, 'orden': ('precio_asc', 'nombre', 'fecha_desc')[i % 3],
+            **({'categoria': elegir(categorias, i)} if i % 2 else {}),
+        }, None),
+        'retrieve': lambda i: ('GET', url_detalle(i), {}, None),
+        'lote': lambda i: ('GET', reverse('producto-lote'), {
+            'ids': ','.join(str(elegir(datos['lectura'], i * 100 + j)) for j in range(100))
+        }, None),
+        'buscar': lambda i: (
+            'GET', reverse('producto-buscar'), {'q': elegir(datos['terminos'], i), 'limit': 20}, None
+        ),
+        'por_categoria': lambda i: (
+            'GET', reverse('producto-por-categoria', kwargs={'categoria': elegir(categorias, i)}),
+            {'page': i % 5 + 1}, None
+        ),
+        'por_marca': lambda i: (
+            'GET', reverse('producto-por-marca', kwargs={'marca': elegir(datos['marcas'], i)}),
+            {}, None
+        ),
+        'sin_stock': lambda i: ('GET', reverse('producto-sin-stock'), {'page': i % 5 + 1}, None),
+        'facetas': lambda i: (
+            'GET', reverse('producto-facetas'),
+            {'categoria': elegir(categorias, i)} if i % 2 else {}, None
+        ),
+        'exportar': lambda i: (
+            'GET', reverse('producto-exportar'),
+            {'marca': elegir(datos['marcas_pequenas'], i), 'coincidencia': 'exacto'}, None
+        ),
+        'estadisticas_cache': lambda i: ('GET', reverse('producto-estadisticas-cache'), {}, None),
+        'estadisticas_pool': lambda i: ('GET', reverse('producto-estadisticas-pool'), {}, None),
+        'create': lambda i: ('POST', reverse('producto-list'), {}, _nuevo(i, 'Carga')),
+        'update': lambda i: ('PUT', url_escritura(i), {}, {
+            **_nuevo(i, 'Actualizado'), 'marca': 'Carga actualizada'
+        }),
+        'partial_update': lambda i: ('PATCH', url_escritura(i), {}, {'precio': f'{20 + i % 50}.00'}),
+        'reducir_stock': lambda i: ('POST', url_reducir(i), {}, {'cantidad': 1}),
+        'reducir_stock_lote': lambda i: ('POST', reverse('producto-reducir-stock-lote'), {}, {
+            'productos': [
+                {'id': pk, 'cantidad': 1}
+                for pk in sorted({elegir(datos['stock'], i * 3 + j) for j in range(3)})
+            ]
+        }),
+        'masivo': lambda i: (
+            'POST', reverse('producto-masivo'), {},
+            [_nuevo(i * 20 + j, 'Masivo') for j in range(20)]
+        ),
+        'actualizar_masivo': lambda i: ('PATCH', reverse('producto-masivo'), {}, [
+            {'id': elegir(datos['escritura'], i * 20 + j), 'precio': f'{30 + (i + j) % 60}.25'}
+            for j in range(20)
+        ]),
+        'destroy': lambda i: (
+            'DELETE', reverse('producto-detail', kwargs={'pk': datos['eliminables'][i]}), {}, None
+        ),
+    }
+
+
+def _atender(manejador, peticion):
+    """Atiende una petición y retorna (estado, segundos hasta leer el cuerpo)"""
+    metodo, ruta, parametros, cuerpo = peticion
+    contenido = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+    environ = {
+        'REQUEST_METHOD': metodo,
+        'PATH_INFO': ruta,
+        'QUERY_STRING': urlencode(parametros),
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(contenido)),
+        'wsgi.input': BytesIO(contenido),
+    }
+    setup_testing_defaults(environ)
+    estados = []
+    inicio = time.perf_counter()
+    respuesta = manejador(environ, lambda estado, cabeceras: estados.append(estado))
+    try:
+        b''.join(respuesta)
+    finally:
+        respuesta.close()
+    return int(estados[0].split()[0]), time.perf_counter() - inicio
+
+
+def percentil(valores, fraccion):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fraccion))]
+
+
+def medir(manejador, accion, peticiones, concurrencia):
+    """
+    Atiende las peticiones de una acción y resume los resultados.
+
+    Returns:
+        dict: rps, p50_ms, p95_ms, p99_ms, consultas (promedio) y errores
+    """
+    metricas.reiniciar()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        inicio = time.perf_counter()
+        resultados = list(pool.map(lambda peticion: _atender(manejador, peticion), peticiones))
+        segundos = time.perf_counter() - inicio
+
+    duraciones = [duracion for _, duracion in resultados]
+    atendidas = metricas.CONSULTAS.cantidad(accion=accion)
+    return {
+        'rps': round(len(resultados) / segundos, 1),
+        'p50_ms': round(percentil(duraciones, 0.50) * 1000, 2),
+        'p95_ms': round(percentil(duraciones, 0.95) * 1000, 2),
+        'p99_ms': round(percentil(duraciones, 0.99) * 1000, 2),
+        'consultas': round(metricas.CONSULTAS.suma(accion=accion) / atendidas, 2) if atendidas else 0.0,
+        'errores': sum(1 for estado, _ in resultados if estado >= 400),
+    }
+
+
+def comparar(resultados, linea_base, umbral, solo_consultas=False):
+    """
+    Compara los resultados con una línea base.
+
+    Args:
+        resultados (dict): Acción -> resultados de medir()
+        linea_base (dict): Contenido de un archivo de --guardar-linea-base
+        umbral (float): Empeoramiento relativo tolerado
+        solo_consultas (bool): Comparar solo las consultas por petición
+
+    Returns:
+        list: Descripción de cada regresión (vacía si no hay)
+    """
+    regresiones = []
+    for accion, actual in resultados.items():
+        base = linea_base['acciones'].get(accion)
+        if base is None:
+            continue
+        for metrica, (mayor_es_peor, minima) in METRICAS_COMPARADAS.items():
+            if solo_consultas and metrica != 'consultas':
+                continue
+            if mayor_es_peor:
+                empeoro = actual[metrica] > max(base[metrica] * (1 + umbral), base[metrica] + minima)
+            else:
+                empeoro = actual[metrica] < min(base[metrica] * (1 - umbral), base[metrica] - minima)
+            if empeoro:
+                regresiones.append(f'{accion}: {metrica} {base[metrica]} -> {actual[metrica]}')
+        if actual['errores'] > base.get('errores', 0):
+            regresiones.append(f'{accion}: errores {base.get("errores", 0)} -> {actual["errores"]}')
+    return regresiones
+
+
+def _middleware_con_metricas():
+    middleware = [m for m in settings.MIDDLEWARE if m != 'productos.metricas.MetricasMiddleware']
+    return ['productos.metricas.MetricasMiddleware', *middleware]
+
+
+def ejecutar(opciones, salida):
+    peticiones = opciones['peticiones']
+    concurrencia = opciones['concurrencia']
+    configuracion = {
+        'filas': opciones['filas'],
+        'semilla': opciones['semilla'],
+        'peticiones': peticiones,
+        'concurrencia': concurrencia,
+        'sin_cache': opciones['sin_cache'],
+        'motor': connections['default'].vendor,
+    }
+
+    linea_base = None
+    if opciones['linea_base']:
+        try:
+            with open(opciones['linea_base'], encoding='utf-8') as archivo:
+                linea_base = json.load(archivo)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'No se pudo leer la línea base: {error}')
+        distintas = {
+            clave: valor for clave, valor in linea_base['configuracion'].items()
+            if configuracion.get(clave) != valor
+        }
+        if distintas:
+            salida.write(f'Aviso: la línea base se tomó con otra configuración: {distintas}')
+
+    acciones = acciones_del_viewset()
+    if opciones['acciones']:
+        pedidas = opciones['acciones'].split(',')
+        desconocidas = set(pedidas) - set(acciones)
+        if desconocidas:
+            raise CommandError(f'Acciones desconocidas: {", ".join(sorted(desconocidas))}')
+        acciones = [accion for accion in acciones if accion in pedidas]
+
+    inicio = time.perf_counter()
+    sembrar(opciones['filas'], semilla=opciones['semilla'])
+    salida.write(
+        f'{opciones["filas"]} productos sembrados en {time.perf_counter() - inicio:.1f} s; '
+        f'{peticiones} peticiones por acción, {concurrencia} en curso ({configuracion["motor"]})'
+    )
+
+    por_accion = escenarios(_datos(peticiones))
+    # Lecturas primero; destroy al final porque elimina productos
+    orden = [a for a in por_accion if a in acciones and a != 'destroy']
+    orden += [a for a in acciones if a == 'destroy']
+    sin_escenario = [a for a in acciones if a not in por_accion]
+
+    salida.write(
+        f"{'accion':<20}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'consultas':>11}{'errores':>9}"
+    )
+    # SQLite bloquea la tabla completa al escribir: las escrituras concurrentes
+    # fallarían con "database table is locked" en lugar de esperar
+    concurrencia_escrituras = concurrencia
+    if configuracion['motor'] == 'sqlite':
+        concurrencia_escrituras = 1
+        salida.write('SQLite: las escrituras se atienden de a una')
+
+    resultados = {}
+    ajustes = {'MIDDLEWARE': _middleware_con_metricas(), 'PRODUCTOS_METRICAS': True}
+    if opciones['sin_cache']:
+        ajustes.update(PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_CACHE_OBJETOS=False)
+    with override_settings(**ajustes):
+        manejador = WSGIHandler()
+        for accion in orden:
+            lote = [por_accion[accion](i) for i in range(peticiones)]
+            en_curso = concurrencia if lote[0][0] in METODOS_LECTURA else concurrencia_escrituras
+            resultado = medir(manejador, accion, lote, en_curso)
+            resultados[accion] = resultado
+            salida.write(
+                f"{accion:<20}{resultado['rps']:>9.1f}{resultado['p50_ms']:>9.1f}"
+                f"{resultado['p95_ms']:>9.1f}{resultado['p99_ms']:>9.1f}"
+                f"{resultado['consultas']:>11.2f}{resultado['errores']:>9}"
+            )
+    if sin_escenario:
+        salida.write(f'Acciones sin escenario de carga: {", ".join(sin_escenario)}')
+
+    if opciones['guardar_linea_base']:
+        with open(opciones['guardar_linea_base'], 'w', encoding='utf-8') as archivo:
+            json.dump(
+                {'configuracion': configuracion, 'acciones': resultados},
+                archivo, indent=2, ensure_ascii=False
+            )
+            archivo.write('\n')
+        salida.write(f'Línea base guardada en {opciones["guardar_linea_base"]}')
+
+    if linea_base is not None:
+        regresiones = comparar(
+            resultados, linea_base, opciones['umbral'], opciones['solo_consultas']
+        )
+        if regresiones:
+            raise CommandError(
+                f'Regresiones respecto de la línea base (umbral {opciones["umbral"]:.0%}):\n'
+                + '\n'.join(regresiones)
+            )
+        salida.write(f'Sin regresiones respecto de la línea base (umbral {opciones["umbral"]:.0%})')
@@ -0,0 +1,144 @@
+"""
+Catálogo sintético y determinista para benchmarks y pruebas de carga.
+
+Con la misma semilla y el mismo número de filas se generan siempre los
+mismos productos. La distribución imita un catálogo real:
+
+- Categorías y marcas con popularidad de tipo Zipf: pocas concentran la
+  mayoría de los productos y hay una cola larga de marcas con pocos
+- Cada marca pertenece a una categoría
+- Precios log-normales dentro del rango de cada categoría
+- Alrededor de un 12 % de productos sin stock
+"""
+import math
+import random
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+
+from productos.lotes import insertar_lote
+from productos.models import Producto
+from productos.signals import productos_modificados
+
+
+# Categoría -> (precio mínimo, precio máximo, tipos de producto)
+CATEGORIAS = {
+    'Electrónicos': (40, 3000, ('Laptop', 'Monitor', 'Tablet', 'Teléfono', 'Parlante')),
+    'Accesorios': (5, 150, ('Mouse', 'Teclado', 'Cable', 'Funda', 'Cargador')),
+    'Hogar': (10, 800, ('Lámpara', 'Silla', 'Mesa', 'Alfombra', 'Espejo')),
+    'Oficina': (2, 400, ('Cuaderno', 'Escritorio', 'Archivador', 'Bolígrafo', 'Agenda')),
+    'Deportes': (8, 1200, ('Pelota', 'Bicicleta', 'Raqueta', 'Mancuerna', 'Casco')),
+    'Juguetes': (5, 300, ('Muñeca', 'Rompecabezas', 'Peluche', 'Bloques', 'Cometa')),
+    'Jardín': (6, 900, ('Maceta', 'Manguera', 'Tijera', 'Regadera', 'Pala')),
+    'Electrodomésticos': (30, 2500, ('Heladera', 'Licuadora', 'Microondas', 'Tostadora', 'Cafetera')),
+    'Salud': (3, 250, ('Termómetro', 'Tensiómetro', 'Balanza', 'Botiquín', 'Vaporizador')),
+    'Música': (15, 2000, ('Guitarra', 'Teclado', 'Auricular', 'Micrófono', 'Batería')),
+}
+
+ADJETIVOS = ('Pro', 'Max', 'Lite', 'Plus', 'Mini', 'Ultra', 'Classic', 'Air', 'Neo', 'Eco')
+
+SILABAS = ('ka', 'lo', 'mi', 'ra', 'to', 'ze', 'vi', 'nu', 'sa', 'po', 'te', 'lu')
+
+MARCAS_POR_CATEGORIA = 40
+
+# Exponente de la distribución Zipf (mayor: más concentración)
+EXPONENTE_ZIPF = 1.1
+
+PROPORCION_SIN_STOCK = 0.12
+
+
+def pesos_zipf(cantidad, exponente=EXPONENTE_ZIPF):
+    """Pesos 1/k^s para los rangos 1..cantidad"""
+    return [1 / (rango ** exponente) for rango in range(1, cantidad + 1)]
+
+
+def _marcas(generador):
+    """Nombres de marca por categoría (distintos entre sí)"""
+    usadas = set()
+    marcas = {}
+    for categoria in CATEGORIAS:
+        marcas[categoria] = []
+        while len(marcas[categoria]) < MARCAS_POR_CATEGORIA:
+            nombre = ''.join(generador.choice(SILABAS) for _ in range(3)).capitalize()
+            if nombre not in usadas:
+                usadas.add(nombre)
+                marcas[categoria].append(nombre)
+    return marcas
+
+
+def generar_productos(filas, semilla=42):
+    """
+    Genera productos sin guardar, siempre los mismos para la misma semilla.
+
+    Args:
+        filas (int): Cantidad de productos
+        semilla (int): Semilla del generador pseudoaleatorio
+
+    Yields:
+        Producto: Instancias sin guardar
+    """
+    generador = random.Random(semilla)
+    marcas = _marcas(generador)
+    categorias = list(CATEGORIAS)
+    pesos_categorias = pesos_zipf(len(categorias))
+    pesos_marcas = pesos_zipf(MARCAS_POR_CATEGORIA)
+
+    for numero in range(filas):
+        categoria = generador.choices(categorias, pesos_categorias)[0]
+        minimo, maximo, tipos = CATEGORIAS[categoria]
+        marca = generador.choices(marcas[categoria], pesos_marcas)[0]
+
+        # Log-normal centrada en la media geométrica del rango
+        precio = generador.lognormvariate(math.log(math.sqrt(minimo * maximo)), 0.6)
+        precio = min(max(precio, minimo), maximo)
+
+        if generador.random() < PROPORCION_SIN_STOCK:
+            cantidad = 0
+        else:
+            cantidad = min(int(generador.expovariate(1 / 40)) + 1, 999)
+
+        yield Producto(
+            nombre=f'{generador.choice(tipos)} {generador.choice(ADJETIVOS)} {numero + 1:07d}',
+            categoria=categoria,
+            marca=marca,
+            precio=Decimal(f'{precio:.2f}'),
+            cantidad=cantidad,
+        )
+
+
+def sembrar(filas, semilla=42, tamano_lote=2000, lotes_por_transaccion=5, progreso=None):
+    """
+    Inserta el catálogo sintético con INSERT de varias filas.
+
+    Cada bloque (tamano_lote * lotes_por_transaccion filas) se inserta en una
+    transacción y se avisa con productos_modificados, igual que
+    importar_productos, para mantener las facetas y el índice de búsqueda.
+
+    Args:
+        filas (int): Cantidad de productos
+        semilla (int): Semilla del generador
+        tamano_lote (int): Filas por sentencia INSERT
+        lotes_por_transaccion (int): Sentencias por transacción
+        progreso: Función opcional que recibe las filas insertadas hasta el momento
+
+    Returns:
+        int: Filas insertadas
+    """
+    productos = generar_productos(filas, semilla)
+    tamano_bloque = tamano_lote * lotes_por_transaccion
+    insertadas = 0
+    for bloque in iter(lambda: list(islice(productos, tamano_bloque)), []):
+        with transaction.atomic():
+            for inicio in range(0, len(bloque), tamano_lote):
+                insertar_lote(bloque[inicio:inicio + tamano_lote])
+        productos_modificados.send(
+            sender=Producto,
+            ids=[p.pk for p in bloque if p.pk is not None],
+            anteriores=[],
+            actuales=[p.valores_rastreados() for p in bloque if p.pk is not None]
+        )
+        insertadas += len(bloque)
+        if progreso is not None:
+            progreso(insertadas)
+    return insertadas
@@ -0,0 +1,105 @@
+"""
+Benchmark del renderizado JSON de páginas del listado.
+
+Compara rest_framework.renderers.JSONRenderer con ProductoJSONRenderer sobre
+páginas de 20, 100 y 1000 productos con dos tipos de contenido:
+
+- serializado: filas ya convertidas por el serializer (precios y fechas
+  como cadenas), como las que entrega el listado
+- valores: filas con Decimal y datetime sin convertir, donde la conversión
+  de tipos queda a cargo del encoder
+
+Antes de medir se verifica que ambos renderizadores producen los mismos
+bytes.
+"""
+import datetime
+import timeit
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from productos.renderers import ProductoJSONRenderer
+from productos.serializers import ProductoListSerializer, obtener_valores_serializer
+
+
+# Este benchmark no consulta la base de datos
+REQUIERE_BASE_DE_DATOS = False
+
+
+def agregar_argumentos(parser):
+    parser.add_argument(
+        '--tamanos', type=int, nargs='+', default=[20, 100, 1000],
+        help='Productos por página'
+    )
+    parser.add_argument(
+        '--repeticiones', type=int, default=200,
+        help='Renderizados por medición'
+    )
+
+
+def _filas(cantidad):
+    """Filas de values() de productos con valores variados"""
+    ahora = timezone.now()
+    return [
+        {
+            'id': i,
+            'nombre': f'Producto número {i}',
+            'categoria': ('Electrónicos', 'Hogar', 'Ropa')[i % 3],
+            'marca': f'Marca {i % 17}',
+            'precio': Decimal(f'{i % 1000}.{i % 100:02d}'),
+            'cantidad': i % 50,
+            'fecha_creacion': ahora - datetime.timedelta(minutes=i),
+        }
+        for i in range(1, cantidad + 1)
+    ]
+
+
+def _pagina(filas):
+    return {
+        'productos': filas,
+        'paginacion': {
+            'pagina_actual': 1,
+            'total_paginas': 1,
+            'total_productos': len(filas),
+            'productos_por_pagina': len(filas),
+            'tiene_siguiente': False,
+            'tiene_anterior': False,
+        },
+    }
+
+
+def _medir(renderer, datos, repeticiones):
+    """Milisegundos por renderizado (mejor de 5 rondas)"""
+    segundos = min(timeit.repeat(
+        lambda: renderer.render(datos), number=repeticiones, repeat=5
+    ))
+    return segundos * 1000 / repeticiones
+
+
+def ejecutar(opciones, salida):
+    repeticiones = opciones['repeticiones']
+    valores_serializer = obtener_valores_serializer(ProductoListSerializer)
+    estandar = JSONRenderer()
+    rapido = ProductoJSONRenderer()
+
+    salida.write(f'{repeticiones} renderizados por medición, mejor de 5 rondas')
+    salida.write(
+        f"{'productos':>10}{'contenido':>13}{'JSONRenderer ms':>17}"
+        f"{'Producto ms':>13}{'mejora':>8}"
+    )
+    for tamano in opciones['tamanos']:
+        filas = _filas(tamano)
+        contenidos = (
+            ('serializado', _pagina(valores_serializer.serializar(filas))),
+            ('valores', _pagina(filas)),
+        )
+        for nombre, datos in contenidos:
+            if estandar.render(datos) != rapido.render(datos):
+                raise AssertionError(f'Salidas distintas para {nombre} ({tamano})')
+            antes = _medir(estandar, datos, repeticiones)
+            despues = _medir(rapido, datos, repeticiones)
+            salida.write(
+                f'{tamano:>10}{nombre:>13}{antes:>17.3f}{despues:>13.3f}'
+                f'{antes / despues:>7.2f}x'
+            )
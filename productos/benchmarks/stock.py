@@ -0,0 +1,117 @@
+"""
+Benchmark de reducción de stock con contención.
+
+Varios hilos reducen el stock del mismo producto a la vez y se compara:
+
+- lectura-save: leer, verificar en Python y guardar la fila completa
+  (la implementación anterior de Producto.reducir_stock)
+- atomico: UPDATE condicional de una sola sentencia (Producto.reducir_stock)
+- lote: pedidos de varias líneas con Producto.reducir_stock_lote
+
+Para cada estrategia se informa el rendimiento (operaciones por segundo) y
+las actualizaciones perdidas (diferencia entre el stock final esperado y el
+real).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection
+
+from productos.models import Producto, StockInsuficienteError
+
+
+def agregar_argumentos(parser):
+    parser.add_argument('--hilos', type=int, default=8, help='Hilos concurrentes')
+    parser.add_argument(
+        '--operaciones', type=int, default=2000,
+        help='Reducciones totales por estrategia'
+    )
+    parser.add_argument(
+        '--lineas', type=int, default=5,
+        help='Productos por pedido en la estrategia de lote'
+    )
+
+
+def _reducir_lectura_save(pk):
+    """Implementación anterior: lee, verifica y guarda todas las columnas"""
+    producto = Producto.objects.get(pk=pk)
+    if producto.cantidad >= 1:
+        producto.cantidad -= 1
+        producto.save()
+        return True
+    return False
+
+
+def _reducir_atomico(pk):
+    producto = Producto(pk=pk)
+    return producto.reducir_stock(1)
+
+
+def _correr(hilos, tareas):
+    """Ejecuta las tareas en un pool de hilos y retorna (exitosas, segundos)"""
+    def trabajador(tarea):
+        try:
+            return tarea()
+        finally:
+            connection.close()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(trabajador, tareas))
+    return sum(1 for r in resultados if r), time.perf_counter() - inicio
+
+
+def _crear_productos(cantidad, stock):
+    return [
+        Producto.objects.create(
+            nombre=f'Benchmark {i}',
+            categoria='Benchmark',
+            marca='Benchmark',
+            precio=Decimal('1.00'),
+            cantidad=stock
+        )
+        for i in range(cantidad)
+    ]
+
+
+def ejecutar(opciones, salida):
+    hilos = opciones['hilos']
+    operaciones = opciones['operaciones']
+    lineas = opciones['lineas']
+
+    salida.write(f'{operaciones} reducciones con {hilos} hilos ({connection.vendor})')
+    salida.write(f"{'estrategia':<14}{'ops/s':>12}{'exitosas':>10}{'perdidas':>10}")
+
+    for nombre, funcion in (('lectura-save', _reducir_lectura_save),
+                            ('atomico', _reducir_atomico)):
+        producto = _crear_productos(1, operaciones)[0]
+        exitosas, segundos = _correr(
+            hilos, [lambda: funcion(producto.pk)] * operaciones
+        )
+        producto.refresh_from_db()
+        perdidas = producto.cantidad - (operaciones - exitosas)
+        salida.write(
+            f'{nombre:<14}{operaciones / segundos:>12.1f}{exitosas:>10}{perdidas:>10}'
+        )
+
+    productos = _crear_productos(lineas, operaciones)
+    pedido = [(producto.pk, 1) for producto in productos]
+
+    def reducir_pedido():
+        try:
+            Producto.reducir_stock_lote(pedido)
+            return True
+        except StockInsuficienteError:
+            return False
+
+    pedidos = operaciones // lineas
+    exitosos, segundos = _correr(hilos, [reducir_pedido] * pedidos)
+    perdidas = sum(
+        producto.cantidad - (operaciones - exitosos)
+        for producto in Producto.objects.filter(pk__in=[p.pk for p in productos])
+    )
+    salida.write(
+        f"{'lote':<14}{pedidos * lineas / segundos:>12.1f}"
+        f'{exitosos * lineas:>10}{perdidas:>10}'
+    )
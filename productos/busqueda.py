@@ -0,0 +1,300 @@
+"""
+Subsistema de búsqueda de productos.
+
+Los productos se indexan como términos normalizados (minúsculas, sin
+acentos ni palabras vacías) con un peso según el campo donde aparecen.
+Una búsqueda exige que cada término de la consulta coincida, completo o
+como prefijo, con algún término del producto, y ordena los resultados por
+relevancia (suma de pesos; las coincidencias completas valen el doble).
+
+El backend se elige con el setting PRODUCTOS_BUSQUEDA_BACKEND:
+
+- BackendBaseDatos: índice invertido en la tabla TerminoBusqueda (producción).
+- BackendMemoria: índice en memoria del proceso (pruebas y desarrollo).
+"""
+import bisect
+import threading
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Producto, TerminoBusqueda
+from .texto import tokenizar
+
+
+# Peso de cada campo indexado
+PESOS_CAMPOS = {
+    'nombre': 3,
+    'marca': 2,
+    'categoria': 1,
+}
+
+CAMPOS_INDEXADOS = tuple(PESOS_CAMPOS)
+
+# Multiplicador para las coincidencias completas frente a las de prefijo
+FACTOR_COINCIDENCIA_EXACTA = 2
+
+TAMANO_LOTE_REINDEXADO = 2000
+
+
+def terminos_producto(producto):
+    """
+    Calcula los términos indexables de un producto y su peso.
+
+    Args:
+        producto: Instancia de Producto o diccionario con los campos indexados
+
+    Returns:
+        dict: Término normalizado -> peso acumulado
+    """
+    terminos = defaultdict(int)
+    for campo, peso in PESOS_CAMPOS.items():
+        valor = producto[campo] if isinstance(producto, dict) else getattr(producto, campo)
+        for termino in set(tokenizar(valor)):
+            terminos[termino] += peso
+    return dict(terminos)
+
+
+def terminos_consulta(termino_busqueda):
+    """Términos distintos de la consulta, conservando su orden"""
+    return list(dict.fromkeys(tokenizar(termino_busqueda)))
+
+
+class BackendBusqueda:
+    """
+    Interfaz común de los backends de búsqueda.
+    """
+
+    def indexar(self, productos):
+        """Agrega o reemplaza productos en el índice"""
+        raise NotImplementedError
+
+    def eliminar(self, ids):
+        """Quita productos del índice"""
+        raise NotImplementedError
+
+    def buscar(self, termino_busqueda, limite):
+        """
+        Busca productos por nombre, categoría o marca.
+
+        Args:
+            termino_busqueda (str): Texto ingresado por el usuario
+            limite (int): Máximo de resultados
+
+        Returns:
+            list: Ids de productos ordenados por relevancia
+        """
+        raise NotImplementedError
+
+    async def abuscar(self, termino_busqueda, limite):
+        """Versión async de buscar; por defecto ejecuta buscar en un hilo"""
+        return await sync_to_async(self.buscar)(termino_busqueda, limite)
+
+    def reconstruir(self):
+        """Reconstruye el índice completo a partir de la tabla de productos"""
+        raise NotImplementedError
+
+
+class BackendBaseDatos(BackendBusqueda):
+    """
+    Índice invertido en la tabla TerminoBusqueda.
+
+    Las coincidencias por prefijo usan el índice (termino, producto), por lo
+    que la búsqueda no recorre la tabla de productos.
+    """
+
+    def indexar(self, productos):
+        filas = []
+        ids = []
+        for producto in productos:
+            ids.append(producto.pk)
+            filas.extend(
+                TerminoBusqueda(producto_id=producto.pk, termino=termino, peso=peso)
+                for termino, peso in terminos_producto(producto).items()
+            )
+        with transaction.atomic():
+            TerminoBusqueda.objects.filter(producto_id__in=ids).delete()
+            TerminoBusqueda.objects.bulk_create(filas, batch_size=TAMANO_LOTE_REINDEXADO)
+
+    def eliminar(self, ids):
+        TerminoBusqueda.objects.filter(producto_id__in=ids).delete()
+
+    def buscar(self, termino_busqueda, limite):
+        resultados = self._consulta(terminos_consulta(termino_busqueda))
+        return list(resultados[:limite]) if resultados is not None else []
+
+    async def abuscar(self, termino_busqueda, limite):
+        resultados = self._consulta(terminos_consulta(termino_busqueda))
+        if resultados is None:
+            return []
+        return [pk async for pk in resultados[:limite]]
+
+    def _consulta(self, terminos):
+        """Ids que coinciden con todos los términos, por relevancia (o None)"""
+        if not terminos:
+            return None
+
+        # Los términos ya están normalizados: istartswith evita el LIKE BINARY
+        # de MySQL, que no aprovecha el índice (termino, producto)
+        coincidencias = {
+            f'coincide_{i}': Max(Case(
+                When(termino__istartswith=termino, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+            for i, termino in enumerate(terminos)
+        }
+        puntaje = Sum(Case(
+            *[When(termino=termino, then=F('peso') * FACTOR_COINCIDENCIA_EXACTA)
+              for termino in terminos],
+            *[When(termino__istartswith=termino, then=F('peso')) for termino in terminos],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+        return (
+            TerminoBusqueda.objects
+            .filter(reduce(or_, [Q(termino__istartswith=termino) for termino in terminos]))
+            .values('producto_id')
+            .annotate(puntaje=puntaje, **coincidencias)
+            .filter(**{nombre: 1 for nombre in coincidencias})
+            .order_by('-puntaje', 'producto_id')
+            .values_list('producto_id', flat=True)
+        )
+
+    def reconstruir(self):
+        TerminoBusqueda.objects.all().delete()
+        productos = Producto.objects.order_by('pk').only('pk', *CAMPOS_INDEXADOS)
+        ultimo_pk = 0
+        while True:
+            lote = list(productos.filter(pk__gt=ultimo_pk)[:TAMANO_LOTE_REINDEXADO])
+            if not lote:
+                break
+            self.indexar(lote)
+            ultimo_pk = lote[-1].pk
+
+
+class BackendMemoria(BackendBusqueda):
+    """
+    Índice invertido en memoria del proceso.
+
+    Se construye de forma perezosa en la primera búsqueda y se mantiene con
+    las mismas señales que el índice en base de datos. Pensado para pruebas
+    y desarrollo: cada proceso tiene su propia copia del índice.
+    """
+
+    def __init__(self):
+        self._candado = threading.RLock()
+        self.limpiar()
+
+    def limpiar(self):
+        """Descarta el índice; se reconstruirá en la próxima búsqueda"""
+        with self._candado:
+            self._cargado = False
+            self._documentos = {}
+            self._postings = {}
+            self._vocabulario = []
+
+    def _agregar(self, pk, terminos):
+        self._quitar(pk)
+        self._documentos[pk] = terminos
+        for termino, peso in terminos.items():
+            if termino not in self._postings:
+                self._postings[termino] = {}
+                bisect.insort(self._vocabulario, termino)
+            self._postings[termino][pk] = peso
+
+    def _quitar(self, pk):
+        for termino in self._documentos.pop(pk, {}):
+            postings = self._postings[termino]
+            postings.pop(pk, None)
+            if not postings:
+                del self._postings[termino]
+                posicion = bisect.bisect_left(self._vocabulario, termino)
+                del self._vocabulario[posicion]
+
+    def _con_prefijo(self, prefijo):
+        """Términos del vocabulario que empiezan con el prefijo"""
+        posicion = bisect.bisect_left(self._vocabulario, prefijo)
+        while posicion < len(self._vocabulario):
+            termino = self._vocabulario[posicion]
+            if not termino.startswith(prefijo):
+                break
+            yield termino
+            posicion += 1
+
+    def indexar(self, productos):
+        with self._candado:
+            if not self._cargado:
+                return
+            for producto in productos:
+                self._agregar(producto.pk, terminos_producto(producto))
+
+    def eliminar(self, ids):
+        with self._candado:
+            for pk in ids:
+                self._quitar(pk)
+
+    def buscar(self, termino_busqueda, limite):
+        terminos = terminos_consulta(termino_busqueda)
+        if not terminos:
+            return []
+
+        with self._candado:
+            if not self._cargado:
+                self.reconstruir()
+
+            # Peso de cada (producto, término indexado); como en el CASE SQL,
+            # gana el primer término de la consulta que coincide
+            pesos = defaultdict(dict)
+            coincidencias = defaultdict(set)
+            for posicion, termino in enumerate(terminos):
+                for indexado in self._con_prefijo(termino):
+                    factor = FACTOR_COINCIDENCIA_EXACTA if indexado == termino else 1
+                    for pk, peso in self._postings[indexado].items():
+                        coincidencias[pk].add(posicion)
+                        pesos[pk].setdefault(indexado, peso * factor)
+
+        puntajes = [
+            (-sum(pesos[pk].values()), pk)
+            for pk, posiciones in coincidencias.items()
+            if len(posiciones) == len(terminos)
+        ]
+        puntajes.sort()
+        return [pk for _, pk in puntajes[:limite]]
+
+    def reconstruir(self):
+        with self._candado:
+            self._documentos = {}
+            self._postings = {}
+            self._vocabulario = []
+            productos = Producto.objects.values('pk', *CAMPOS_INDEXADOS)
+            for producto in productos.iterator(chunk_size=TAMANO_LOTE_REINDEXADO):
+                self._agregar(producto['pk'], terminos_producto(producto))
+            self._cargado = True
+
+
+_backends = {}
+_candado_backends = threading.Lock()
+
+
+def obtener_backend():
+    """
+    Retorna la instancia del backend configurado en PRODUCTOS_BUSQUEDA_BACKEND.
+
+    Returns:
+        BackendBusqueda: Backend de búsqueda (una instancia por proceso)
+    """
+    ruta = getattr(
+        settings, 'PRODUCTOS_BUSQUEDA_BACKEND', 'productos.busqueda.BackendBaseDatos'
+    )
+    with _candado_backends:
+        if ruta not in _backends:
+            _backends[ruta] = import_string(ruta)()
+        return _backends[ruta]
@@ -0,0 +1,328 @@
+"""
+Cache de objetos Producto por id (write-through).
+
+El detalle y reducir_stock leen el producto por clave primaria en cada
+petición; con esta cache la lectura se resuelve en la cache compartida de
+Django. Las entradas se llenan al leer (con cache.add, sin pisar lo que
+una escritura confirmada haya dejado mientras tanto) y se actualizan (no
+solo se borran) en cada escritura:
+
+- save / admin: se guarda la instancia completa al confirmar la transacción
+- reducir_stock / reducir_stock_lote: la cantidad se guarda en una clave
+  propia y se decrementa con cache.decr, igual que el UPDATE
+  (cantidad = cantidad - n); los decrementos conmutan, así que el orden en
+  que llegan reducciones concurrentes no importa. Si la cantidad no está en
+  cache se guarda la que dejó el UPDATE, para que un llenado con datos
+  leídos antes del commit no la pise. La fecha de actualización también
+  tiene clave propia y se escribe sin leer ni reescribir la entrada, que
+  un save concurrente puede estar actualizando
+- marcar_sin_stock: se fija cantidad 0 en las entradas existentes
+- otras operaciones masivas (productos_modificados): se recargan desde la
+  base de datos las entradas que estaban en cache
+
+Las escrituras se aplican a la cache después del commit, por lo que una
+transacción revertida nunca deja valores en la cache; mientras tanto las
+entradas afectadas se eliminan.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from .models import Producto
+
+
+PREFIJO = 'productos:objeto'
+
+
+def habilitada():
+    """Indica si la cache de objetos está activa (PRODUCTOS_CACHE_OBJETOS)"""
+    return getattr(settings, 'PRODUCTOS_CACHE_OBJETOS', True)
+
+
+def obtener_timeout():
+    """Segundos de vida de cada entrada"""
+    return getattr(settings, 'PRODUCTOS_CACHE_OBJETOS_TIMEOUT', 300)
+
+
+class Estadisticas:
+    """Contadores de aciertos y fallos de la cache en este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def registrar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self.aciertos = self.fallos = 0
+
+    def como_dict(self):
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / total if total else 0.0,
+        }
+
+
+estadisticas = Estadisticas()
+
+
+def _campos():
+    """Campos concretos de Producto en el orden que espera from_db"""
+    return [campo.attname for campo in Producto._meta.concrete_fields]
+
+
+def _clave(pk):
+    return f'{PREFIJO}:{pk}'
+
+
+def _clave_cantidad(pk):
+    return f'{PREFIJO}:{pk}:cantidad'
+
+
+def _clave_fecha(pk):
+    return f'{PREFIJO}:{pk}:fecha_actualizacion'
+
+
+def _claves(pk):
+    """Claves de las partes de la entrada de un producto"""
+    return (_clave(pk), _clave_cantidad(pk), _clave_fecha(pk))
+
+
+def _al_confirmar(ids, funcion):
+    """
+    Ejecuta la función al confirmar la transacción en curso, o ya si no hay
+    ninguna. Dentro de una transacción las entradas se eliminan de inmediato
+    para que las lecturas posteriores no vean los valores anteriores.
+    """
+    conexion = transaction.get_connection(router.db_for_write(Producto))
+    if conexion.in_atomic_block:
+        eliminar(ids)
+        transaction.on_commit(funcion, using=conexion.alias)
+    else:
+        funcion()
+
+
+def obtener(pk):
+    """
+    Obtiene un producto de la cache.
+
+    Args:
+        pk: Id del producto
+
+    Returns:
+        Producto: Instancia reconstruida, o None si no está en cache
+    """
+    return _reconstruir(pk, cache.get_many(_claves(pk)))
+
+
+def obtener_varios(ids):
+    """
+    Obtiene de la cache los productos de una lista de ids con una sola
+    lectura (get_many).
+
+    Args:
+        ids (list): Ids de los productos
+
+    Returns:
+        dict: Id -> Producto de los que están en cache
+    """
+    encontrados = cache.get_many([clave for pk in ids for clave in _claves(pk)])
+    productos = {}
+    for pk in ids:
+        producto = _reconstruir(
+            pk, {clave: encontrados[clave] for clave in _claves(pk) if clave in encontrados}
+        )
+        if producto is not None:
+            productos[pk] = producto
+    return productos
+
+
+def _reconstruir(pk, encontrados):
+    """Instancia a partir de las entradas leídas de la cache (o None)"""
+    if len(encontrados) < 3:
+        estadisticas.registrar(False)
+        return None
+
+    estadisticas.registrar(True)
+    valores = dict(
+        encontrados[_clave(pk)], cantidad=encontrados[_clave_cantidad(pk)],
+        fecha_actualizacion=encontrados[_clave_fecha(pk)]
+    )
+    campos = _campos()
+    return Producto.from_db(
+        router.db_for_read(Producto), campos, [valores[campo] for campo in campos]
+    )
+
+
+def obtener_o_cargar(pk, cargar):
+    """
+    Obtiene el producto de la cache o lo carga y lo guarda.
+
+    Args:
+        pk: Id del producto
+        cargar: Función sin argumentos que lee el producto de la base de datos
+
+    Returns:
+        Producto: Instancia del producto
+    """
+    producto = obtener(pk)
+    if producto is None:
+        producto = cargar()
+        llenar([producto])
+    return producto
+
+
+async def aobtener_o_cargar(pk, cargar):
+    """
+    Versión async de obtener_o_cargar.
+
+    Args:
+        pk: Id del producto
+        cargar: Función async sin argumentos que lee el producto
+
+    Returns:
+        Producto: Instancia del producto
+    """
+    producto = _reconstruir(pk, await cache.aget_many(_claves(pk)))
+    if producto is None:
+        producto = await cargar()
+        timeout = obtener_timeout()
+        for clave, valor in _entradas([producto]).items():
+            await cache.aadd(clave, valor, timeout)
+    return producto
+
+
+def _entradas(productos):
+    """Claves y valores de cache de productos con todos sus campos cargados"""
+    campos = _campos()
+    entradas = {}
+    for producto in productos:
+        if any(campo not in producto.__dict__ for campo in campos):
+            continue
+        valores = {campo: producto.__dict__[campo] for campo in campos}
+        entradas[_clave_cantidad(producto.pk)] = valores.pop('cantidad')
+        entradas[_clave_fecha(producto.pk)] = valores.pop('fecha_actualizacion')
+        entradas[_clave(producto.pk)] = valores
+    return entradas
+
+
+def guardar(productos):
+    """Guarda productos con todos sus campos cargados"""
+    entradas = _entradas(productos)
+    if entradas:
+        cache.set_many(entradas, obtener_timeout())
+
+
+def llenar(productos):
+    """
+    Guarda productos leídos de la base de datos solo en las claves que no
+    tienen entrada (cache.add).
+
+    Entre la lectura y el llenado puede confirmarse una escritura que ya
+    dejó en la cache un valor más nuevo (por ejemplo, la cantidad de una
+    reducción de stock); el llenado no debe pisarlo.
+    """
+    timeout = obtener_timeout()
+    for clave, valor in _entradas(productos).items():
+        cache.add(clave, valor, timeout)
+
+
+def eliminar(ids):
+    """Quita productos de la cache"""
+    cache.delete_many([clave for pk in ids for clave in _claves(pk)])
+
+
+def _en_cache(ids):
+    """Ids de la lista que tienen entrada en la cache"""
+    encontrados = cache.get_many([_clave(pk) for pk in ids])
+    return [pk for pk in ids if _clave(pk) in encontrados]
+
+
+def escribir(producto):
+    """
+    Write-through de un producto guardado (al confirmar la transacción).
+
+    Si la instancia tiene campos diferidos no se puede guardar completa y
+    la entrada se elimina.
+    """
+    if not habilitada():
+        return
+    pk = producto.pk
+    entradas = _entradas([producto])
+    if entradas:
+        _al_confirmar([pk], lambda: cache.set_many(entradas, obtener_timeout()))
+    else:
+        _al_confirmar([pk], lambda: eliminar([pk]))
+
+
+def quitar(pk):
+    """Quita un producto eliminado (al confirmar la transacción)"""
+    if habilitada():
+        _al_confirmar([pk], lambda: eliminar([pk]))
+
+
+def recargar(ids):
+    """
+    Vuelve a leer de la base de datos (al confirmar la transacción) las
+    entradas de los ids que estaban en cache.
+    """
+    if not habilitada() or not ids:
+        return
+    existentes = _en_cache(ids)
+    if existentes:
+        _al_confirmar(
+            existentes, lambda: guardar(Producto.objects.filter(pk__in=existentes))
+        )
+
+
+def reducir_cantidades(reducciones, fecha_actualizacion, cantidades):
+    """
+    Aplica a la cache reducciones de stock ya hechas en la base de datos.
+
+    Args:
+        reducciones (dict): id -> cantidad reducida
+        fecha_actualizacion: Fecha escrita por el UPDATE
+        cantidades (dict): id -> cantidad que dejó el UPDATE
+    """
+    if not habilitada():
+        return
+
+    def aplicar():
+        for pk, cantidad in reducciones.items():
+            try:
+                if cache.decr(_clave_cantidad(pk), cantidad) < 0:
+                    eliminar([pk])
+            except ValueError:
+                # Un lector pudo haber leído la cantidad anterior y estar por
+                # guardarla: la cantidad confirmada ocupa la clave antes
+                cache.set(_clave_cantidad(pk), cantidades[pk], obtener_timeout())
+        cache.set_many(
+            {_clave_fecha(pk): fecha_actualizacion for pk in reducciones}, obtener_timeout()
+        )
+
+    _al_confirmar(list(reducciones), aplicar)
+
+
+def fijar_cantidad(ids, cantidad, fecha_actualizacion):
+    """Fija la cantidad de las entradas existentes (al confirmar)"""
+    if not habilitada():
+        return
+
+    def aplicar():
+        existentes = _en_cache(ids)
+        entradas = {_clave_cantidad(pk): cantidad for pk in existentes}
+        entradas.update({_clave_fecha(pk): fecha_actualizacion for pk in existentes})
+        cache.set_many(entradas, obtener_timeout())
+
+    _al_confirmar(ids, aplicar)
@@ -0,0 +1,583 @@
+"""
+Cache de respuestas de los listados de productos.
+
+Las respuestas del listado y de los filtros por categoría, marca y sin stock
+se guardan en dos niveles:
+
+1. Una cache LRU en la memoria de cada proceso (sin leer ni deserializar
+   la respuesta de la cache compartida para las combinaciones más
+   solicitadas; las versiones de la clave sí se leen siempre de la cache
+   compartida, en una sola consulta).
+2. La cache compartida de Django (CACHES), común a todos los procesos.
+
+La invalidación es por versiones: la clave de cada respuesta incluye la
+versión de los filtros de los que depende (el valor de categoria y/o marca
+de la petición, o la versión global si no filtra por ninguno). Al escribir
+un producto se incrementan solo las versiones de los filtros registrados
+que coinciden con su categoría y marca (anteriores y nuevas), con la misma
+semántica de "contiene" que usan las consultas. Las entradas con versiones
+viejas simplemente dejan de consultarse y expiran.
+
+El registro de filtros es acotado: cada dimensión tiene
+PRODUCTOS_CACHE_RESPUESTAS_FILTROS posiciones (según el hash del valor),
+con expiración. La marca de creación de la posición forma parte de la
+clave, así que si la posición expira o se expulsa, las respuestas que
+dependían de ella dejan de consultarse. Un filtro cuya posición está
+ocupada por otro valor depende de la versión global, que cambia con cada
+escritura.
+
+Cuando una clave muy solicitada no está en cache, solo un proceso calcula
+la respuesta (cerrojo en la cache compartida) y el resto espera a que se
+guarde, en lugar de ejecutar todos la misma consulta a la vez.
+
+Los clientes fijados a la base primaria tras escribir (api_productos.replicas)
+no usan la cache: una entrada recién llenada desde una réplica atrasada
+podría no incluir todavía su escritura. Por lo mismo, durante
+PRODUCTOS_REPLICAS_VENTANA segundos después de invalidar una versión, las
+respuestas que dependen de ella y se leyeron de una réplica se entregan
+pero no se guardan (con la versión nueva guardarían datos anteriores a la
+escritura); solo las llenan las lecturas de la primaria o las posteriores
+a la ventana.
+"""
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from api_productos.replicas import (
+    fijada_a_primaria, lectura_en_replica, obtener_replicas, obtener_ventana
+)
+from .condicionales import Validadores
+from .texto import normalizar
+
+
+PREFIJO = 'productos:respuestas'
+
+# Filtros de texto por los que se versionan las respuestas
+DIMENSIONES = ('categoria', 'marca')
+
+# Versión de las respuestas que no filtran por categoría ni por marca
+GLOBAL = 'todos'
+
+# Versión de la que dependen todas las respuestas (invalidación completa)
+EPOCA = 'epoca'
+
+# Segundos que se mantiene el cerrojo mientras se calcula una respuesta
+TIEMPO_CERROJO = 10
+
+# Segundos que se espera a que otro proceso termine de calcular la respuesta
+ESPERA_MAXIMA = 2
+
+INTERVALO_ESPERA = 0.02
+
+
+def habilitada():
+    """Indica si la cache de respuestas está activa"""
+    return getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS', True)
+
+
+def obtener_timeout():
+    """Segundos de vida de cada respuesta guardada"""
+    return getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS_TIMEOUT', 60)
+
+
+def obtener_capacidad_registro():
+    """Posiciones del registro de filtros por dimensión"""
+    return max(1, getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS_FILTROS', 256))
+
+
+def obtener_timeout_registro():
+    """Segundos de vida de los registros y versiones de filtros (nunca menos que las respuestas)"""
+    return max(
+        getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS_REGISTRO_TIMEOUT', 3600),
+        obtener_timeout()
+    )
+
+
+class CacheLRU:
+    """
+    Cache LRU en memoria del proceso, con expiración por entrada.
+
+    Es segura entre hilos. Con tamano 0 no guarda nada.
+    """
+
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el valor vigente de la clave o None"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, timeout):
+        """Guarda el valor descartando la entrada menos usada si está llena"""
+        if self.tamano <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = (valor, time.monotonic() + timeout)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+_lru = None
+
+
+def obtener_lru():
+    """Cache LRU del proceso (PRODUCTOS_CACHE_RESPUESTAS_LRU entradas)"""
+    global _lru
+    tamano = getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS_LRU', 1000)
+    if _lru is None or _lru.tamano != tamano:
+        _lru = CacheLRU(tamano)
+    return _lru
+
+
+def _resumen(valor):
+    return hashlib.sha1(valor.encode('utf-8')).hexdigest()
+
+
+def _clave_version(dimension, valor=''):
+    return f'{PREFIJO}:v:{dimension}:{_resumen(valor)}'
+
+
+def _clave_reciente(clave_version):
+    return f'{clave_version}:reciente'
+
+
+def _clave_posicion(dimension, valor):
+    posicion = int(_resumen(valor), 16) % obtener_capacidad_registro()
+    return f'{PREFIJO}:filtros:{dimension}:{posicion}'
+
+
+def dependencias(categoria=None, marca=None):
+    """
+    Versiones de las que depende una respuesta según sus filtros de texto.
+
+    Args:
+        categoria (str): Filtro de categoría de la petición (o None)
+        marca (str): Filtro de marca de la petición (o None)
+
+    Returns:
+        list: Pares (dimensión, valor normalizado)
+    """
+    resultado = [(EPOCA, '')]
+    filtros = {'categoria': categoria, 'marca': marca}
+    for dimension in DIMENSIONES:
+        if filtros[dimension]:
+            resultado.append((dimension, normalizar(filtros[dimension])))
+    if len(resultado) == 1:
+        resultado.append((GLOBAL, ''))
+    return resultado
+
+
+def _registrar_filtro(posicion, valor, registro):
+    """
+    Ocupa la posición del registro para un valor de filtro, si está libre.
+
+    Args:
+        posicion (str): Clave de la posición (ver _clave_posicion)
+        valor (str): Valor normalizado del filtro
+        registro (tuple): (valor, marca) leído de la posición, o None
+
+    Returns:
+        int: Marca de creación del registro, o None si la posición está
+            ocupada por otro valor
+    """
+    if registro is None:
+        registro = (valor, time.time_ns())
+        if not cache.add(posicion, registro, timeout=obtener_timeout_registro()):
+            registro = cache.get(posicion)
+    return _marca(valor, registro)
+
+
+async def _aregistrar_filtro(posicion, valor, registro):
+    """Versión async de _registrar_filtro"""
+    if registro is None:
+        registro = (valor, time.time_ns())
+        if not await cache.aadd(posicion, registro, timeout=obtener_timeout_registro()):
+            registro = await cache.aget(posicion)
+    return _marca(valor, registro)
+
+
+def _marca(valor, registro):
+    if registro is None or registro[0] != valor:
+        return None
+    return registro[1]
+
+
+def filtros_registrados(dimension):
+    """Valores de filtro registrados para una dimensión"""
+    claves = [
+        f'{PREFIJO}:filtros:{dimension}:{posicion}'
+        for posicion in range(obtener_capacidad_registro())
+    ]
+    return [valor for valor, _ in cache.get_many(claves).values()]
+
+
+def versiones(dependencias):
+    """
+    Lee las versiones actuales de las dependencias de una respuesta.
+
+    Las versiones ausentes se inicializan con la hora actual en nanosegundos,
+    de modo que una versión expulsada de la cache nunca vuelve a coincidir
+    con respuestas guardadas antes. Los filtros de texto agregan la marca de
+    su registro; si su posición está ocupada por otro valor, la respuesta
+    depende también de la versión global.
+
+    Returns:
+        tuple: (versiones y marcas que identifican la respuesta, bool
+            indicando si alguna versión se invalidó dentro de la ventana de
+            las réplicas)
+    """
+    claves, posiciones = _claves_versiones(dependencias)
+    encontradas = cache.get_many(claves + list(posiciones) + _claves_recientes(claves))
+
+    marcas = [
+        _registrar_filtro(posicion, valor, encontradas.get(posicion))
+        for posicion, valor in posiciones.items()
+    ]
+    if None not in marcas:
+        claves = claves[:len(dependencias)]
+
+    resultado = []
+    for clave in claves:
+        version = encontradas.get(clave)
+        if version is None:
+            cache.add(clave, time.time_ns(), timeout=_timeout_version(clave))
+            version = cache.get(clave)
+        resultado.append(version)
+    return resultado + marcas, _hay_recientes(claves, encontradas)
+
+
+async def aversiones(dependencias):
+    """Versión async de versiones"""
+    claves, posiciones = _claves_versiones(dependencias)
+    encontradas = await cache.aget_many(
+        claves + list(posiciones) + _claves_recientes(claves)
+    )
+
+    marcas = [
+        await _aregistrar_filtro(posicion, valor, encontradas.get(posicion))
+        for posicion, valor in posiciones.items()
+    ]
+    if None not in marcas:
+        claves = claves[:len(dependencias)]
+
+    resultado = []
+    for clave in claves:
+        version = encontradas.get(clave)
+        if version is None:
+            await cache.aadd(clave, time.time_ns(), timeout=_timeout_version(clave))
+            version = await cache.aget(clave)
+        resultado.append(version)
+    return resultado + marcas, _hay_recientes(claves, encontradas)
+
+
+def _claves_versiones(dependencias):
+    """
+    Claves de las versiones de las dependencias (más la global, por si algún
+    filtro no consigue posición) y de las posiciones de sus filtros.
+    """
+    claves = [_clave_version(dimension, valor) for dimension, valor in dependencias]
+    posiciones = {
+        _clave_posicion(dimension, valor): valor
+        for dimension, valor in dependencias if dimension in DIMENSIONES
+    }
+    if posiciones:
+        claves.append(_clave_version(GLOBAL))
+    return claves, posiciones
+
+
+def _claves_recientes(claves):
+    """Marcas de invalidación reciente de las versiones (solo con réplicas)"""
+    if not obtener_replicas():
+        return []
+    return [_clave_reciente(clave) for clave in claves]
+
+
+def _hay_recientes(claves, encontradas):
+    return any(_clave_reciente(clave) in encontradas for clave in claves)
+
+
+def _timeout_version(clave):
+    """Las versiones de los filtros expiran con el registro; la global y la época no"""
+    if clave in (_clave_version(GLOBAL), _clave_version(EPOCA)):
+        return None
+    return obtener_timeout_registro()
+
+
+def _incrementar(claves):
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.add(clave, time.time_ns(), timeout=_timeout_version(clave))
+
+    # Mientras las réplicas puedan no tener la escritura, las lecturas de
+    # una réplica no llenan las respuestas de estas versiones
+    ventana = obtener_ventana()
+    if obtener_replicas() and ventana > 0:
+        cache.set_many({_clave_reciente(clave): True for clave in claves}, ventana)
+
+
+def invalidar(productos):
+    """
+    Invalida las respuestas que pueden incluir a los productos indicados.
+
+    Args:
+        productos: Iterable de diccionarios con 'categoria' y 'marca'
+            (valores anteriores y nuevos de los productos escritos)
+    """
+    valores = {dimension: set() for dimension in DIMENSIONES}
+    for producto in productos:
+        for dimension in DIMENSIONES:
+            if producto.get(dimension) is not None:
+                valores[dimension].add(normalizar(producto[dimension]))
+
+    claves = [_clave_version(GLOBAL)]
+    for dimension in DIMENSIONES:
+        if not valores[dimension]:
+            continue
+        for filtro in filtros_registrados(dimension):
+            if any(filtro in valor for valor in valores[dimension]):
+                claves.append(_clave_version(dimension, filtro))
+    _incrementar(claves)
+
+
+def invalidar_todo():
+    """Invalida todas las respuestas guardadas"""
+    _incrementar([_clave_version(EPOCA)])
+
+
+def clave_respuesta(nombre, parametros, dependencias):
+    """
+    Clave de una respuesta: vista, parámetros y versiones de sus dependencias.
+
+    Args:
+        nombre (str): Identificador de la vista o acción
+        parametros: Pares (parámetro, valor) de la petición
+        dependencias (list): Resultado de dependencias()
+
+    Returns:
+        tuple: (clave para la cache, bool indicando si alguna dependencia se
+            invalidó dentro de la ventana de las réplicas)
+    """
+    return _clave_final(nombre, parametros, *versiones(dependencias))
+
+
+async def aclave_respuesta(nombre, parametros, dependencias):
+    """Versión async de clave_respuesta"""
+    return _clave_final(nombre, parametros, *await aversiones(dependencias))
+
+
+def _clave_final(nombre, parametros, versiones_actuales, reciente):
+    contenido = repr((nombre, sorted(parametros), versiones_actuales))
+    return f'{PREFIJO}:r:{_resumen(contenido)}', reciente
+
+
+def obtener_o_calcular(clave, calcular):
+    """
+    Obtiene una respuesta de la cache (LRU y luego compartida) o la calcula.
+
+    Si otro proceso ya la está calculando, espera hasta ESPERA_MAXIMA
+    segundos a que la guarde antes de calcularla por su cuenta.
+
+    Args:
+        clave (str): Clave de la respuesta
+        calcular: Función sin argumentos que retorna el valor a guardar, o
+            None si la respuesta no se debe guardar
+
+    Returns:
+        tuple: (valor, bool indicando si vino de la cache)
+    """
+    lru = obtener_lru()
+    valor = lru.obtener(clave)
+    if valor is not None:
+        return valor, True
+
+    timeout = obtener_timeout()
+    valor = cache.get(clave)
+    if valor is not None:
+        lru.guardar(clave, valor, timeout)
+        return valor, True
+
+    cerrojo = f'{clave}:calculando'
+    if not cache.add(cerrojo, True, timeout=TIEMPO_CERROJO):
+        limite = time.monotonic() + ESPERA_MAXIMA
+        while time.monotonic() < limite and cache.get(cerrojo):
+            time.sleep(INTERVALO_ESPERA)
+            valor = cache.get(clave)
+            if valor is not None:
+                lru.guardar(clave, valor, timeout)
+                return valor, True
+        return calcular(), False
+
+    try:
+        valor = calcular()
+        if valor is not None:
+            cache.set(clave, valor, timeout)
+            lru.guardar(clave, valor, timeout)
+    finally:
+        cache.delete(cerrojo)
+    return valor, False
+
+
+async def aobtener_o_calcular(clave, calcular):
+    """
+    Versión async de obtener_o_calcular.
+
+    Args:
+        clave (str): Clave de la respuesta
+        calcular: Función async sin argumentos que retorna el valor a
+            guardar, o None si la respuesta no se debe guardar
+
+    Returns:
+        tuple: (valor, bool indicando si vino de la cache)
+    """
+    lru = obtener_lru()
+    valor = lru.obtener(clave)
+    if valor is not None:
+        return valor, True
+
+    timeout = obtener_timeout()
+    valor = await cache.aget(clave)
+    if valor is not None:
+        lru.guardar(clave, valor, timeout)
+        return valor, True
+
+    cerrojo = f'{clave}:calculando'
+    if not await cache.aadd(cerrojo, True, timeout=TIEMPO_CERROJO):
+        limite = time.monotonic() + ESPERA_MAXIMA
+        while time.monotonic() < limite and await cache.aget(cerrojo):
+            await asyncio.sleep(INTERVALO_ESPERA)
+            valor = await cache.aget(clave)
+            if valor is not None:
+                lru.guardar(clave, valor, timeout)
+                return valor, True
+        return await calcular(), False
+
+    try:
+        valor = await calcular()
+        if valor is not None:
+            await cache.aset(clave, valor, timeout)
+            lru.guardar(clave, valor, timeout)
+    finally:
+        await cache.adelete(cerrojo)
+    return valor, False
+
+
+def _argumentos_clave(request, kwargs):
+    """Nombre, parámetros y dependencias que identifican la respuesta"""
+    parametros = request.query_params
+    return (
+        request.path,
+        list(parametros.lists()),
+        dependencias(
+            kwargs.get('categoria', parametros.get('categoria')),
+            kwargs.get('marca', parametros.get('marca')),
+        )
+    )
+
+
+def _valor_a_guardar(vista, respuesta, reciente):
+    """
+    Datos y validadores de una respuesta 200, o None si no se guarda (entre
+    ellas, las leídas de una réplica poco después de invalidar la versión)
+    """
+    validadores = getattr(vista, 'validadores', None)
+    if respuesta.status_code != 200 or validadores is None:
+        return None
+    if reciente and lectura_en_replica():
+        return None
+    return respuesta.data, validadores.etag, validadores.ultima_modificacion
+
+
+def _respuesta_guardada(vista, valor):
+    """Respuesta (o 304) a partir de un valor leído de la cache"""
+    datos, etag, ultima_modificacion = valor
+    no_modificada = vista.verificar_vigencia(Validadores(etag, ultima_modificacion))
+    if no_modificada is not None:
+        return no_modificada
+    return Response(datos)
+
+
+def respuesta_en_cache(metodo):
+    """
+    Decorador para las acciones de lectura de ProductoViewSet.
+
+    Guarda los datos de las respuestas 200 junto con sus validadores (ETag y
+    Last-Modified), de modo que las peticiones condicionales también se
+    resuelven desde la cache. La clave depende de la ruta, los parámetros de
+    consulta y las versiones de los filtros categoria/marca.
+
+    También acepta métodos async (vistas de views_async), en cuyo caso la
+    cache se consulta con la API async de Django.
+    """
+    if asyncio.iscoroutinefunction(metodo):
+        return _respuesta_en_cache_async(metodo)
+
+    @functools.wraps(metodo)
+    def envoltura(vista, request, *args, **kwargs):
+        if not habilitada() or fijada_a_primaria(request):
+            return metodo(vista, request, *args, **kwargs)
+
+        clave, reciente = clave_respuesta(*_argumentos_clave(request, kwargs))
+        respuesta = None
+
+        def calcular():
+            nonlocal respuesta
+            respuesta = metodo(vista, request, *args, **kwargs)
+            return _valor_a_guardar(vista, respuesta, reciente)
+
+        valor, _ = obtener_o_calcular(clave, calcular)
+        if respuesta is not None:
+            return respuesta
+        return _respuesta_guardada(vista, valor)
+
+    return envoltura
+
+
+def _respuesta_en_cache_async(metodo):
+    """Variante async de respuesta_en_cache"""
+    @functools.wraps(metodo)
+    async def envoltura(vista, request, *args, **kwargs):
+        if not habilitada() or fijada_a_primaria(request):
+            return await metodo(vista, request, *args, **kwargs)
+
+        clave, reciente = await aclave_respuesta(*_argumentos_clave(request, kwargs))
+        respuesta = None
+
+        async def calcular():
+            nonlocal respuesta
+            respuesta = await metodo(vista, request, *args, **kwargs)
+            return _valor_a_guardar(vista, respuesta, reciente)
+
+        valor, _ = await aobtener_o_calcular(clave, calcular)
+        if respuesta is not None:
+            return respuesta
+        return _respuesta_guardada(vista, valor)
+
+    return envoltura
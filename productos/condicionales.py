@@ -0,0 +1,138 @@
+"""
+Validadores para peticiones condicionales (ETag / Last-Modified).
+
+Los listados se identifican con una huella barata del conjunto filtrado:
+la última fecha_actualizacion y el número de filas, obtenidos con una sola
+consulta agregada. Cualquier alta, baja o modificación que pase por el ORM
+cambia alguno de los dos valores, así que el cliente puede reutilizar su
+copia mientras la huella no cambie.
+
+La huella solo se calcula cuando el listado necesita de todas formas el
+total exacto (conteo exacto por número de página): la misma consulta trae el
+total. En modo cursor y con las estrategias cache y estimado, que existen
+para no contar, los validadores se arman con las filas de la propia página
+(de_pagina), sin consultas adicionales.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def huella(queryset):
+    """
+    Calcula la huella de un conjunto de productos.
+
+    Args:
+        queryset: QuerySet filtrado de productos
+
+    Returns:
+        tuple: (última fecha_actualizacion o None si está vacío, total de filas)
+    """
+    datos = queryset.order_by().aggregate(
+        ultima=Max('fecha_actualizacion'), total=Count('pk')
+    )
+    return datos['ultima'], datos['total']
+
+
+async def ahuella(queryset):
+    """Versión async de huella"""
+    datos = await queryset.order_by().aaggregate(
+        ultima=Max('fecha_actualizacion'), total=Count('pk')
+    )
+    return datos['ultima'], datos['total']
+
+
+def calcular_etag(*partes):
+    """
+    Genera un ETag entrecomillado a partir de los valores que identifican
+    la versión de un recurso.
+
+    Args:
+        *partes: Valores que determinan el contenido (fecha, total, id, ...)
+
+    Returns:
+        str: ETag con comillas, listo para la cabecera
+    """
+    contenido = '|'.join(str(parte) for parte in partes)
+    return quote_etag(hashlib.sha1(contenido.encode('utf-8')).hexdigest())
+
+
+class Validadores:
+    """ETag y fecha de última modificación de una respuesta"""
+
+    def __init__(self, etag, ultima_modificacion=None):
+        self.etag = etag
+        self.ultima_modificacion = ultima_modificacion
+
+    @classmethod
+    def de_producto(cls, producto):
+        """
+        Validadores de un producto a partir de su fecha_actualizacion.
+
+        El ETag incluye también la cantidad: la cache de objetos aplica las
+        reducciones de stock concurrentes sin un orden garantizado de fechas.
+        """
+        return cls(
+            calcular_etag(
+                producto.pk, producto.fecha_actualizacion.isoformat(), producto.cantidad
+            ),
+            producto.fecha_actualizacion
+        )
+
+    @classmethod
+    def de_conjunto(cls, ultima, total):
+        """Validadores de un listado a partir de su huella"""
+        return cls(
+            calcular_etag(ultima.isoformat() if ultima else '', total),
+            ultima
+        )
+
+    @classmethod
+    def de_pagina(cls, filas, paginacion):
+        """
+        Validadores de una página a partir de las filas ya leídas.
+
+        El ETag cubre el id y la fecha_actualizacion de cada fila y los datos
+        de paginación (cursores, total). No se envía Last-Modified: una baja
+        dentro de la página no adelanta la fecha máxima de las filas.
+
+        Args:
+            filas (list): Diccionarios de values() con id y fecha_actualizacion
+            paginacion (dict): Datos de paginación de la respuesta
+        """
+        return cls(calcular_etag(
+            *(f"{fila['id']}:{fila['fecha_actualizacion'].isoformat()}" for fila in filas),
+            *sorted(paginacion.items())
+        ))
+
+    @property
+    def timestamp(self):
+        """Última modificación en segundos desde epoch (o None)"""
+        if self.ultima_modificacion is None:
+            return None
+        return int(self.ultima_modificacion.timestamp())
+
+    def respuesta_no_modificada(self, request):
+        """
+        Evalúa If-None-Match / If-Modified-Since de la petición.
+
+        Returns:
+            HttpResponse: Respuesta 304 si la copia del cliente sigue vigente
+                (412 si falla una precondición), o None si hay que generar
+                la respuesta completa
+        """
+        respuesta = get_conditional_response(
+            request, etag=self.etag, last_modified=self.timestamp
+        )
+        if respuesta is not None and respuesta.status_code == 304:
+            self.aplicar(respuesta)
+        return respuesta
+
+    def aplicar(self, response):
+        """Agrega las cabeceras ETag y Last-Modified a la respuesta"""
+        response.headers.setdefault('ETag', self.etag)
+        if self.timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(self.timestamp))
+        return response
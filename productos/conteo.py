@@ -0,0 +1,212 @@
+"""
+Estrategias de conteo para el bloque de paginación de los listados.
+
+- exacto: COUNT(*) sobre el queryset filtrado (comportamiento original).
+- cache: COUNT(*) guardado en la cache por combinación de filtros. Las
+  entradas se invalidan en bloque cuando se escribe cualquier producto.
+- estimado: número de filas según las estadísticas de la tabla. Solo se usa
+  en listados sin filtros; con filtros se recurre al conteo exacto.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections, router
+
+from .models import Producto
+
+
+EXACTO = 'exacto'
+CACHE = 'cache'
+ESTIMADO = 'estimado'
+
+ESTRATEGIAS = (EXACTO, CACHE, ESTIMADO)
+
+CLAVE_VERSION = 'productos:conteo:version'
+
+
+def obtener_estrategia(valor=None):
+    """
+    Determina la estrategia de conteo a usar.
+
+    Args:
+        valor (str): Estrategia solicitada en la petición (puede ser None)
+
+    Returns:
+        str: Estrategia válida; si no se indica, la configurada en settings
+    """
+    if valor in ESTRATEGIAS:
+        return valor
+    return getattr(settings, 'PRODUCTOS_CONTEO', EXACTO)
+
+
+def _version():
+    """Versión actual de los conteos en cache"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar_conteos():
+    """Invalida todos los conteos guardados en cache incrementando la versión"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+
+
+async def _aversion():
+    """Versión actual de los conteos en cache (versión async)"""
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        await cache.aadd(CLAVE_VERSION, 1, timeout=None)
+        version = await cache.aget(CLAVE_VERSION, 1)
+    return version
+
+
+def _clave_cache(queryset, tipo='conteo', version=None):
+    """Clave de cache para la combinación de filtros del queryset"""
+    if version is None:
+        version = _version()
+    consulta = str(queryset.order_by().query).encode('utf-8')
+    return f'productos:{tipo}:{version}:{hashlib.sha1(consulta).hexdigest()}'
+
+
+def _obtener_timeout():
+    return getattr(settings, 'PRODUCTOS_CONTEO_CACHE_TIMEOUT', 300)
+
+
+def calcular_en_cache(queryset, tipo, calcular):
+    """
+    Guarda en cache un valor derivado de la combinación de filtros del
+    queryset. Se invalida junto con los conteos (invalidar_conteos).
+
+    Args:
+        queryset: QuerySet filtrado de productos
+        tipo (str): Nombre del valor, forma parte de la clave
+        calcular: Función que recibe el queryset y retorna el valor
+
+    Returns:
+        El valor guardado o recién calculado
+    """
+    clave = _clave_cache(queryset, tipo)
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular(queryset)
+        cache.set(clave, valor, _obtener_timeout())
+    return valor
+
+
+async def acalcular_en_cache(queryset, tipo, calcular):
+    """
+    Versión async de calcular_en_cache.
+
+    Args:
+        queryset: QuerySet filtrado de productos
+        tipo (str): Nombre del valor, forma parte de la clave
+        calcular: Función async que recibe el queryset y retorna el valor
+
+    Returns:
+        El valor guardado o recién calculado
+    """
+    clave = _clave_cache(queryset, tipo, await _aversion())
+    valor = await cache.aget(clave)
+    if valor is None:
+        valor = await calcular(queryset)
+        await cache.aset(clave, valor, _obtener_timeout())
+    return valor
+
+
+def _contar_en_cache(queryset):
+    """Conteo exacto guardado en cache por combinación de filtros"""
+    return calcular_en_cache(queryset, 'conteo', lambda consulta: consulta.count())
+
+
+def estimar_filas(modelo=Producto):
+    """
+    Obtiene el número aproximado de filas de la tabla según sus estadísticas.
+
+    Args:
+        modelo: Modelo cuya tabla se quiere estimar
+
+    Returns:
+        int: Número estimado de filas, o None si el motor no lo soporta
+    """
+    conexion = connections[router.db_for_read(modelo)]
+    tabla = modelo._meta.db_table
+
+    if conexion.vendor == 'mysql':
+        sql = (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        )
+    elif conexion.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, [tabla])
+        fila = cursor.fetchone()
+
+    if not fila or fila[0] is None or fila[0] < 0:
+        return None
+    return int(fila[0])
+
+
+def contar(queryset, estrategia=EXACTO):
+    """
+    Cuenta los productos del queryset según la estrategia indicada.
+
+    Args:
+        queryset: QuerySet filtrado de productos
+        estrategia (str): Una de ESTRATEGIAS
+
+    Returns:
+        tuple: (total, bool indicando si el total es exacto)
+    """
+    if estrategia == ESTIMADO and not queryset.query.where:
+        total = estimar_filas(queryset.model)
+        if total is not None:
+            return total, False
+    elif estrategia == CACHE:
+        return _contar_en_cache(queryset), True
+
+    return queryset.count(), True
+
+
+async def acontar(queryset, estrategia=EXACTO):
+    """
+    Versión async de contar.
+
+    La estimación consulta las estadísticas del motor con SQL directo, que
+    el ORM async no ofrece, por lo que se ejecuta en un hilo.
+    """
+    if estrategia == ESTIMADO and not queryset.query.where:
+        total = await sync_to_async(estimar_filas)(queryset.model)
+        if total is not None:
+            return total, False
+    elif estrategia == CACHE:
+        total = await acalcular_en_cache(queryset, 'conteo', lambda consulta: consulta.acount())
+        return total, True
+
+    return await queryset.acount(), True
+
+
+class PaginadorConteo(Paginator):
+    """
+    Paginador que usa un total calculado previamente en lugar de COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, total, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.total = total
+
+    @property
+    def count(self):
+        """Total de elementos entregado por la estrategia de conteo"""
+        return self.total
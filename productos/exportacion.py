@@ -0,0 +1,104 @@
+"""
+Exportación del catálogo en streaming (NDJSON, CSV o un documento JSON).
+
+Las filas se leen en lotes keyset sobre values() y se convierten con el
+serializador rápido equivalente a ProductoSerializer, de modo que cada fila exportada es
+igual a la representación de la API y la memoria se mantiene constante sin
+importar cuántas filas se exporten.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+from .paginacion import iterar_por_lotes
+from .serializers import ProductoSerializer, obtener_valores_serializer
+
+
+CAMPOS_EXPORTACION = [
+    'id',
+    'nombre',
+    'categoria',
+    'marca',
+    'precio',
+    'cantidad',
+    'fecha_creacion',
+    'fecha_actualizacion',
+]
+
+
+class _Eco:
+    """Objeto tipo archivo que retorna lo escrito (para csv.writer en streaming)"""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_exportacion(queryset, orden):
+    """
+    Genera las filas a exportar como diccionarios ya representados.
+
+    Args:
+        queryset: QuerySet filtrado de productos
+        orden (str): Campo de ordenamiento activo
+
+    Returns:
+        iterator: Diccionarios con los CAMPOS_EXPORTACION
+    """
+    serializador = obtener_valores_serializer(ProductoSerializer, tuple(CAMPOS_EXPORTACION))
+    tamano_lote = getattr(settings, 'PRODUCTOS_EXPORTACION_LOTE', 2000)
+
+    filas = iterar_por_lotes(queryset.values(*serializador.columnas), orden, tamano_lote)
+    return map(serializador.convertir, filas)
+
+
+def exportar_ndjson(filas):
+    """Genera una línea JSON por fila"""
+    for fila in filas:
+        yield json.dumps(fila, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def exportar_json(filas, encabezado=None, clave='productos', filas_por_parte=500):
+    """
+    Genera por partes un documento JSON con la forma de las respuestas de la
+    API: {**encabezado, clave: [filas...], "total": n}.
+
+    Args:
+        filas: Iterable de diccionarios ya representados
+        encabezado (dict): Datos que preceden a la lista
+        clave (str): Nombre de la lista
+        filas_por_parte (int): Filas que se agrupan en cada parte enviada
+    """
+    codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    inicio = codificar(encabezado or {})[:-1]
+    separador = ',' if encabezado else ''
+    yield f'{inicio}{separador}{codificar(clave)}:['
+
+    total = 0
+    parte = []
+    for fila in filas:
+        parte.append(codificar(fila))
+        if len(parte) == filas_por_parte:
+            yield (',' if total else '') + ','.join(parte)
+            total += len(parte)
+            parte = []
+    if parte:
+        yield (',' if total else '') + ','.join(parte)
+        total += len(parte)
+
+    yield f'],"total":{total}}}'
+
+
+def exportar_csv(filas):
+    """Genera el encabezado y una línea CSV por fila"""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(CAMPOS_EXPORTACION)
+    for fila in filas:
+        yield escritor.writerow([fila[nombre] for nombre in CAMPOS_EXPORTACION])
+
+
+# Formato -> (generador, content type, extensión)
+FORMATOS = {
+    'ndjson': (exportar_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (exportar_csv, 'text/csv; charset=utf-8', 'csv'),
+}
@@ -0,0 +1,242 @@
+"""
+Facetas del catálogo: conteos por categoría, marca, stock y rango de precio.
+
+Con filtros, las facetas se calculan con GROUP BY sobre el conjunto filtrado.
+Sin filtros se leen de la tabla ResumenFaceta, que las señales mantienen al
+día aplicando la diferencia entre los valores anteriores y los nuevos de
+cada producto escrito (por ejemplo, un producto que pasa de la categoría A
+a la B resta 1 a A y suma 1 a B). Los incrementos son UPDATE ... SET
+total = total + n, por lo que escrituras concurrentes no se pisan.
+
+Si el resumen se desincroniza (datos cargados sin pasar por la aplicación
+o cambio de PRODUCTOS_FACETAS_RANGOS_PRECIO) se reconstruye con el comando
+recalcular_facetas.
+"""
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q
+
+from .models import Producto, ResumenFaceta
+
+
+CATEGORIA = 'categoria'
+MARCA = 'marca'
+STOCK = 'stock'
+PRECIO = 'precio'
+
+CON_STOCK = 'con_stock'
+SIN_STOCK = 'sin_stock'
+
+# Límites inferiores de los rangos de precio por defecto
+RANGOS_PRECIO = (0, 50, 100, 250, 500, 1000)
+
+
+def obtener_rangos():
+    """Límites inferiores de los rangos de precio (PRODUCTOS_FACETAS_RANGOS_PRECIO)"""
+    limites = getattr(settings, 'PRODUCTOS_FACETAS_RANGOS_PRECIO', RANGOS_PRECIO)
+    return sorted(Decimal(str(limite)) for limite in limites)
+
+
+def rango_precio(precio, rangos):
+    """
+    Rango al que pertenece un precio.
+
+    Args:
+        precio: Precio del producto
+        rangos (list): Resultado de obtener_rangos()
+
+    Returns:
+        str: Límite inferior del rango (los precios menores al primer
+            límite cuentan en el primer rango)
+    """
+    indice = max(bisect_right(rangos, Decimal(precio)) - 1, 0)
+    return str(rangos[indice])
+
+
+def claves(valores, rangos):
+    """
+    Facetas (dimensión, valor) en las que cuenta un producto.
+
+    Args:
+        valores (dict): Valores de Producto.CAMPOS_RASTREADOS; los campos
+            ausentes no aportan a su dimensión
+        rangos (list): Resultado de obtener_rangos()
+
+    Returns:
+        list: Pares (dimensión, valor)
+    """
+    resultado = []
+    for dimension in (CATEGORIA, MARCA):
+        if dimension in valores:
+            resultado.append((dimension, valores[dimension]))
+    if 'cantidad' in valores:
+        resultado.append((STOCK, CON_STOCK if valores['cantidad'] > 0 else SIN_STOCK))
+    if 'precio' in valores:
+        resultado.append((PRECIO, rango_precio(valores['precio'], rangos)))
+    return resultado
+
+
+def diferencias(anteriores, actuales):
+    """
+    Cambios en los conteos que produce una escritura.
+
+    Args:
+        anteriores: Diccionarios con los valores antes del cambio
+        actuales: Diccionarios con los valores después del cambio
+
+    Returns:
+        dict: (dimensión, valor) -> diferencia, sin las diferencias nulas
+    """
+    rangos = obtener_rangos()
+    cambios = Counter()
+    for valores in actuales:
+        cambios.update(claves(valores, rangos))
+    for valores in anteriores:
+        cambios.subtract(claves(valores, rangos))
+    return {clave: diferencia for clave, diferencia in cambios.items() if diferencia}
+
+
+def aplicar(cambios):
+    """
+    Aplica las diferencias al resumen en una transacción.
+
+    Las filas se actualizan en orden de clave para que escrituras
+    concurrentes no se bloqueen mutuamente; las que no existen se crean.
+
+    Args:
+        cambios (dict): Resultado de diferencias()
+    """
+    if not cambios:
+        return
+    ordenados = sorted(cambios.items())
+    with transaction.atomic(using=router.db_for_write(ResumenFaceta), savepoint=False):
+        faltantes = []
+        for (dimension, valor), diferencia in ordenados:
+            actualizadas = ResumenFaceta.objects.filter(
+                dimension=dimension, valor=valor
+            ).update(total=F('total') + diferencia)
+            if not actualizadas:
+                faltantes.append(((dimension, valor), diferencia))
+        if not faltantes:
+            return
+
+        # Otra transacción pudo crear la fila entre el UPDATE y el INSERT
+        ResumenFaceta.objects.bulk_create(
+            [ResumenFaceta(dimension=dimension, valor=valor)
+             for (dimension, valor), _ in faltantes],
+            ignore_conflicts=True
+        )
+        for (dimension, valor), diferencia in faltantes:
+            ResumenFaceta.objects.filter(
+                dimension=dimension, valor=valor
+            ).update(total=F('total') + diferencia)
+
+
+def contar_facetas(queryset):
+    """
+    Calcula las facetas de un conjunto de productos con GROUP BY.
+
+    Args:
+        queryset: QuerySet de productos (se ignora su ordenamiento)
+
+    Returns:
+        dict: (dimensión, valor) -> total
+    """
+    queryset = queryset.order_by()
+    conteos = {}
+    for dimension in (CATEGORIA, MARCA):
+        for fila in queryset.values(dimension).annotate(total=Count('pk')):
+            conteos[(dimension, fila[dimension])] = fila['total']
+
+    rangos = obtener_rangos()
+    agregados = {
+        CON_STOCK: Count('pk', filter=Q(cantidad__gt=0)),
+        SIN_STOCK: Count('pk', filter=Q(cantidad=0)),
+    }
+    for indice, desde in enumerate(rangos):
+        condicion = Q()
+        if indice:
+            condicion &= Q(precio__gte=desde)
+        if indice + 1 < len(rangos):
+            condicion &= Q(precio__lt=rangos[indice + 1])
+        agregados[f'precio_{indice}'] = Count('pk', filter=condicion or None)
+
+    fila = queryset.aggregate(**agregados)
+    conteos[(STOCK, CON_STOCK)] = fila[CON_STOCK]
+    conteos[(STOCK, SIN_STOCK)] = fila[SIN_STOCK]
+    for indice, desde in enumerate(rangos):
+        conteos[(PRECIO, str(desde))] = fila[f'precio_{indice}']
+    return conteos
+
+
+def leer_resumen():
+    """
+    Facetas de todo el catálogo leídas del resumen (una consulta).
+
+    Returns:
+        dict: (dimensión, valor) -> total
+    """
+    return {
+        (fila.dimension, fila.valor): fila.total
+        for fila in ResumenFaceta.objects.filter(total__gt=0)
+    }
+
+
+def recalcular():
+    """Reconstruye el resumen completo a partir de la tabla de productos"""
+    filas = [
+        ResumenFaceta(dimension=dimension, valor=valor, total=total)
+        for (dimension, valor), total in contar_facetas(Producto.objects.all()).items()
+        if total
+    ]
+    alias = router.db_for_write(ResumenFaceta)
+    opciones = {'update_conflicts': True, 'update_fields': ['total']}
+    if connections[alias].features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['dimension', 'valor']
+    with transaction.atomic(using=alias):
+        ResumenFaceta.objects.all().delete()
+        # Una escritura concurrente pudo volver a crear alguna fila
+        ResumenFaceta.objects.bulk_create(filas, **opciones)
+
+
+def formatear_facetas(conteos):
+    """
+    Estructura de la respuesta de la acción facetas.
+
+    Args:
+        conteos (dict): Resultado de contar_facetas() o leer_resumen()
+
+    Returns:
+        dict: Total, listas por categoría y marca (de mayor a menor),
+            productos con y sin stock y rangos de precio en orden
+    """
+    def valores(dimension):
+        filas = [
+            {'valor': valor, 'total': total}
+            for (nombre, valor), total in conteos.items()
+            if nombre == dimension and total > 0
+        ]
+        return sorted(filas, key=lambda fila: (-fila['total'], fila['valor']))
+
+    rangos = obtener_rangos()
+    precios = [
+        {
+            'desde': str(desde),
+            'hasta': str(rangos[indice + 1]) if indice + 1 < len(rangos) else None,
+            'total': conteos.get((PRECIO, str(desde)), 0),
+        }
+        for indice, desde in enumerate(rangos)
+    ]
+    con_stock = conteos.get((STOCK, CON_STOCK), 0)
+    sin_stock = conteos.get((STOCK, SIN_STOCK), 0)
+    return {
+        'total': con_stock + sin_stock,
+        'categorias': valores(CATEGORIA),
+        'marcas': valores(MARCA),
+        'stock': {CON_STOCK: con_stock, SIN_STOCK: sin_stock},
+        'precios': precios,
+    }
@@ -0,0 +1,63 @@
+"""
+Filtros de texto por categoría y marca.
+
+Los filtros comparan contra las columnas normalizadas (minúsculas y sin
+acentos) de Producto, que están indexadas. Hay tres modos de coincidencia:
+
+- exacto: igualdad con el valor normalizado (búsqueda directa en el índice)
+- prefijo: el valor empieza por el texto (LIKE 'texto%', usa el índice)
+- contiene: el valor contiene el texto en cualquier posición (LIKE
+  '%texto%'); recorre la tabla, por lo que solo se usa si se pide
+"""
+from django.conf import settings
+
+from .models import Producto
+from .texto import normalizar
+
+
+EXACTO = 'exacto'
+PREFIJO = 'prefijo'
+CONTIENE = 'contiene'
+
+MODOS = (EXACTO, PREFIJO, CONTIENE)
+
+# Las columnas ya están en minúsculas; las búsquedas sin distinción de
+# mayúsculas evitan el LIKE BINARY de MySQL, que no aprovecha el índice
+_BUSQUEDAS = {
+    EXACTO: 'exact',
+    PREFIJO: 'istartswith',
+    CONTIENE: 'icontains',
+}
+
+
+def obtener_modo(valor=None):
+    """
+    Determina el modo de coincidencia a usar.
+
+    Args:
+        valor (str): Modo solicitado en la petición (puede ser None)
+
+    Returns:
+        str: Modo válido; si no se indica, el configurado en settings
+    """
+    if valor in MODOS:
+        return valor
+    return getattr(settings, 'PRODUCTOS_COINCIDENCIA', PREFIJO)
+
+
+def filtrar_texto(queryset, campo, valor, modo=None):
+    """
+    Filtra el queryset por categoría o marca usando su columna normalizada.
+
+    Args:
+        queryset: QuerySet de productos
+        campo (str): 'categoria' o 'marca'
+        valor (str): Texto a buscar (se normaliza igual que la columna)
+        modo (str): exacto, prefijo o contiene (por defecto PRODUCTOS_COINCIDENCIA)
+
+    Returns:
+        QuerySet: QuerySet filtrado
+    """
+    columna = Producto.CAMPOS_NORMALIZADOS[campo]
+    busqueda = _BUSQUEDAS[obtener_modo(modo)]
+    return queryset.filter(**{f'{columna}__{busqueda}': normalizar(valor)})
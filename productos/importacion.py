@@ -0,0 +1,86 @@
+"""
+Lectura y validación de archivos de productos para la importación masiva.
+
+Los archivos se leen como flujo (una fila a la vez) y se validan en bloques
+con las mismas reglas que ProductoSerializer, de modo que los bloques se
+pueden repartir entre procesos trabajadores.
+"""
+import csv
+import json
+import os
+
+from .serializers import ProductoSerializer
+
+
+FORMATOS = ('csv', 'ndjson')
+
+
+def detectar_formato(ruta):
+    """Deduce el formato a partir de la extensión del archivo"""
+    extension = os.path.splitext(ruta)[1].lower().lstrip('.')
+    if extension in ('json', 'jsonl'):
+        return 'ndjson'
+    return extension if extension in FORMATOS else None
+
+
+def leer_filas(ruta, formato):
+    """
+    Lee el archivo como flujo.
+
+    Args:
+        ruta (str): Ruta del archivo
+        formato (str): 'csv' o 'ndjson'
+
+    Yields:
+        tuple: (número de fila de datos empezando en 1, diccionario o None si
+            la línea no se pudo interpretar)
+    """
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        if formato == 'csv':
+            for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+                yield numero, fila
+            return
+
+        numero = 0
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            numero += 1
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+
+
+def validar_bloque(filas):
+    """
+    Valida un bloque de filas con las reglas de ProductoSerializer.
+
+    Es una función de módulo para poder ejecutarse en procesos trabajadores.
+
+    Args:
+        filas (list): Pares (número de fila, diccionario)
+
+    Returns:
+        tuple: (lista de (número, datos validados), lista de (número, errores))
+    """
+    validos = []
+    errores = []
+    for numero, fila in filas:
+        if fila is None:
+            errores.append((numero, {'non_field_errors': ['Fila con formato inválido']}))
+            continue
+        serializer = ProductoSerializer(data=fila)
+        if serializer.is_valid():
+            validos.append((numero, dict(serializer.validated_data)))
+        else:
+            # Convertir ErrorDetail a tipos básicos para enviarlos entre procesos
+            errores.append((numero, json.loads(json.dumps(serializer.errors))))
+    return validos, errores
+
+
+def inicializar_trabajador():
+    """Prepara Django en los procesos trabajadores creados con spawn"""
+    import django
+    django.setup()
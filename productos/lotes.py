@@ -0,0 +1,296 @@
+"""
+Escritura de productos en lotes.
+
+Agrupa las filas en sentencias INSERT/UPDATE de varios registros y avisa a
+las estructuras derivadas (conteos, índice de búsqueda) mediante la señal
+productos_modificados, ya que bulk_create y bulk_update no disparan
+post_save.
+"""
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Producto
+from .signals import productos_modificados
+
+
+# Campos que se actualizan cuando un producto ya existe (upsert)
+CAMPOS_UPSERT = ['categoria', 'categoria_normalizada', 'precio', 'cantidad',
+                 'fecha_actualizacion']
+
+
+class ProductosNoEncontrados(Exception):
+    """
+    Excepción de la actualización atómica en lote cuando algún id no existe
+    (no se modifica ningún producto).
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+        super().__init__(f'Productos no encontrados: {", ".join(map(str, ids))}')
+
+
+def obtener_tamano_lote():
+    """Tamaño de lote configurado para las escrituras masivas"""
+    return getattr(settings, 'PRODUCTOS_TAMANO_LOTE', 500)
+
+
+def clave_natural(datos):
+    """Clave natural de un producto: (nombre, marca)"""
+    if isinstance(datos, dict):
+        return datos['nombre'], datos['marca']
+    return datos.nombre, datos.marca
+
+
+def _firma(producto):
+    return (producto.nombre, producto.marca, producto.categoria,
+            producto.precio, producto.cantidad)
+
+
+def _asignar_ids(productos, ultimo_pk_previo):
+    """
+    Asigna los ids a productos insertados con bulk_create.
+
+    En MySQL el INSERT de varias filas no retorna los ids generados, así que
+    se consultan las filas nuevas (id mayor al máximo previo) y se asocian
+    por su contenido.
+    """
+    pendientes = {}
+    for producto in productos:
+        pendientes.setdefault(_firma(producto), []).append(producto)
+
+    nuevos = (
+        Producto.objects
+        .filter(
+            pk__gt=ultimo_pk_previo,
+            nombre__in={p.nombre for p in productos},
+            marca__in={p.marca for p in productos},
+        )
+        .order_by('pk')
+        .only('pk', 'nombre', 'marca', 'categoria', 'precio', 'cantidad')
+    )
+    for fila in nuevos:
+        candidatos = pendientes.get(_firma(fila))
+        if candidatos:
+            candidatos.pop(0).pk = fila.pk
+
+
+def insertar_lote(productos):
+    """
+    Inserta un lote de productos con un solo INSERT y asigna sus ids.
+
+    Args:
+        productos (list): Instancias de Producto sin guardar
+
+    Returns:
+        list: Las mismas instancias con el id asignado
+    """
+    for producto in productos:
+        producto.actualizar_normalizados()
+    conexion = connections[router.db_for_write(Producto)]
+    if conexion.features.can_return_rows_from_bulk_insert:
+        return Producto.objects.bulk_create(productos)
+
+    ultimo_pk = Producto.objects.aggregate(maximo=Max('pk'))['maximo'] or 0
+    Producto.objects.bulk_create(productos)
+    _asignar_ids(productos, ultimo_pk)
+    return productos
+
+
+def crear_en_lotes(productos, tamano_lote=None, upsert=False):
+    """
+    Crea (o actualiza, con upsert) productos en lotes, una transacción por lote.
+
+    Con upsert, los productos cuya clave natural (nombre, marca) ya existe se
+    actualizan con un bulk_update en lugar de insertarse. Si la clave se
+    repite dentro de la misma carga, prevalece la última aparición.
+
+    Args:
+        productos (list): Instancias de Producto sin guardar
+        tamano_lote (int): Filas por sentencia (por defecto PRODUCTOS_TAMANO_LOTE)
+        upsert (bool): Actualizar los productos existentes por clave natural
+
+    Returns:
+        list: Pares (producto, creado) en el orden recibido; los duplicados
+            descartados por el upsert reciben el producto que prevaleció
+    """
+    tamano_lote = tamano_lote or obtener_tamano_lote()
+
+    if upsert:
+        ultimos = {clave_natural(p): p for p in productos}
+        unicos = list(ultimos.values())
+    else:
+        unicos = productos
+
+    creados = set()
+    ids = []
+    anteriores = []
+    for inicio in range(0, len(unicos), tamano_lote):
+        lote = unicos[inicio:inicio + tamano_lote]
+        with transaction.atomic():
+            nuevos = lote
+            if upsert:
+                nuevos, previos = _actualizar_existentes(lote)
+                anteriores.extend(previos)
+            insertar_lote(nuevos)
+        creados.update(id(p) for p in nuevos)
+        ids.extend(p.pk for p in lote if p.pk is not None)
+
+    if ids:
+        productos_modificados.send(
+            sender=Producto, ids=ids, anteriores=anteriores,
+            actuales=[p.valores_rastreados() for p in unicos if p.pk is not None]
+        )
+
+    if upsert:
+        return [(ultimos[clave_natural(p)], id(ultimos[clave_natural(p)]) in creados)
+                for p in productos]
+    return [(p, True) for p in productos]
+
+
+def _actualizar_existentes(lote):
+    """
+    Actualiza los productos del lote que ya existen por clave natural.
+
+    Returns:
+        tuple: (productos del lote que no existen y deben insertarse,
+            valores de Producto.CAMPOS_RASTREADOS de los actualizados antes
+            del cambio)
+    """
+    existentes = {}
+    consulta = Producto.objects.filter(
+        nombre__in={p.nombre for p in lote},
+        marca__in={p.marca for p in lote},
+    ).order_by('pk').only('pk', 'nombre', 'fecha_creacion', *Producto.CAMPOS_RASTREADOS)
+    for fila in consulta:
+        existentes.setdefault(clave_natural(fila), fila)
+
+    ahora = timezone.now()
+    actualizar = []
+    nuevos = []
+    anteriores = []
+    for producto in lote:
+        fila = existentes.get(clave_natural(producto))
+        if fila is None:
+            nuevos.append(producto)
+            continue
+        anteriores.append(fila.valores_originales)
+        producto.pk = fila.pk
+        producto.fecha_creacion = fila.fecha_creacion
+        producto.fecha_actualizacion = ahora
+        producto.actualizar_normalizados()
+        actualizar.append(producto)
+
+    if actualizar:
+        Producto.objects.bulk_update(actualizar, CAMPOS_UPSERT)
+    return nuevos, anteriores
+
+
+def actualizar_en_lotes(cambios, tamano_lote=None, atomico=False):
+    """
+    Actualiza parcialmente productos por id, en lotes.
+
+    Cada lote se lee con una consulta id__in (bloqueando las filas) y se
+    escribe con un bulk_update por combinación de campos modificados: solo
+    se escriben las columnas cuyo valor cambia, sus normalizadas y
+    fecha_actualizacion. Los productos sin cambios no se escriben.
+
+    Args:
+        cambios (list): Diccionarios con 'id' y los campos a modificar
+            (un elemento por id)
+        tamano_lote (int): Productos por lote (por defecto PRODUCTOS_TAMANO_LOTE)
+        atomico (bool): Una sola transacción para toda la carga; si algún id
+            no existe no se modifica ningún producto
+
+    Returns:
+        list: Estado de cada elemento en el orden recibido: 'actualizado',
+            'sin_cambios' o 'no_encontrado'
+
+    Raises:
+        ProductosNoEncontrados: En modo atómico, si algún id no existe
+    """
+    tamano_lote = tamano_lote or obtener_tamano_lote()
+    ahora = timezone.now()
+    estados = {}
+    campos = set()
+    anteriores = []
+    actualizados = []
+
+    with transaction.atomic() if atomico else nullcontext():
+        for inicio in range(0, len(cambios), tamano_lote):
+            with transaction.atomic(savepoint=False):
+                estados_lote, campos_lote, productos, previos = _actualizar_lote(
+                    cambios[inicio:inicio + tamano_lote], ahora
+                )
+            estados.update(estados_lote)
+            campos.update(campos_lote)
+            actualizados.extend(productos)
+            anteriores.extend(previos)
+
+        no_encontrados = [pk for pk, estado in estados.items() if estado == 'no_encontrado']
+        if atomico and no_encontrados:
+            transaction.set_rollback(True)
+
+    if atomico and no_encontrados:
+        raise ProductosNoEncontrados(no_encontrados)
+
+    if actualizados:
+        productos_modificados.send(
+            sender=Producto, ids=[p.pk for p in actualizados],
+            campos=sorted(campos | {'fecha_actualizacion'}), anteriores=anteriores,
+            actuales=[p.valores_rastreados() for p in actualizados]
+        )
+    return [estados[cambio['id']] for cambio in cambios]
+
+
+def _actualizar_lote(lote, ahora):
+    """
+    Aplica un lote de actualizaciones parciales.
+
+    Returns:
+        tuple: (estado por id, campos modificados, productos actualizados,
+            valores de Producto.CAMPOS_RASTREADOS de esos productos antes
+            del cambio)
+    """
+    cambios = {cambio['id']: cambio for cambio in lote}
+    columnas = {campo for cambio in lote for campo in cambio if campo != 'id'}
+    consulta = (
+        Producto.objects.select_for_update().filter(pk__in=cambios)
+        .order_by('pk').only('pk', *columnas, *Producto.CAMPOS_RASTREADOS)
+    )
+
+    estados = dict.fromkeys(cambios, 'no_encontrado')
+    grupos = {}
+    anteriores = []
+    for producto in consulta:
+        valores = cambios[producto.pk]
+        modificados = tuple(sorted(
+            campo for campo, valor in valores.items()
+            if campo != 'id' and getattr(producto, campo) != valor
+        ))
+        if not modificados:
+            estados[producto.pk] = 'sin_cambios'
+            continue
+        anteriores.append(producto.valores_originales)
+        for campo in modificados:
+            setattr(producto, campo, valores[campo])
+        producto.fecha_actualizacion = ahora
+        producto.actualizar_normalizados()
+        grupos.setdefault(modificados, []).append(producto)
+        estados[producto.pk] = 'actualizado'
+
+    actualizados = []
+    for modificados, productos in grupos.items():
+        normalizados = [
+            Producto.CAMPOS_NORMALIZADOS[campo] for campo in modificados
+            if campo in Producto.CAMPOS_NORMALIZADOS
+        ]
+        Producto.objects.bulk_update(
+            productos, [*modificados, *normalizados, 'fecha_actualizacion']
+        )
+        actualizados.extend(productos)
+    campos = {campo for modificados in grupos for campo in modificados}
+    return estados, campos, actualizados, anteriores
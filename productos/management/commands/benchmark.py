@@ -0,0 +1,34 @@
+from contextlib import nullcontext
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+from productos.benchmarks import BENCHMARKS, base_de_datos_temporal
+
+
+class Command(BaseCommand):
+    """
+    Ejecuta un benchmark de rendimiento sobre una base de datos de pruebas.
+    
+    Uso:
+        python manage.py benchmark stock --hilos 16 --operaciones 5000
+    """
+    
+    help = 'Ejecuta un benchmark de rendimiento de la app productos'
+    
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for nombre, ruta in BENCHMARKS.items():
+            modulo = import_module(ruta)
+            subparser = subparsers.add_parser(
+                nombre, help=(modulo.__doc__ or '').strip().splitlines()[0]
+            )
+            modulo.agregar_argumentos(subparser)
+    
+    def handle(self, *args, **options):
+        modulo = import_module(BENCHMARKS[options['benchmark']])
+        contexto = base_de_datos_temporal()
+        if not getattr(modulo, 'REQUIERE_BASE_DE_DATOS', True):
+            contexto = nullcontext()
+        with contexto:
+            modulo.ejecutar(options, self.stdout)
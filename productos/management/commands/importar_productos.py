@@ -0,0 +1,200 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from productos.importacion import (
+    FORMATOS,
+    detectar_formato,
+    inicializar_trabajador,
+    leer_filas,
+    validar_bloque,
+)
+from productos.lotes import insertar_lote
+from productos.models import Producto, ProgresoImportacion
+from productos.signals import productos_modificados
+
+
+class Command(BaseCommand):
+    """
+    Importa productos desde un archivo CSV o NDJSON.
+
+    El archivo se lee como flujo y se procesa en bloques: cada bloque se
+    valida con las reglas de ProductoSerializer (opcionalmente en procesos
+    trabajadores) y se inserta en una transacción con INSERT de varias
+    filas. En esa misma transacción se envía productos_modificados (índice
+    de búsqueda y facetas) y se guarda el progreso (ProgresoImportacion),
+    de modo que con --reanudar la importación continúa exactamente desde el
+    último bloque confirmado después de un fallo.
+
+    Uso:
+        python manage.py importar_productos proveedor.csv --trabajadores 4
+        python manage.py importar_productos proveedor.csv --reanudar
+    """
+
+    help = 'Importa productos desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV o NDJSON')
+        parser.add_argument(
+            '--formato', choices=FORMATOS,
+            help='Formato del archivo (por defecto según la extensión)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=2000,
+            help='Filas por sentencia INSERT'
+        )
+        parser.add_argument(
+            '--lotes-por-transaccion', type=int, default=5,
+            help='Sentencias INSERT por transacción (tamaño del bloque)'
+        )
+        parser.add_argument(
+            '--trabajadores', type=int, default=0,
+            help='Procesos para validar en paralelo (0: en el proceso principal)'
+        )
+        parser.add_argument(
+            '--reanudar', action='store_true',
+            help='Continuar desde el último bloque confirmado'
+        )
+        parser.add_argument(
+            '--sin-indexar', action='store_true',
+            help='No actualizar el índice de búsqueda por bloque '
+                 '(ejecutar reindexar_busqueda al terminar)'
+        )
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+        formato = options['formato'] or detectar_formato(ruta)
+        if formato is None:
+            raise CommandError('No se pudo deducir el formato; use --formato')
+
+        self.ruta_errores = f'{ruta}.errores'
+        self.sin_indexar = options['sin_indexar']
+
+        archivo = os.path.abspath(ruta)
+        progreso = None
+        if options['reanudar']:
+            progreso = ProgresoImportacion.objects.filter(archivo=archivo).first()
+        if progreso is not None:
+            self.stdout.write(f'Reanudando después de la fila {progreso.filas}')
+            self._recortar_errores(progreso.filas)
+        else:
+            ProgresoImportacion.objects.filter(archivo=archivo).delete()
+            progreso = ProgresoImportacion(archivo=archivo)
+            if os.path.exists(self.ruta_errores):
+                os.remove(self.ruta_errores)
+
+        tamano_lote = options['lote']
+        tamano_bloque = tamano_lote * options['lotes_por_transaccion']
+        filas = islice(leer_filas(ruta, formato), progreso.filas, None)
+        bloques = iter(lambda: list(islice(filas, tamano_bloque)), [])
+
+        inicio = time.perf_counter()
+        filas_previas = progreso.filas
+        for bloque, (validos, errores) in self._validar(bloques, options['trabajadores']):
+            # Si el bloque no llega a confirmarse, --reanudar recorta sus errores
+            self._registrar_errores(errores)
+
+            progreso.filas = bloque[-1][0]
+            progreso.insertadas += len(validos)
+            progreso.invalidas += len(errores)
+            self._insertar(validos, tamano_lote, progreso)
+
+            segundos = time.perf_counter() - inicio
+            velocidad = (progreso.filas - filas_previas) / segundos if segundos else 0
+            self.stdout.write(
+                f"filas {progreso.filas} | insertadas {progreso.insertadas} | "
+                f"inválidas {progreso.invalidas} | {velocidad:.0f} filas/s"
+            )
+
+        if self.sin_indexar:
+            productos_modificados.send(sender=Producto, ids=[])
+            self.stdout.write('Índice de búsqueda sin actualizar: ejecute reindexar_busqueda')
+
+        if progreso.pk is not None:
+            progreso.delete()
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada: {progreso.insertadas} insertadas, "
+            f"{progreso.invalidas} inválidas en {segundos:.1f} s"
+        ))
+        if progreso.invalidas:
+            self.stdout.write(f'Filas inválidas registradas en {self.ruta_errores}')
+
+    def _validar(self, bloques, trabajadores):
+        """
+        Valida los bloques en orden, en paralelo si hay trabajadores.
+
+        Se mantienen a lo sumo 2 bloques por trabajador en vuelo para que la
+        memoria no dependa del tamaño del archivo.
+
+        Yields:
+            tuple: (bloque, (válidos, errores))
+        """
+        if trabajadores <= 0:
+            for bloque in bloques:
+                yield bloque, validar_bloque(bloque)
+            return
+
+        # Los procesos hijos no deben heredar conexiones abiertas
+        connections.close_all()
+        pendientes = deque()
+        with ProcessPoolExecutor(trabajadores, initializer=inicializar_trabajador) as pool:
+            for bloque in bloques:
+                pendientes.append((bloque, pool.submit(validar_bloque, bloque)))
+                if len(pendientes) >= trabajadores * 2:
+                    bloque_listo, futuro = pendientes.popleft()
+                    yield bloque_listo, futuro.result()
+            while pendientes:
+                bloque_listo, futuro = pendientes.popleft()
+                yield bloque_listo, futuro.result()
+
+    def _insertar(self, validos, tamano_lote, progreso):
+        """
+        Inserta un bloque validado, avisa a las estructuras derivadas y
+        guarda el progreso en una sola transacción.
+
+        Los receptores de productos_modificados escriben el índice y las
+        facetas dentro de la transacción y difieren las caches hasta el
+        commit, así que un fallo en cualquier paso revierte el bloque entero.
+        """
+        productos = [Producto(**datos) for _, datos in validos]
+        with transaction.atomic():
+            for inicio in range(0, len(productos), tamano_lote):
+                insertar_lote(productos[inicio:inicio + tamano_lote])
+
+            if productos and not self.sin_indexar:
+                productos_modificados.send(
+                    sender=Producto,
+                    ids=[p.pk for p in productos if p.pk is not None],
+                    anteriores=[],
+                    actuales=[p.valores_rastreados() for p in productos if p.pk is not None]
+                )
+            progreso.save()
+
+    def _registrar_errores(self, errores):
+        """Agrega las filas inválidas del bloque al archivo de errores"""
+        if not errores:
+            return
+        with open(self.ruta_errores, 'a', encoding='utf-8') as archivo:
+            for numero, detalle in errores:
+                archivo.write(json.dumps(
+                    {'fila': numero, 'errores': detalle}, ensure_ascii=False
+                ) + '\n')
+
+    def _recortar_errores(self, filas):
+        """Descarta los errores registrados de bloques que no se confirmaron"""
+        if not os.path.exists(self.ruta_errores):
+            return
+        with open(self.ruta_errores, encoding='utf-8') as archivo:
+            lineas = [linea for linea in archivo if json.loads(linea)['fila'] <= filas]
+        with open(self.ruta_errores, 'w', encoding='utf-8') as archivo:
+            archivo.writelines(lineas)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from productos.facetas import recalcular
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye el resumen de facetas a partir de la tabla de productos.
+    
+    Necesario después de cargar datos sin pasar por la aplicación o de
+    cambiar PRODUCTOS_FACETAS_RANGOS_PRECIO.
+    """
+    
+    help = 'Reconstruye el resumen de facetas (categoría, marca, stock y precio)'
+    
+    def handle(self, *args, **options):
+        self.stdout.write('Recalculando el resumen de facetas...')
+        recalcular()
+        self.stdout.write(self.style.SUCCESS('Resumen de facetas recalculado'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from productos.busqueda import obtener_backend
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye el índice de búsqueda de productos.
+    
+    Necesario tras la primera instalación del índice o después de cargar
+    datos sin pasar por la aplicación (por ejemplo, restaurar un respaldo).
+    """
+    
+    help = 'Reconstruye el índice de búsqueda de productos'
+    
+    def handle(self, *args, **options):
+        backend = obtener_backend()
+        self.stdout.write(f'Reconstruyendo índice con {backend.__class__.__name__}...')
+        backend.reconstruir()
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido'))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.benchmarks.catalogo import sembrar
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    """
+    Carga un catálogo sintético y reproducible para pruebas de carga.
+
+    Con la misma semilla y el mismo número de filas se insertan siempre los
+    mismos productos (ver productos.benchmarks.catalogo). Solo se siembra
+    sobre una tabla vacía, para que los resultados sean comparables.
+
+    Uso:
+        python manage.py sembrar_productos --filas 1000000
+    """
+
+    help = 'Carga un catálogo sintético y reproducible de productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000, help='Productos a generar')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador')
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por sentencia INSERT')
+        parser.add_argument(
+            '--lotes-por-transaccion', type=int, default=5,
+            help='Sentencias INSERT por transacción'
+        )
+
+    def handle(self, *args, **options):
+        existentes = Producto.objects.count()
+        if existentes:
+            raise CommandError(
+                f'La tabla ya tiene {existentes} productos; el catálogo sintético '
+                'se siembra sobre una tabla vacía'
+            )
+
+        filas = options['filas']
+        inicio = time.perf_counter()
+
+        def progreso(insertadas):
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f'insertadas {insertadas}/{filas} | {insertadas / segundos:.0f} filas/s'
+            )
+
+        insertadas = sembrar(
+            filas, semilla=options['semilla'], tamano_lote=options['lote'],
+            lotes_por_transaccion=options['lotes_por_transaccion'], progreso=progreso
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Catálogo sembrado: {insertadas} productos en '
+            f'{time.perf_counter() - inicio:.1f} s (semilla {options["semilla"]})'
+        ))
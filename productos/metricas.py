@@ -0,0 +1,464 @@
+"""
+Métricas por endpoint en formato de texto de Prometheus.
+
+MetricasMiddleware mide cada petición y acumula, por acción (la acción DRF
+del ViewSet, como list, retrieve o buscar, o el nombre de la ruta en otras
+vistas):
+
+- productos_peticiones_total: peticiones por acción, método y estado
+- productos_peticion_duracion_segundos: histograma de latencia
+- productos_consultas_bd_por_peticion: histograma de consultas SQL
+- productos_bd_duracion_segundos_total: tiempo en la base de datos
+- productos_serializacion_duracion_segundos_total: tiempo de serialización
+- productos_renderizado_duracion_segundos_total: tiempo de codificar JSON
+- productos_respuesta_bytes: histograma del tamaño de las respuestas
+
+y responde con la cabecera Server-Timing de la petición. GET /metrics expone
+además la cache de objetos y el pool de conexiones.
+
+Las consultas se miden con un execute_wrapper instalado en cada conexión
+que suma en la medición de la petición en curso (una ContextVar), por lo que
+también cuentan las consultas del ORM async, que corren en otros hilos. Los
+valores son por proceso: con varios workers, Prometheus debe consultar cada
+uno.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+from api_productos import db_pool as pool_conexiones
+
+from . import cache_objetos
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_BYTES = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Medición de la petición en curso (None: fuera de una petición)
+_medicion = contextvars.ContextVar('productos_medicion', default=None)
+
+
+def habilitadas():
+    """Indica si se instrumentan las peticiones (PRODUCTOS_METRICAS)"""
+    return getattr(settings, 'PRODUCTOS_METRICAS', True)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    """Métrica con etiquetas, segura entre hilos"""
+
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        return tuple(etiquetas[nombre] for nombre in self.etiquetas)
+
+    def exponer(self):
+        """Líneas de la métrica en formato de texto de Prometheus"""
+        return [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+
+    def reiniciar(self):
+        raise NotImplementedError
+
+
+class Contador(Metrica):
+    """Contador acumulado por combinación de etiquetas"""
+
+    tipo = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores = defaultdict(int)
+
+    def incrementar(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] += valor
+
+    def valor(self, **etiquetas):
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+    def exponer(self):
+        lineas = super().exponer()
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            lineas.append(f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}')
+        return lineas
+
+    def reiniciar(self):
+        with self._lock:
+            self._valores.clear()
+
+
+class Histograma(Metrica):
+    """Histograma (cubetas acumuladas, suma y cantidad) por etiquetas"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_DURACION):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+        # Clave -> [conteos por cubeta (no acumulados, + la de +Inf), suma]
+        self._series = {}
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        cubeta = next(
+            (i for i, limite in enumerate(self.limites) if valor <= limite), len(self.limites)
+        )
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0]
+            serie[0][cubeta] += 1
+            serie[1] += valor
+
+    def cantidad(self, **etiquetas):
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas))
+            return sum(serie[0]) if serie else 0
+
+    def suma(self, **etiquetas):
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas))
+            return serie[1] if serie else 0
+
+    def exponer(self):
+        lineas = super().exponer()
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        limites = [_numero(limite) for limite in self.limites] + ['+Inf']
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(limites, conteos):
+                acumulado += conteo
+                etiquetas = _etiquetas(self.etiquetas, clave, f'le="{limite}"')
+                lineas.append(f'{self.nombre}_bucket{etiquetas} {acumulado}')
+            lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}')
+            lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}')
+        return lineas
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+
+
+PETICIONES = Contador(
+    'productos_peticiones_total', 'Peticiones atendidas', ('accion', 'metodo', 'estado')
+)
+DURACION = Histograma(
+    'productos_peticion_duracion_segundos', 'Latencia de las peticiones', ('accion',)
+)
+CONSULTAS = Histograma(
+    'productos_consultas_bd_por_peticion', 'Consultas SQL por petición', ('accion',),
+    limites=LIMITES_CONSULTAS
+)
+TIEMPO_BD = Contador(
+    'productos_bd_duracion_segundos_total', 'Tiempo en consultas SQL', ('accion',)
+)
+TIEMPO_SERIALIZACION = Contador(
+    'productos_serializacion_duracion_segundos_total',
+    'Tiempo de serialización de productos', ('accion',)
+)
+TIEMPO_RENDERIZADO = Contador(
+    'productos_renderizado_duracion_segundos_total',
+    'Tiempo de codificación JSON de las respuestas', ('accion',)
+)
+BYTES = Histograma(
+    'productos_respuesta_bytes', 'Tamaño del cuerpo de las respuestas', ('accion',),
+    limites=LIMITES_BYTES
+)
+
+METRICAS = (
+    PETICIONES, DURACION, CONSULTAS, TIEMPO_BD, TIEMPO_SERIALIZACION,
+    TIEMPO_RENDERIZADO, BYTES,
+)
+
+
+def reiniciar():
+    """Vacía las métricas de peticiones del proceso"""
+    for metrica in METRICAS:
+        metrica.reiniciar()
+
+
+class Medicion:
+    """Tiempos y consultas de una petición"""
+
+    __slots__ = ('inicio', 'consultas', 'bd', 'serializacion', 'renderizado')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.bd = 0.0
+        self.serializacion = 0.0
+        self.renderizado = 0.0
+
+
+def sumar(campo, segundos):
+    """
+    Suma tiempo a la medición de la petición en curso.
+
+    Args:
+        campo (str): 'serializacion' o 'renderizado'
+        segundos (float): Tiempo transcurrido
+    """
+    medicion = _medicion.get()
+    if medicion is not None:
+        setattr(medicion, campo, getattr(medicion, campo) + segundos)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper que cuenta y cronometra las consultas de la petición"""
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.bd += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+def instalar(connection, **kwargs):
+    """Instala medir_consulta en una conexión (receptor de connection_created)"""
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _accion(request):
+    """Etiqueta de la petición: acción DRF o nombre de la ruta"""
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return 'sin_ruta'
+    acciones = getattr(coincidencia.func, 'actions', None)
+    if acciones:
+        accion = acciones.get(request.method.lower())
+        if accion:
+            return accion
+    return coincidencia.view_name or 'sin_nombre'
+
+
+def _server_timing(medicion, total):
+    return (
+        f'bd;dur={medicion.bd * 1000:.2f};desc="{medicion.consultas} consultas", '
+        f'serializacion;dur={medicion.serializacion * 1000:.2f}, '
+        f'renderizado;dur={medicion.renderizado * 1000:.2f}, '
+        f'total;dur={total * 1000:.2f}'
+    )
+
+
+def _acumular(medicion, accion, tamano):
+    """Registra las consultas, los tiempos y el tamaño de una respuesta"""
+    CONSULTAS.observar(medicion.consultas, accion=accion)
+    TIEMPO_BD.incrementar(medicion.bd, accion=accion)
+    TIEMPO_SERIALIZACION.incrementar(medicion.serializacion, accion=accion)
+    TIEMPO_RENDERIZADO.incrementar(medicion.renderizado, accion=accion)
+    BYTES.observar(tamano, accion=accion)
+
+
+def _medir_streaming(contenido, medicion, accion):
+    """
+    Itera el cuerpo de una respuesta streaming con la medición de la
+    petición activa (sus consultas se hacen al generarlo) y la registra al
+    terminar.
+    """
+    total = 0
+    iterador = iter(contenido)
+    try:
+        while True:
+            token = _medicion.set(medicion)
+            try:
+                parte = next(iterador, None)
+            finally:
+                _medicion.reset(token)
+            if parte is None:
+                return
+            total += len(parte)
+            yield parte
+    finally:
+        _acumular(medicion, accion, total)
+
+
+async def _amedir_streaming(contenido, medicion, accion):
+    """Versión async de _medir_streaming"""
+    total = 0
+    iterador = aiter(contenido)
+    try:
+        while True:
+            token = _medicion.set(medicion)
+            try:
+                parte = await anext(iterador, None)
+            finally:
+                _medicion.reset(token)
+            if parte is None:
+                return
+            total += len(parte)
+            yield parte
+    finally:
+        _acumular(medicion, accion, total)
+
+
+class MetricasMiddleware:
+    """
+    Registra las métricas de cada petición y agrega Server-Timing.
+
+    Debe ir primero en MIDDLEWARE para medir también al resto de los
+    middleware. Funciona tanto con WSGI como con ASGI sin cambiar de modo.
+    En las respuestas streaming la latencia llega hasta las cabeceras; las
+    consultas, los tiempos y los bytes del cuerpo se registran al terminar
+    de enviarlo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not habilitadas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+        connection_created.connect(instalar, dispatch_uid='productos_metricas')
+        # Conexiones ya abiertas en este hilo (connection_created no se repite)
+        for conexion in connections.all(initialized_only=True):
+            instalar(conexion)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion)
+
+    def registrar(self, request, response, medicion):
+        """Acumula la medición de la petición en las métricas del proceso"""
+        total = time.perf_counter() - medicion.inicio
+        accion = _accion(request)
+
+        PETICIONES.incrementar(accion=accion, metodo=request.method, estado=str(response.status_code))
+        DURACION.observar(total, accion=accion)
+
+        if getattr(settings, 'PRODUCTOS_SERVER_TIMING', True):
+            response['Server-Timing'] = _server_timing(medicion, total)
+
+        if not response.streaming:
+            _acumular(medicion, accion, len(response.content))
+        elif response.is_async:
+            response.streaming_content = _amedir_streaming(response.streaming_content, medicion, accion)
+        else:
+            response.streaming_content = _medir_streaming(response.streaming_content, medicion, accion)
+        return response
+
+
+# Métricas del pool: nombre, tipo, ayuda y valor a partir de sus estadísticas
+SERIES_POOL = (
+    ('productos_pool_esperando', 'gauge', 'Peticiones esperando una conexión',
+     lambda datos: datos['esperando']),
+    ('productos_pool_prestamos_total', 'counter', 'Conexiones prestadas',
+     lambda datos: datos['prestamos']),
+    ('productos_pool_esperas_total', 'counter', 'Préstamos que esperaron una conexión',
+     lambda datos: datos['esperas']),
+    ('productos_pool_espera_segundos_total', 'counter', 'Tiempo esperando conexiones',
+     lambda datos: datos['espera_total_ms'] / 1000),
+    ('productos_pool_agotados_total', 'counter', 'Esperas que vencieron sin conexión',
+     lambda datos: datos['agotados']),
+)
+
+
+def _metricas_proceso():
+    """Cache de objetos y pool de conexiones, leídos al exponer"""
+    cache = cache_objetos.estadisticas.como_dict()
+    lineas = [
+        '# HELP productos_cache_objetos_aciertos_total Aciertos de la cache de objetos',
+        '# TYPE productos_cache_objetos_aciertos_total counter',
+        f'productos_cache_objetos_aciertos_total {cache["aciertos"]}',
+        '# HELP productos_cache_objetos_fallos_total Fallos de la cache de objetos',
+        '# TYPE productos_cache_objetos_fallos_total counter',
+        f'productos_cache_objetos_fallos_total {cache["fallos"]}',
+    ]
+
+    pools = sorted(pool_conexiones.estadisticas().items())
+    if not pools:
+        return lineas
+
+    lineas.extend([
+        '# HELP productos_pool_conexiones Conexiones del pool por estado',
+        '# TYPE productos_pool_conexiones gauge',
+    ])
+    for alias, datos in pools:
+        for estado in ('en_uso', 'libres'):
+            etiquetas = _etiquetas(('alias', 'estado'), (alias, estado))
+            lineas.append(f'productos_pool_conexiones{etiquetas} {datos[estado]}')
+
+    for nombre, tipo, ayuda, valor in SERIES_POOL:
+        lineas.extend([f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}'])
+        for alias, datos in pools:
+            lineas.append(f'{nombre}{_etiquetas(("alias",), (alias,))} {_numero(valor(datos))}')
+    return lineas
+
+
+def exponer():
+    """
+    Todas las métricas del proceso en formato de texto de Prometheus.
+
+    Returns:
+        str: Cuerpo de la respuesta de /metrics
+    """
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    lineas.extend(_metricas_proceso())
+    return '\n'.join(lineas) + '\n'
+
+
+def vista_metricas(request):
+    """GET /metrics: métricas del proceso para Prometheus"""
+    return HttpResponse(exponer(), content_type=CONTENT_TYPE)
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:35
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+
+from productos.texto import tokenizar
+
+
+PESOS_CAMPOS = {'nombre': 3, 'marca': 2, 'categoria': 1}
+
+
+def indexar_productos(apps, schema_editor):
+    """Indexa los productos existentes en lotes ordenados por id"""
+    Producto = apps.get_model('productos', 'Producto')
+    TerminoBusqueda = apps.get_model('productos', 'TerminoBusqueda')
+    ultimo_pk = 0
+    while True:
+        lote = list(
+            Producto.objects.filter(pk__gt=ultimo_pk)
+            .order_by('pk')
+            .values('pk', *PESOS_CAMPOS)[:2000]
+        )
+        if not lote:
+            break
+        filas = []
+        for producto in lote:
+            terminos = defaultdict(int)
+            for campo, peso in PESOS_CAMPOS.items():
+                for termino in set(tokenizar(producto[campo])):
+                    terminos[termino] += peso
+            filas.extend(
+                TerminoBusqueda(producto_id=producto['pk'], termino=termino, peso=peso)
+                for termino, peso in terminos.items()
+            )
+        TerminoBusqueda.objects.bulk_create(filas)
+        ultimo_pk = lote[-1]['pk']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=100)),
+                ('peso', models.PositiveSmallIntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Término de búsqueda',
+                'verbose_name_plural': 'Términos de búsqueda',
+                'indexes': [models.Index(fields=['termino', 'producto'], name='productos_t_termino_714efa_idx')],
+            },
+        ),
+        migrations.RunPython(indexar_productos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:54
+
+from django.db import migrations, models
+
+from productos.texto import normalizar
+
+
+def normalizar_productos(apps, schema_editor):
+    """Llena las columnas normalizadas en lotes ordenados por id"""
+    Producto = apps.get_model('productos', 'Producto')
+    ultimo_pk = 0
+    while True:
+        lote = list(
+            Producto.objects.filter(pk__gt=ultimo_pk)
+            .order_by('pk')
+            .only('pk', 'categoria', 'marca')[:2000]
+        )
+        if not lote:
+            break
+        for producto in lote:
+            producto.categoria_normalizada = normalizar(producto.categoria)[:100]
+            producto.marca_normalizada = normalizar(producto.marca)[:100]
+        Producto.objects.bulk_update(lote, ['categoria_normalizada', 'marca_normalizada'])
+        ultimo_pk = lote[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='categoria_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100, verbose_name='Categoría normalizada'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='marca_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100, verbose_name='Marca normalizada'),
+        ),
+        migrations.RunPython(normalizar_productos, migrations.RunPython.noop),
+    ]
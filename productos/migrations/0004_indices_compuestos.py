@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_normalizados'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='productos_p_precio_d043df_idx',
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='categoria_normalizada',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Categoría normalizada'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='marca_normalizada',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Marca normalizada'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_creacion'], name='productos_p_fecha_c_e558cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre'], name='productos_p_nombre_456643_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio', 'cantidad'], name='productos_p_precio_1c966e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['cantidad', 'fecha_creacion'], name='productos_p_cantida_742d4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria_normalizada', 'fecha_creacion'], name='productos_p_categor_3657ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['marca_normalizada', 'fecha_creacion'], name='productos_p_marca_n_6fadba_idx'),
+        ),
+    ]
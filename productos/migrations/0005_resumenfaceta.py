@@ -0,0 +1,79 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:01
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calcular_resumen(apps, schema_editor):
+    """
+    Llena el resumen de facetas con los productos existentes.
+
+    Repite aquí el GROUP BY de productos.facetas.contar_facetas con los
+    modelos históricos, para no depender del código actual de la app.
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    ResumenFaceta = apps.get_model('productos', 'ResumenFaceta')
+    productos = Producto.objects.order_by()
+
+    conteos = {}
+    for dimension in ('categoria', 'marca'):
+        for fila in productos.values(dimension).annotate(total=Count('pk')):
+            conteos[(dimension, fila[dimension])] = fila['total']
+
+    rangos = sorted(
+        Decimal(str(limite))
+        for limite in getattr(
+            settings, 'PRODUCTOS_FACETAS_RANGOS_PRECIO', (0, 50, 100, 250, 500, 1000)
+        )
+    )
+    agregados = {
+        'con_stock': Count('pk', filter=Q(cantidad__gt=0)),
+        'sin_stock': Count('pk', filter=Q(cantidad=0)),
+    }
+    for indice, desde in enumerate(rangos):
+        condicion = Q()
+        if indice:
+            condicion &= Q(precio__gte=desde)
+        if indice + 1 < len(rangos):
+            condicion &= Q(precio__lt=rangos[indice + 1])
+        agregados[f'precio_{indice}'] = Count('pk', filter=condicion or None)
+
+    fila = productos.aggregate(**agregados)
+    for valor in ('con_stock', 'sin_stock'):
+        conteos[('stock', valor)] = fila[valor]
+    for indice, desde in enumerate(rangos):
+        conteos[('precio', str(desde))] = fila[f'precio_{indice}']
+
+    ResumenFaceta.objects.bulk_create([
+        ResumenFaceta(dimension=dimension, valor=valor, total=total)
+        for (dimension, valor), total in conteos.items()
+        if total
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenFaceta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('valor', models.CharField(max_length=100)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de faceta',
+                'verbose_name_plural': 'Resumen de facetas',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'valor'), name='resumen_faceta_unica')],
+            },
+        ),
+        migrations.RunPython(calcular_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_resumenfaceta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgresoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.CharField(max_length=500, unique=True)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('insertadas', models.PositiveIntegerField(default=0)),
+                ('invalidas', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Progreso de importación',
+                'verbose_name_plural': 'Progresos de importación',
+            },
+        ),
+    ]
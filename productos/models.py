@@ -1,7 +1,32 @@
-from django.db import models
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models import F
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from .texto import normalizar
+
+
+def formatear_precio(precio):
+    """Formatea un precio como moneda (por ejemplo $1,299.99)"""
+    return f"${precio:,.2f}"
+
+
+class StockInsuficienteError(Exception):
+    """
+    Error al reducir stock en lote.
+    
+    Atributos:
+    - sin_stock: ids de productos sin stock suficiente
+    - no_encontrados: ids que no corresponden a ningún producto
+    """
+    
+    def __init__(self, sin_stock, no_encontrados):
+        super().__init__('No hay suficiente stock disponible')
+        self.sin_stock = sin_stock
+        self.no_encontrados = no_encontrados
+
 
 class Producto(models.Model):
     """
@@ -50,6 +75,22 @@ class Producto(models.Model):
         help_text="Cantidad disponible en inventario"
     )
     
+    # Copias normalizadas (minúsculas, sin acentos) para filtrar con índice
+    # (ver los índices compuestos de Meta)
+    categoria_normalizada = models.CharField(
+        max_length=100,
+        editable=False,
+        default='',
+        verbose_name="Categoría normalizada"
+    )
+    
+    marca_normalizada = models.CharField(
+        max_length=100,
+        editable=False,
+        default='',
+        verbose_name="Marca normalizada"
+    )
+    
     # Campos de auditoría
     fecha_creacion = models.DateTimeField(
         auto_now_add=True,
@@ -65,19 +106,102 @@ class Producto(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-fecha_creacion']  # Ordenar por fecha de creación descendente
+        # Índices según las combinaciones de filtro y orden de los listados
+        # (ProductoViewSet.get_queryset y las acciones de filtro). Los
+        # órdenes descendentes recorren el índice hacia atrás.
         indexes = [
             models.Index(fields=['categoria']),
             models.Index(fields=['marca']),
-            models.Index(fields=['precio']),
+            # Orden por defecto y fecha_desc
+            models.Index(fields=['fecha_creacion']),
+            # orden=nombre
+            models.Index(fields=['nombre']),
+            # Rango o orden por precio; incluye cantidad para resolver
+            # solo_con_stock sin leer la fila
+            models.Index(fields=['precio', 'cantidad']),
+            # sin_stock (cantidad = 0) y solo_con_stock ordenados por fecha
+            models.Index(fields=['cantidad', 'fecha_creacion']),
+            # Filtros categoria/marca (exacto y prefijo) ordenados por fecha
+            models.Index(fields=['categoria_normalizada', 'fecha_creacion']),
+            models.Index(fields=['marca_normalizada', 'fecha_creacion']),
         ]
     
+    # Campo original -> columna con su valor normalizado
+    CAMPOS_NORMALIZADOS = {
+        'categoria': 'categoria_normalizada',
+        'marca': 'marca_normalizada',
+    }
+    
+    # Campos cuyo valor anterior necesitan las señales para mantener
+    # estructuras derivadas (respuestas en cache por categoría y marca,
+    # resumen de facetas)
+    CAMPOS_RASTREADOS = ('categoria', 'marca', 'precio', 'cantidad')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Crea la instancia guardando los valores leídos de los campos rastreados"""
+        instancia = super().from_db(db, field_names, values)
+        instancia.guardar_valores_originales()
+        return instancia
+    
+    def valores_rastreados(self):
+        """Valores actuales de los campos rastreados cargados en la instancia"""
+        return {
+            campo: self.__dict__[campo]
+            for campo in self.CAMPOS_RASTREADOS if campo in self.__dict__
+        }
+    
+    def guardar_valores_originales(self):
+        """Toma los valores actuales de los campos rastreados como originales"""
+        self._valores_originales = self.valores_rastreados()
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """Recarga el producto tomando los valores leídos como originales"""
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        leidos = self.valores_rastreados()
+        if fields is not None:
+            leidos = {campo: valor for campo, valor in leidos.items() if campo in fields}
+        self._valores_originales = {**self.valores_originales, **leidos}
+    
+    @property
+    def valores_originales(self):
+        """
+        Valores de los campos rastreados al leer o guardar el producto por
+        última vez (vacío si la instancia nunca se leyó ni se guardó).
+        """
+        return getattr(self, '_valores_originales', {})
+    
+    def actualizar_normalizados(self):
+        """
+        Calcula las columnas normalizadas a partir de categoria y marca.
+        
+        save() lo hace automáticamente; las escrituras masivas (bulk_create,
+        bulk_update) deben llamarlo antes de escribir.
+        """
+        for campo, normalizado in self.CAMPOS_NORMALIZADOS.items():
+            valor = self.__dict__.get(campo)
+            if valor is not None:
+                longitud = self._meta.get_field(normalizado).max_length
+                setattr(self, normalizado, normalizar(valor)[:longitud])
+    
+    def save(self, *args, **kwargs):
+        """Guarda el producto manteniendo las columnas normalizadas"""
+        self.actualizar_normalizados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                normalizado for campo, normalizado in self.CAMPOS_NORMALIZADOS.items()
+                if campo in update_fields
+            }
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         """Representación en string del modelo"""
         return f"{self.nombre} - {self.marca} ({self.categoria})"
     
     def get_precio_formateado(self):
         """Retorna el precio formateado como moneda"""
-        return f"${self.precio:,.2f}"
+        return formatear_precio(self.precio)
     
     def tiene_stock(self):
         """Verifica si el producto tiene stock disponible"""
@@ -90,11 +214,198 @@ class Producto(models.Model):
         Args:
             cantidad_a_reducir (int): Cantidad a reducir del stock
             
+        La reducción es un único UPDATE condicional
+        (cantidad = cantidad - n WHERE id = ? AND cantidad >= n), por lo que
+        peticiones concurrentes no pierden actualizaciones ni dejan el stock
+        negativo. Solo se escriben cantidad y fecha_actualizacion.
+        
         Returns:
             bool: True si se pudo reducir el stock, False en caso contrario
         """
-        if self.cantidad >= cantidad_a_reducir:
-            self.cantidad -= cantidad_a_reducir
-            self.save()
-            return True
-        return False
+        from . import cache_objetos
+        from .signals import productos_modificados
+        
+        ahora = timezone.now()
+        with transaction.atomic(savepoint=False):
+            actualizados = Producto.objects.filter(
+                pk=self.pk, cantidad__gte=cantidad_a_reducir
+            ).update(
+                cantidad=F('cantidad') - cantidad_a_reducir,
+                fecha_actualizacion=ahora
+            )
+            if not actualizados:
+                return False
+            
+            # Leer la cantidad resultante dentro de la transacción: la fila
+            # queda bloqueada por el UPDATE, así que es exactamente la
+            # cantidad que dejó esta reducción
+            fila = Producto.objects.filter(pk=self.pk).values(
+                *self.CAMPOS_RASTREADOS
+            ).get()
+            self.cantidad = fila['cantidad']
+            self.fecha_actualizacion = ahora
+            productos_modificados.send(
+                sender=Producto, ids=[self.pk], campos=['cantidad'],
+                anteriores=[dict(fila, cantidad=fila['cantidad'] + cantidad_a_reducir)],
+                actuales=[fila]
+            )
+        cache_objetos.reducir_cantidades(
+            {self.pk: cantidad_a_reducir}, ahora, {self.pk: self.cantidad}
+        )
+        return True
+    
+    @classmethod
+    def reducir_stock_lote(cls, reducciones):
+        """
+        Reduce el stock de varios productos en una sola transacción.
+        
+        Es todo o nada: si algún producto no existe o no tiene stock
+        suficiente no se modifica ninguno. Las filas se actualizan en orden
+        de id para evitar interbloqueos entre pedidos concurrentes.
+        
+        Args:
+            reducciones: Iterable de pares (id, cantidad_a_reducir); los ids
+                repetidos se acumulan
+            
+        Returns:
+            list: Productos actualizados, ordenados por id
+            
+        Raises:
+            StockInsuficienteError: Si algún producto no existe o no tiene stock
+        """
+        from . import cache_objetos
+        from .signals import productos_modificados
+        
+        totales = defaultdict(int)
+        for pk, cantidad in reducciones:
+            totales[pk] += cantidad
+        ids = sorted(totales)
+        
+        ahora = timezone.now()
+        fallidos = []
+        try:
+            with transaction.atomic():
+                for pk in ids:
+                    actualizados = cls.objects.filter(
+                        pk=pk, cantidad__gte=totales[pk]
+                    ).update(
+                        cantidad=F('cantidad') - totales[pk],
+                        fecha_actualizacion=ahora
+                    )
+                    if not actualizados:
+                        fallidos.append(pk)
+                if fallidos:
+                    raise StockInsuficienteError(fallidos, [])
+                
+                productos = list(cls.objects.filter(pk__in=ids).order_by('pk'))
+                actuales = [producto.valores_originales for producto in productos]
+                productos_modificados.send(
+                    sender=cls, ids=ids, campos=['cantidad'],
+                    anteriores=[
+                        dict(valores, cantidad=valores['cantidad'] + totales[producto.pk])
+                        for producto, valores in zip(productos, actuales)
+                    ],
+                    actuales=actuales
+                )
+        except StockInsuficienteError:
+            existentes = set(
+                cls.objects.filter(pk__in=fallidos).values_list('pk', flat=True)
+            )
+            raise StockInsuficienteError(
+                [pk for pk in fallidos if pk in existentes],
+                [pk for pk in fallidos if pk not in existentes]
+            )
+        
+        cache_objetos.reducir_cantidades(
+            totales, ahora, {producto.pk: producto.cantidad for producto in productos}
+        )
+        return productos
+
+
+class TerminoBusqueda(models.Model):
+    """
+    Índice invertido de términos normalizados para la búsqueda de productos.
+    
+    Cada fila asocia un término (en minúsculas y sin acentos) con un producto
+    y el peso acumulado según el campo donde aparece. Lo mantiene
+    sincronizado el backend de búsqueda en base de datos.
+    """
+    
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='terminos_busqueda'
+    )
+    
+    termino = models.CharField(max_length=100)
+    
+    peso = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        verbose_name = "Término de búsqueda"
+        verbose_name_plural = "Términos de búsqueda"
+        indexes = [
+            models.Index(fields=['termino', 'producto']),
+        ]
+    
+    def __str__(self):
+        """Representación en string del modelo"""
+        return f"{self.termino} -> {self.producto_id}"
+
+
+class ResumenFaceta(models.Model):
+    """
+    Conteo de productos por valor de faceta (categoría, marca, stock y rango
+    de precio) sobre todo el catálogo.
+    
+    Lo mantienen las señales de la app con incrementos por diferencia, de
+    modo que las facetas sin filtros se leen sin recorrer la tabla de
+    productos.
+    """
+    
+    dimension = models.CharField(max_length=20)
+    
+    valor = models.CharField(max_length=100)
+    
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Resumen de faceta"
+        verbose_name_plural = "Resumen de facetas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'valor'], name='resumen_faceta_unica'
+            ),
+        ]
+    
+    def __str__(self):
+        """Representación en string del modelo"""
+        return f"{self.dimension}={self.valor}: {self.total}"
+
+
+class ProgresoImportacion(models.Model):
+    """
+    Progreso de una importación masiva (comando importar_productos).
+    
+    Se actualiza en la misma transacción que inserta cada bloque, así que
+    siempre coincide con las filas confirmadas y --reanudar no repite ni
+    omite bloques aunque el proceso termine entre dos pasos.
+    """
+    
+    archivo = models.CharField(max_length=500, unique=True)
+    
+    filas = models.PositiveIntegerField(default=0)
+    
+    insertadas = models.PositiveIntegerField(default=0)
+    
+    invalidas = models.PositiveIntegerField(default=0)
+    
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Progreso de importación"
+        verbose_name_plural = "Progresos de importación"
+    
+    def __str__(self):
+        """Representación en string del modelo"""
+        return f"{self.archivo}: fila {self.filas}"
@@ -0,0 +1,269 @@
+"""
+Paginación por cursor (keyset) para listados de productos.
+
+A diferencia de la paginación por número de página, el cursor guarda los
+valores de la última fila entregada (campo de ordenamiento + id) y la
+siguiente página se obtiene con un WHERE sobre esos valores. Así la página N
+cuesta lo mismo que la página 1 y no es necesario ejecutar COUNT(*).
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from .models import Producto
+
+
+# Valores del parámetro "orden" y el campo de ordenamiento que les corresponde
+ORDENAMIENTOS = {
+    'precio_asc': 'precio',
+    'precio_desc': '-precio',
+    'nombre': 'nombre',
+    'fecha_desc': '-fecha_creacion',
+}
+
+ORDEN_POR_DEFECTO = '-fecha_creacion'
+
+SIGUIENTE = 'sig'
+ANTERIOR = 'ant'
+
+
+class CursorInvalido(Exception):
+    """El cursor recibido no se pudo decodificar o no corresponde al ordenamiento"""
+
+
+def obtener_orden(valor):
+    """
+    Traduce el parámetro "orden" de la API al campo de ordenamiento.
+
+    Args:
+        valor (str): Valor del parámetro "orden" (puede ser None)
+
+    Returns:
+        str: Campo de ordenamiento (por ejemplo '-precio')
+    """
+    return ORDENAMIENTOS.get(valor, ORDEN_POR_DEFECTO)
+
+
+def _valor_campo(fila, campo):
+    """Obtiene el valor de un campo desde una instancia o un diccionario de values()"""
+    if isinstance(fila, dict):
+        return fila[campo]
+    return getattr(fila, campo)
+
+
+def _serializar_valor(valor):
+    """Convierte el valor de un campo en un tipo representable en JSON"""
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.isoformat()
+    if isinstance(valor, (str, int)):
+        return valor
+    return str(valor)
+
+
+def codificar_cursor(orden, fila, direccion):
+    """
+    Genera un cursor opaco a partir de una fila del listado.
+
+    Args:
+        orden (str): Campo de ordenamiento activo
+        fila: Instancia de Producto o diccionario con el campo y el id
+        direccion (str): SIGUIENTE o ANTERIOR
+
+    Returns:
+        str: Cursor codificado en base64 apto para URLs
+    """
+    campo = orden.lstrip('-')
+    contenido = {
+        'o': orden,
+        'v': _serializar_valor(_valor_campo(fila, campo)),
+        'id': _valor_campo(fila, 'id'),
+        'd': direccion,
+    }
+    datos = json.dumps(contenido, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, orden):
+    """
+    Decodifica un cursor y valida que corresponda al ordenamiento activo.
+
+    Args:
+        cursor (str): Cursor recibido en la petición
+        orden (str): Campo de ordenamiento activo
+
+    Returns:
+        tuple: (valor del campo, id, dirección)
+
+    Raises:
+        CursorInvalido: Si el cursor está mal formado o es de otro ordenamiento
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        contenido = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if contenido['o'] != orden or contenido['d'] not in (SIGUIENTE, ANTERIOR):
+            raise CursorInvalido('El cursor no corresponde al ordenamiento solicitado')
+        campo = Producto._meta.get_field(orden.lstrip('-'))
+        valor = campo.to_python(contenido['v'])
+        # Las columnas de ordenamiento no admiten nulos
+        if valor is None:
+            raise CursorInvalido('Cursor inválido')
+        pk = int(contenido['id'])
+    except CursorInvalido:
+        raise
+    except (binascii.Error, ValueError, TypeError, KeyError,
+            FieldDoesNotExist, ValidationError):
+        raise CursorInvalido('Cursor inválido')
+    return valor, pk, contenido['d']
+
+
+def filtrar_desde(queryset, orden, valor, pk, hacia_adelante=True):
+    """
+    Aplica la condición keyset para continuar después (o antes) de una fila.
+
+    Args:
+        queryset: QuerySet a filtrar
+        orden (str): Campo de ordenamiento activo
+        valor: Valor del campo de ordenamiento en la fila de referencia
+        pk (int): Id de la fila de referencia (desempate)
+        hacia_adelante (bool): True para las filas posteriores en el orden
+
+    Returns:
+        QuerySet: QuerySet filtrado
+    """
+    campo = orden.lstrip('-')
+    descendente = orden.startswith('-')
+    comparador = 'lt' if descendente == hacia_adelante else 'gt'
+    return queryset.filter(
+        Q(**{f'{campo}__{comparador}': valor}) |
+        Q(**{campo: valor, f'id__{comparador}': pk})
+    )
+
+
+def ordenar(queryset, orden, invertido=False):
+    """
+    Ordena el queryset por el campo activo usando el id como desempate.
+
+    Args:
+        queryset: QuerySet a ordenar
+        orden (str): Campo de ordenamiento activo
+        invertido (bool): True para recorrer el orden al revés
+
+    Returns:
+        QuerySet: QuerySet ordenado
+    """
+    descendente = orden.startswith('-') != invertido
+    campo = orden.lstrip('-')
+    if descendente:
+        return queryset.order_by(f'-{campo}', '-id')
+    return queryset.order_by(campo, 'id')
+
+
+class PaginadorCursor:
+    """
+    Paginador keyset sobre un queryset de productos.
+
+    Cada página se obtiene con una sola consulta de tamaño fijo
+    (tamano_pagina + 1 filas para saber si hay más), sin COUNT(*)
+    ni OFFSET.
+    """
+
+    def __init__(self, queryset, orden, tamano_pagina):
+        self.queryset = queryset
+        self.orden = orden
+        self.tamano_pagina = tamano_pagina
+
+    def pagina(self, cursor=None):
+        """
+        Obtiene la página indicada por el cursor.
+
+        Args:
+            cursor (str): Cursor recibido o None/vacío para la primera página
+
+        Returns:
+            tuple: (lista de filas, diccionario con la información de paginación)
+
+        Raises:
+            CursorInvalido: Si el cursor no es válido
+        """
+        consulta, direccion = self._consulta(cursor)
+        return self._resultado(list(consulta), cursor, direccion)
+
+    async def apagina(self, cursor=None):
+        """Versión async de pagina (ORM async)"""
+        consulta, direccion = self._consulta(cursor)
+        return self._resultado([fila async for fila in consulta], cursor, direccion)
+
+    def _consulta(self, cursor):
+        """Consulta de la página (tamano_pagina + 1 filas) y su dirección"""
+        direccion = SIGUIENTE
+        queryset = self.queryset
+        if cursor:
+            valor, pk, direccion = decodificar_cursor(cursor, self.orden)
+            queryset = filtrar_desde(
+                queryset, self.orden, valor, pk,
+                hacia_adelante=(direccion == SIGUIENTE)
+            )
+
+        queryset = ordenar(queryset, self.orden, invertido=(direccion == ANTERIOR))
+        return queryset[:self.tamano_pagina + 1], direccion
+
+    def _resultado(self, filas, cursor, direccion):
+        """Filas de la página y paginación a partir de las filas leídas"""
+        hay_mas = len(filas) > self.tamano_pagina
+        filas = filas[:self.tamano_pagina]
+
+        if direccion == ANTERIOR:
+            filas.reverse()
+            tiene_anterior = hay_mas
+            tiene_siguiente = True
+        else:
+            tiene_anterior = bool(cursor)
+            tiene_siguiente = hay_mas
+
+        siguiente = anterior = None
+        if filas and tiene_siguiente:
+            siguiente = codificar_cursor(self.orden, filas[-1], SIGUIENTE)
+        if filas and tiene_anterior:
+            anterior = codificar_cursor(self.orden, filas[0], ANTERIOR)
+
+        return filas, {
+            'productos_por_pagina': self.tamano_pagina,
+            'tiene_siguiente': siguiente is not None,
+            'tiene_anterior': anterior is not None,
+            'siguiente': siguiente,
+            'anterior': anterior,
+        }
+
+
+def iterar_por_lotes(queryset, orden, tamano_lote):
+    """
+    Recorre todo el queryset en lotes usando la condición keyset.
+
+    Cada lote es una consulta independiente y acotada, por lo que la memoria
+    no crece con el total de filas (a diferencia de iterator() con MySQL,
+    cuyo driver carga el resultado completo en el cliente).
+
+    Args:
+        queryset: QuerySet (de instancias o de values()) a recorrer
+        orden (str): Campo de ordenamiento activo
+        tamano_lote (int): Filas por consulta
+
+    Yields:
+        Filas del queryset en el orden indicado
+    """
+    campo = orden.lstrip('-')
+    consulta = ordenar(queryset, orden)
+    while True:
+        lote = list(consulta[:tamano_lote])
+        yield from lote
+        if len(lote) < tamano_lote:
+            return
+        ultima = lote[-1]
+        siguientes = filtrar_desde(
+            queryset, orden, _valor_campo(ultima, campo), _valor_campo(ultima, 'id')
+        )
+        consulta = ordenar(siguientes, orden)
@@ -0,0 +1,121 @@
+"""
+Renderizador JSON de la API de productos.
+
+Produce exactamente la misma salida que rest_framework.renderers.JSONRenderer,
+pero más rápido:
+
+- Reutiliza un JSONEncoder por configuración en lugar de crear uno por
+  respuesta.
+- Resuelve la conversión de tipos no nativos (Decimal, datetime, ...) con
+  un diccionario por tipo exacto, que se completa la primera vez que
+  aparece cada tipo, en lugar de recorrer la cadena de isinstance del
+  encoder de DRF para cada valor.
+"""
+import datetime
+import decimal
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from . import metricas
+
+
+def _fecha_hora(valor):
+    """Misma representación que el JSONEncoder de DRF (UTC como 'Z')"""
+    representacion = valor.isoformat()
+    if representacion.endswith('+00:00'):
+        representacion = representacion[:-6] + 'Z'
+    return representacion
+
+
+# Conversiones por tipo; se buscan siguiendo el MRO del valor, igual que la
+# cadena de isinstance de rest_framework.utils.encoders.JSONEncoder
+CODIFICADORES = {
+    Promise: force_str,
+    datetime.datetime: _fecha_hora,
+    datetime.date: datetime.date.isoformat,
+    datetime.timedelta: lambda valor: str(valor.total_seconds()),
+    decimal.Decimal: float,
+    uuid.UUID: str,
+    QuerySet: tuple,
+    bytes: bytes.decode,
+}
+
+
+class ProductoJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con encoder reutilizable y conversiones cacheadas por tipo.
+
+    El modo compacto (sin espacios) se controla con PRODUCTOS_JSON_COMPACTO;
+    si no se define, se usa COMPACT_JSON de DRF. Las respuestas con
+    indentación (Accept: application/json; indent=4) se delegan en
+    JSONRenderer.
+    """
+
+    # Tipo exacto -> función de conversión (se completa de forma perezosa)
+    _por_tipo = {}
+    _encoders = {}
+    _encoder_drf = encoders.JSONEncoder()
+
+    @property
+    def compact(self):
+        return getattr(settings, 'PRODUCTOS_JSON_COMPACTO', JSONRenderer.compact)
+
+    @classmethod
+    def _convertir(cls, valor):
+        """Función default del encoder: convierte valores no nativos de JSON"""
+        tipo = type(valor)
+        conversion = cls._por_tipo.get(tipo)
+        if conversion is None:
+            conversion = next(
+                (CODIFICADORES[base] for base in tipo.__mro__ if base in CODIFICADORES),
+                cls._encoder_drf.default
+            )
+            cls._por_tipo[tipo] = conversion
+        return conversion(valor)
+
+    def _get_encoder(self):
+        """JSONEncoder compartido para la configuración actual"""
+        clave = (self.compact, self.ensure_ascii, self.strict)
+        encoder = self._encoders.get(clave)
+        if encoder is None:
+            encoder = json.JSONEncoder(
+                ensure_ascii=self.ensure_ascii,
+                allow_nan=not self.strict,
+                check_circular=False,
+                separators=(',', ':') if self.compact else (', ', ': '),
+                default=self._convertir,
+            )
+            self._encoders[clave] = encoder
+        return encoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON, returning a bytestring.
+        """
+        inicio = time.perf_counter()
+        try:
+            return self._codificar(data, accepted_media_type, renderer_context)
+        finally:
+            metricas.sumar('renderizado', time.perf_counter() - inicio)
+
+    def _codificar(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = self._get_encoder().encode(data)
+
+        # Igual que JSONRenderer: escapar \u2028 y \u2029
+        if '\u2028' in ret or '\u2029' in ret:
+            ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
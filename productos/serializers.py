@@ -1,8 +1,69 @@
-from rest_framework import serializers
-from .models import Producto
+import decimal
+import time
+from functools import lru_cache
+from operator import itemgetter
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from . import metricas
+from .models import Producto, formatear_precio
 
 
-class ProductoSerializer(serializers.ModelSerializer):
+class SerializacionMedidaMixin:
+    """Suma el tiempo de to_representation a las métricas de la petición"""
+    
+    def to_representation(self, instance):
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metricas.sumar('serializacion', time.perf_counter() - inicio)
+
+
+class CamposInvalidos(APIException):
+    """El parámetro campos nombra campos que el serializador no tiene"""
+    
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'campos_invalidos'
+
+
+def seleccionar_campos(valor, disponibles):
+    """
+    Interpreta el parámetro campos (nombres separados por comas).
+    
+    Args:
+        valor (str): Valor del parámetro (None o vacío: todos los campos)
+        disponibles (list): Campos del serializador, en su orden
+        
+    Returns:
+        tuple: Campos pedidos en el orden del serializador, o None para todos
+        
+    Raises:
+        CamposInvalidos: Si algún nombre no es un campo del serializador
+    """
+    pedidos = {nombre.strip() for nombre in (valor or '').split(',') if nombre.strip()}
+    if not pedidos:
+        return None
+    desconocidos = pedidos.difference(disponibles)
+    if desconocidos:
+        raise CamposInvalidos({
+            'error': f'Campos desconocidos: {", ".join(sorted(desconocidos))}',
+            'campos_disponibles': list(disponibles),
+        })
+    return tuple(nombre for nombre in disponibles if nombre in pedidos)
+
+
+class CamposSeleccionablesMixin:
+    """Acepta campos=(...) para emitir solo esos campos del serializador"""
+    
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields).difference(campos):
+                self.fields.pop(nombre)
+
+
+class ProductoSerializer(CamposSeleccionablesMixin, SerializacionMedidaMixin,
+                         serializers.ModelSerializer):
     """
     Serializador para el modelo Producto.
     
@@ -104,7 +165,8 @@ class ProductoSerializer(serializers.ModelSerializer):
         return data
 
 
-class ProductoListSerializer(serializers.ModelSerializer):
+class ProductoListSerializer(CamposSeleccionablesMixin, SerializacionMedidaMixin,
+                             serializers.ModelSerializer):
     """
     Serializador simplificado para listados de productos.
     
@@ -129,7 +191,121 @@ class ProductoListSerializer(serializers.ModelSerializer):
         ]
 
 
-class ProductoCreateUpdateSerializer(serializers.ModelSerializer):
+class ProductoLoteListSerializer(serializers.ListSerializer):
+    """
+    Serializador de listas para cargas masivas de productos.
+    
+    A diferencia de ListSerializer, valida cada elemento por separado y
+    conserva los errores de cada uno en lugar de rechazar toda la carga, y
+    guarda los válidos con INSERT/UPDATE de varias filas.
+    """
+    
+    def validar_elementos(self):
+        """
+        Valida cada elemento de la carga de forma independiente.
+        
+        Returns:
+            tuple: (lista de (índice, datos validados), lista de errores con
+                la forma {'indice': i, 'errores': {...}})
+        """
+        if not isinstance(self.initial_data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Se esperaba una lista de productos']
+            })
+        if not self.initial_data and not self.allow_empty:
+            raise serializers.ValidationError({
+                'non_field_errors': ['La lista de productos no puede estar vacía']
+            })
+        if self.max_length is not None and len(self.initial_data) > self.max_length:
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    f'La carga admite como máximo {self.max_length} productos'
+                ]
+            })
+        
+        validos = []
+        errores = []
+        for indice, elemento in enumerate(self.initial_data):
+            try:
+                validos.append((indice, self.child.run_validation(elemento)))
+            except serializers.ValidationError as error:
+                errores.append({'indice': indice, 'errores': error.detail})
+        return validos, errores
+    
+    def guardar(self, validos, upsert=False, tamano_lote=None):
+        """
+        Guarda los elementos válidos en lotes.
+        
+        Args:
+            validos (list): Pares (índice, datos validados)
+            upsert (bool): Actualizar los productos existentes por (nombre, marca)
+            tamano_lote (int): Filas por sentencia
+            
+        Returns:
+            list: Diccionarios {'indice', 'id', 'estado'} en el orden recibido
+        """
+        from .lotes import crear_en_lotes
+        
+        productos = [Producto(**datos) for _, datos in validos]
+        resultado = crear_en_lotes(productos, tamano_lote=tamano_lote, upsert=upsert)
+        return [
+            {
+                'indice': indice,
+                'id': producto.pk,
+                'estado': 'creado' if creado else 'actualizado',
+            }
+            for (indice, _), (producto, creado) in zip(validos, resultado)
+        ]
+    
+    def validar_actualizaciones(self):
+        """
+        Valida una actualización parcial en lote (ver validar_elementos).
+        
+        Un id solo puede aparecer una vez: las repeticiones se reportan
+        como errores de su elemento.
+        
+        Returns:
+            tuple: (lista de (índice, datos validados), lista de errores)
+        """
+        validos, errores = self.validar_elementos()
+        vistos = set()
+        unicos = []
+        for indice, datos in validos:
+            if datos['id'] in vistos:
+                errores.append({'indice': indice, 'errores': {'id': ['Id repetido en la carga']}})
+            else:
+                vistos.add(datos['id'])
+                unicos.append((indice, datos))
+        errores.sort(key=lambda error: error['indice'])
+        return unicos, errores
+    
+    def actualizar(self, validos, atomico=False, tamano_lote=None):
+        """
+        Aplica las actualizaciones parciales válidas en lotes.
+        
+        Args:
+            validos (list): Pares (índice, datos validados con 'id')
+            atomico (bool): Todo o nada (ver lotes.actualizar_en_lotes)
+            tamano_lote (int): Productos por lote
+            
+        Returns:
+            list: Diccionarios {'indice', 'id', 'estado'} en el orden recibido
+            
+        Raises:
+            ProductosNoEncontrados: En modo atómico, si algún id no existe
+        """
+        from .lotes import actualizar_en_lotes
+        
+        estados = actualizar_en_lotes(
+            [datos for _, datos in validos], tamano_lote=tamano_lote, atomico=atomico
+        )
+        return [
+            {'indice': indice, 'id': datos['id'], 'estado': estado}
+            for (indice, datos), estado in zip(validos, estados)
+        ]
+
+
+class ProductoCreateUpdateSerializer(SerializacionMedidaMixin, serializers.ModelSerializer):
     """
     Serializador específico para operaciones de creación y actualización.
     
@@ -146,6 +322,7 @@ class ProductoCreateUpdateSerializer(serializers.ModelSerializer):
             'precio',
             'cantidad'
         ]
+        list_serializer_class = ProductoLoteListSerializer
     
     def validate_precio(self, value):
         """Validación del precio para operaciones de escritura"""
@@ -158,3 +335,195 @@ class ProductoCreateUpdateSerializer(serializers.ModelSerializer):
         if value < 0:
             raise serializers.ValidationError("La cantidad no puede ser negativa")
         return value
+
+
+class ProductoActualizacionLoteSerializer(ProductoCreateUpdateSerializer):
+    """
+    Elemento de la actualización parcial en lote: el id del producto y los
+    campos a modificar, con las reglas de ProductoCreateUpdateSerializer.
+    
+    Se usa con partial=True; el id y al menos un campo son obligatorios.
+    """
+    
+    id = serializers.IntegerField(min_value=1)
+    
+    class Meta(ProductoCreateUpdateSerializer.Meta):
+        fields = ['id', *ProductoCreateUpdateSerializer.Meta.fields]
+    
+    def validate(self, data):
+        """
+        Exige el id y al menos un campo a modificar.
+        
+        Raises:
+            serializers.ValidationError: Si falta el id o no hay campos
+        """
+        if 'id' not in data:
+            raise serializers.ValidationError({'id': 'Este campo es requerido.'})
+        if len(data) == 1:
+            raise serializers.ValidationError('No se indicó ningún campo a modificar')
+        return data
+
+
+class ReduccionStockSerializer(serializers.Serializer):
+    """
+    Serializador para una línea de reducción de stock (id y cantidad).
+    """
+    
+    id = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(
+        min_value=1,
+        error_messages={'min_value': 'La cantidad debe ser un número entero positivo'}
+    )
+
+
+class ReduccionStockLoteSerializer(serializers.Serializer):
+    """
+    Serializador para reducir el stock de varios productos a la vez
+    (por ejemplo, las líneas de un pedido).
+    """
+    
+    productos = ReduccionStockSerializer(many=True, allow_empty=False)
+
+
+class LoteIdsSerializer(serializers.Serializer):
+    """
+    Serializador para obtener varios productos por id (GET/POST lote).
+    
+    Los ids repetidos se conservan una sola vez, en el orden de su primera
+    aparición. El máximo de ids se indica en el contexto (max_ids).
+    """
+    
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    
+    def validate_ids(self, value):
+        """
+        Quita los ids repetidos y controla el máximo.
+        
+        Args:
+            value (list): Ids pedidos
+            
+        Returns:
+            list: Ids sin repetir, en el orden pedido
+            
+        Raises:
+            serializers.ValidationError: Si se piden más ids de los admitidos
+        """
+        maximo = self.context.get('max_ids')
+        if maximo is not None and len(value) > maximo:
+            raise serializers.ValidationError(f'Se admiten como máximo {maximo} ids')
+        return list(dict.fromkeys(value))
+
+
+# Campos calculados del modelo: nombre -> (columnas de las que depende, función)
+CAMPOS_CALCULADOS = {
+    'precio_formateado': (('precio',), lambda fila: formatear_precio(fila['precio'])),
+    'tiene_stock': (('cantidad',), lambda fila: fila['cantidad'] > 0),
+}
+
+
+def _representar_decimal(campo):
+    """
+    Precompila la representación de un DecimalField de DRF.
+    
+    Los valores leídos de la base de datos ya tienen los decimales del
+    campo, por lo que basta con formatearlos; cualquier otro valor pasa por
+    DecimalField.to_representation.
+    """
+    exponente = -campo.decimal_places
+    
+    def representar(valor):
+        if type(valor) is decimal.Decimal and valor.as_tuple().exponent == exponente:
+            return format(valor, 'f')
+        return campo.to_representation(valor)
+    
+    if not getattr(campo, 'coerce_to_string', True) or campo.localize:
+        return campo.to_representation
+    return representar
+
+
+def _convertir_columna(columna, conversion):
+    """Función que lee una columna de la fila y le aplica la conversión"""
+    def convertir(fila):
+        return conversion(fila[columna])
+    
+    return convertir
+
+
+class ValoresSerializer:
+    """
+    Serializador de solo lectura que trabaja sobre diccionarios de values().
+    
+    A partir de un serializador DRF precompila, una sola vez, la función que
+    convierte cada fila: los campos de texto y enteros se copian tal cual,
+    los decimales y fechas usan la representación del campo DRF y los campos
+    calculados se obtienen de CAMPOS_CALCULADOS sin crear instancias del
+    modelo. El resultado es idéntico al del serializador DRF.
+    """
+    
+    # Campos DRF cuyo valor leído de la base de datos ya es su representación
+    CAMPOS_DIRECTOS = (serializers.CharField, serializers.IntegerField)
+    
+    def __init__(self, serializer_class, campos=None):
+        declarados = serializer_class().fields
+        nombres = campos if campos is not None else list(declarados)
+        
+        columnas = []
+        conversiones = []
+        for nombre in nombres:
+            campo = declarados[nombre]
+            if nombre in CAMPOS_CALCULADOS:
+                dependencias, funcion = CAMPOS_CALCULADOS[nombre]
+                columnas.extend(dependencias)
+                conversiones.append((nombre, funcion))
+            elif type(campo) in self.CAMPOS_DIRECTOS:
+                columnas.append(campo.source)
+                conversiones.append((nombre, itemgetter(campo.source)))
+            else:
+                columnas.append(campo.source)
+                if isinstance(campo, serializers.DecimalField):
+                    conversion = _representar_decimal(campo)
+                else:
+                    conversion = campo.to_representation
+                conversiones.append((nombre, _convertir_columna(campo.source, conversion)))
+        
+        self.campos = list(nombres)
+        self.columnas = list(dict.fromkeys(columnas))
+        conversiones = tuple(conversiones)
+        
+        # Cada campo se resuelve con una sola llamada por fila: itemgetter
+        # para las columnas directas y una clausura para las convertidas
+        def convertir(fila):
+            return {nombre: obtener(fila) for nombre, obtener in conversiones}
+        
+        self.convertir = convertir
+    
+    def serializar(self, filas):
+        """
+        Convierte filas de values() en la representación de la API.
+        
+        Args:
+            filas: Iterable de diccionarios con self.columnas
+            
+        Returns:
+            list: Diccionarios con los campos del serializador, en su orden
+        """
+        inicio = time.perf_counter()
+        try:
+            return list(map(self.convertir, filas))
+        finally:
+            metricas.sumar('serializacion', time.perf_counter() - inicio)
+
+
+@lru_cache(maxsize=None)
+def obtener_valores_serializer(serializer_class, campos=None):
+    """
+    Retorna un ValoresSerializer precompilado (uno por clase y campos).
+    
+    Args:
+        serializer_class: Serializador DRF de referencia
+        campos (tuple): Subconjunto de campos o None para todos
+        
+    Returns:
+        ValoresSerializer: Serializador compartido
+    """
+    return ValoresSerializer(serializer_class, list(campos) if campos is not None else None)
@@ -0,0 +1,180 @@
+"""
+Señales de la app productos.
+
+Las operaciones masivas (QuerySet.update, bulk_create, bulk_update) no
+disparan post_save ni post_delete, por lo que deben enviar la señal
+productos_modificados para que las estructuras derivadas (conteos en
+cache, índices, etc.) se mantengan sincronizadas.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import cache_objetos, cache_respuestas, facetas
+from .busqueda import CAMPOS_INDEXADOS, obtener_backend
+from .conteo import invalidar_conteos
+from .models import Producto
+
+
+# Argumentos:
+# - ids: lista de ids de los productos creados o modificados; vacía si no
+#   se conocen (se invalida todo lo derivado)
+# - campos (opcional): campos modificados; si se omite se asume cualquiera
+# - anteriores (opcional): diccionarios con los valores de
+#   Producto.CAMPOS_RASTREADOS antes del cambio ([] si todos son nuevos);
+#   si los campos rastreados no cambian, evita volver a consultarlos
+# - actuales (opcional): diccionarios con los valores de
+#   Producto.CAMPOS_RASTREADOS después del cambio; si se omiten, los
+#   receptores que los necesitan los consultan
+productos_modificados = Signal()
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(productos_modificados, sender=Producto)
+def invalidar_conteos_producto(sender, **kwargs):
+    """Invalida los conteos en cache cuando se escribe algún producto"""
+    invalidar_conteos()
+
+
+def _afecta_busqueda(campos):
+    """Indica si la modificación toca algún campo indexado para la búsqueda"""
+    return campos is None or not set(campos).isdisjoint(CAMPOS_INDEXADOS)
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, update_fields=None, **kwargs):
+    """Actualiza el índice de búsqueda al guardar un producto"""
+    if _afecta_busqueda(update_fields):
+        obtener_backend().indexar([instance])
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    """Quita el producto del índice de búsqueda al eliminarlo"""
+    obtener_backend().eliminar([instance.pk])
+
+
+@receiver(productos_modificados, sender=Producto)
+def indexar_productos_modificados(sender, ids, campos=None, **kwargs):
+    """Actualiza el índice de búsqueda tras una operación masiva"""
+    if ids and _afecta_busqueda(campos):
+        obtener_backend().indexar(
+            Producto.objects.filter(pk__in=ids).only('pk', *CAMPOS_INDEXADOS)
+        )
+
+
+def _al_confirmar(funcion, *args):
+    """
+    Ejecuta la función ahora y, si hay una transacción en curso, de nuevo al
+    confirmarla: así ninguna lectura concurrente guarda en cache datos
+    anteriores al commit con la versión nueva.
+    """
+    funcion(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: funcion(*args))
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_respuestas_producto(sender, instance, **kwargs):
+    """Invalida las respuestas en cache de la categoría y marca del producto"""
+    if not cache_respuestas.habilitada():
+        return
+    actuales = {
+        campo: instance.__dict__.get(campo) for campo in cache_respuestas.DIMENSIONES
+    }
+    if None in actuales.values():
+        _al_confirmar(cache_respuestas.invalidar_todo)
+    else:
+        _al_confirmar(cache_respuestas.invalidar, [instance.valores_originales, actuales])
+
+
+@receiver(productos_modificados, sender=Producto)
+def invalidar_respuestas_modificados(sender, ids, campos=None, anteriores=None, **kwargs):
+    """Invalida las respuestas en cache tras una operación masiva"""
+    if not cache_respuestas.habilitada():
+        return
+    cambia_rastreados = campos is None or not set(campos).isdisjoint(
+        cache_respuestas.DIMENSIONES
+    )
+    if not ids or (cambia_rastreados and anteriores is None):
+        _al_confirmar(cache_respuestas.invalidar_todo)
+        return
+
+    # Si los campos rastreados no cambiaron, los valores anteriores son los actuales
+    productos = list(anteriores or [])
+    if cambia_rastreados or anteriores is None:
+        productos += Producto.objects.filter(pk__in=ids).values(
+            *cache_respuestas.DIMENSIONES
+        ).distinct()
+    _al_confirmar(cache_respuestas.invalidar, productos)
+
+
+@receiver(post_save, sender=Producto)
+def escribir_cache_objeto(sender, instance, **kwargs):
+    """Actualiza la cache de objetos con el producto guardado"""
+    cache_objetos.escribir(instance)
+
+
+@receiver(post_delete, sender=Producto)
+def quitar_cache_objeto(sender, instance, **kwargs):
+    """Quita de la cache de objetos el producto eliminado"""
+    cache_objetos.quitar(instance.pk)
+
+
+@receiver(productos_modificados, sender=Producto)
+def recargar_cache_objetos(sender, ids, campos=None, **kwargs):
+    """
+    Recarga las entradas en cache tras una operación masiva. Las
+    operaciones de stock (campos=['cantidad']) actualizan la cache por su
+    cuenta.
+    """
+    if campos is None or not set(campos) <= {'cantidad'}:
+        cache_objetos.recargar(ids)
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_facetas_producto(sender, instance, created, **kwargs):
+    """Aplica al resumen de facetas la diferencia del producto guardado"""
+    actuales = instance.valores_rastreados()
+    if created:
+        anteriores = {}
+    else:
+        # Solo se comparan los campos con valor anterior y actual conocidos
+        originales = instance.valores_originales
+        anteriores = {campo: originales[campo] for campo in actuales if campo in originales}
+        actuales = {campo: actuales[campo] for campo in anteriores}
+    facetas.aplicar(facetas.diferencias([anteriores], [actuales]))
+
+
+@receiver(post_delete, sender=Producto)
+def descontar_facetas_producto(sender, instance, **kwargs):
+    """Descuenta del resumen de facetas el producto eliminado"""
+    valores = {**instance.valores_rastreados(), **instance.valores_originales}
+    facetas.aplicar(facetas.diferencias([valores], []))
+
+
+@receiver(productos_modificados, sender=Producto)
+def actualizar_facetas_modificados(sender, ids, campos=None, anteriores=None,
+                                   actuales=None, **kwargs):
+    """
+    Aplica al resumen de facetas una operación masiva. Sin ids o sin valores
+    anteriores no se puede calcular la diferencia y se reconstruye el resumen.
+    """
+    if campos is not None and set(campos).isdisjoint(Producto.CAMPOS_RASTREADOS):
+        return
+    if not ids or anteriores is None:
+        facetas.recalcular()
+        return
+    if actuales is None:
+        actuales = Producto.objects.filter(pk__in=ids).values(*Producto.CAMPOS_RASTREADOS)
+    facetas.aplicar(facetas.diferencias(anteriores, actuales))
+
+
+# Debe ser el último receptor de post_save: los anteriores usan los valores
+# originales del producto
+@receiver(post_save, sender=Producto)
+def actualizar_valores_originales(sender, instance, **kwargs):
+    """Toma los valores guardados como originales para el próximo cambio"""
+    instance.guardar_valores_originales()
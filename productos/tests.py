@@ -1,9 +1,53 @@
-from django.test import TestCase
+import asyncio
+import base64
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+import threading
+import uuid
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, connections
+from django.contrib.admin.sites import AdminSite
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
-from .models import Producto
+from api_productos.db_pool import Pool, PoolAgotado
+from api_productos import replicas
+from unittest import skipUnless
+from .models import Producto, ProgresoImportacion, ResumenFaceta, TerminoBusqueda
+from .renderers import ProductoJSONRenderer
+from .serializers import ProductoListSerializer, ProductoSerializer, obtener_valores_serializer
+from .busqueda import BackendBaseDatos, obtener_backend, terminos_consulta
+from .admin import PaginadorTablaGrande, ProductoAdmin
+from .cache_objetos import estadisticas
+from .cache_respuestas import (
+    CacheLRU, _clave_posicion, filtros_registrados, obtener_lru, obtener_o_calcular
+)
+from .benchmarks import carga
+from .benchmarks.catalogo import CATEGORIAS, generar_productos, sembrar
+from .facetas import contar_facetas, leer_resumen
+from . import cache_objetos, metricas
+from .lotes import crear_en_lotes, insertar_lote
+from .signals import productos_modificados
+from .texto import normalizar, tokenizar
+from .filtros import filtrar_texto
+from .paginacion import filtrar_desde, obtener_orden, ordenar
+from .urls import rutas
+from .views import ProductoViewSet
 
 
 class ProductoModelTest(TestCase):
@@ -285,4 +329,2612 @@ class ProductoAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('paginacion', response.data)
         self.assertEqual(response.data['paginacion']['total_productos'], 26)  # 25 + 1 original
-        self.assertEqual(response.data['paginacion']['pagina_actual'], 1)
\ No newline at end of file
+        self.assertEqual(response.data['paginacion']['pagina_actual'], 1)
+
+class ProductoPaginacionCursorTest(APITestCase):
+    """
+    Pruebas para la paginación por cursor (keyset) del listado.
+    
+    Verifica que recorrer el listado con cursores entregue las mismas
+    filas y en el mismo orden que la paginación por número de página.
+    """
+    
+    def setUp(self):
+        """Crea productos con precios repetidos para forzar desempates por id"""
+        for i in range(45):
+            Producto.objects.create(
+                nombre=f'Producto {i:02d}',
+                categoria='Test',
+                marca='Test',
+                precio=Decimal('10.00') + (i % 5),
+                cantidad=i
+            )
+        self.url = reverse('producto-list')
+    
+    def _recorrer(self, parametros):
+        """Recorre el listado hacia adelante y retorna los ids y las respuestas"""
+        ids = []
+        respuestas = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(self.url, {**parametros, 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(p['id'] for p in response.data['productos'])
+            respuestas.append(response)
+            cursor = response.data['paginacion']['siguiente']
+        return ids, respuestas
+    
+    def test_recorrido_coincide_con_ordenamiento(self):
+        """Prueba que el recorrido por cursor respete cada ordenamiento"""
+        ordenamientos = {
+            None: ['-fecha_creacion', '-id'],
+            'precio_asc': ['precio', 'id'],
+            'precio_desc': ['-precio', '-id'],
+            'nombre': ['nombre', 'id'],
+        }
+        for orden, campos in ordenamientos.items():
+            parametros = {'orden': orden} if orden else {}
+            ids, respuestas = self._recorrer(parametros)
+            esperado = list(
+                Producto.objects.order_by(*campos).values_list('id', flat=True)
+            )
+            self.assertEqual(ids, esperado)
+            self.assertEqual(len(respuestas), 3)
+    
+    def test_sin_conteo_total(self):
+        """Prueba que el modo cursor no informe totales ni números de página"""
+        response = self.client.get(self.url, {'cursor': ''})
+        
+        paginacion = response.data['paginacion']
+        self.assertNotIn('total_productos', paginacion)
+        self.assertFalse(paginacion['tiene_anterior'])
+        self.assertTrue(paginacion['tiene_siguiente'])
+        self.assertIsNone(paginacion['anterior'])
+    
+    def test_cursor_anterior(self):
+        """Prueba que el cursor anterior regrese a la página previa"""
+        primera = self.client.get(self.url, {'orden': 'precio_asc', 'cursor': ''})
+        segunda = self.client.get(self.url, {
+            'orden': 'precio_asc',
+            'cursor': primera.data['paginacion']['siguiente']
+        })
+        regreso = self.client.get(self.url, {
+            'orden': 'precio_asc',
+            'cursor': segunda.data['paginacion']['anterior']
+        })
+        
+        self.assertEqual(regreso.data['productos'], primera.data['productos'])
+        self.assertFalse(regreso.data['paginacion']['tiene_anterior'])
+        self.assertTrue(regreso.data['paginacion']['tiene_siguiente'])
+    
+    def test_cursor_invalido(self):
+        """Prueba que un cursor mal formado o de otro ordenamiento retorne 400"""
+        response = self.client.get(self.url, {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        primera = self.client.get(self.url, {'cursor': ''})
+        response = self.client.get(self.url, {
+            'orden': 'nombre',
+            'cursor': primera.data['paginacion']['siguiente']
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+        
+        # Bien formado pero con valor nulo
+        siguiente = primera.data['paginacion']['siguiente']
+        contenido = json.loads(base64.urlsafe_b64decode(siguiente + '=' * (-len(siguiente) % 4)))
+        contenido['v'] = None
+        cursor = base64.urlsafe_b64encode(json.dumps(contenido).encode()).decode()
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False)
+class ProductoConteoTest(APITestCase):
+    """
+    Pruebas para las estrategias de conteo del bloque de paginación.
+    """
+    
+    def setUp(self):
+        """Configuración inicial con la cache vacía"""
+        cache.clear()
+        for i in range(3):
+            Producto.objects.create(
+                nombre=f'Producto {i}',
+                categoria='Test',
+                marca='Test',
+                precio=Decimal('10.00'),
+                cantidad=i
+            )
+        self.url = reverse('producto-list')
+    
+    def test_conteo_exacto_por_defecto(self):
+        """Prueba que por defecto el total sea exacto"""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.data['paginacion']['total_productos'], 3)
+        self.assertTrue(response.data['paginacion']['total_exacto'])
+    
+    def test_conteo_en_cache(self):
+        """Prueba que el conteo en cache evite el COUNT e invalide al escribir"""
+        parametros = {'conteo': 'cache', 'solo_con_stock': 'true'}
+        response = self.client.get(self.url, parametros)
+        self.assertEqual(response.data['paginacion']['total_productos'], 2)
+        
+        # Segunda petición: solo la consulta de la página
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, parametros)
+        self.assertEqual(response.data['paginacion']['total_productos'], 2)
+        self.assertTrue(response.data['paginacion']['total_exacto'])
+        
+        Producto.objects.create(
+            nombre='Nuevo',
+            categoria='Test',
+            marca='Test',
+            precio=Decimal('5.00'),
+            cantidad=1
+        )
+        response = self.client.get(self.url, parametros)
+        self.assertEqual(response.data['paginacion']['total_productos'], 3)
+    
+    def test_conteo_estimado(self):
+        """Prueba que el conteo estimado solo se use en listados sin filtros"""
+        with mock.patch('productos.conteo.estimar_filas', return_value=1000):
+            response = self.client.get(self.url, {'conteo': 'estimado'})
+            self.assertEqual(response.data['paginacion']['total_productos'], 1000)
+            self.assertFalse(response.data['paginacion']['total_exacto'])
+            
+            response = self.client.get(self.url, {'conteo': 'estimado', 'marca': 'Test'})
+            self.assertEqual(response.data['paginacion']['total_productos'], 3)
+            self.assertTrue(response.data['paginacion']['total_exacto'])
+
+
+class TextoTest(TestCase):
+    """
+    Pruebas para la normalización de texto.
+    """
+    
+    def test_normalizar(self):
+        """Prueba que se ignoren mayúsculas, acentos y espacios repetidos"""
+        self.assertEqual(normalizar('  Electrónicos  y  MÁS '), 'electronicos y mas')
+        self.assertEqual(normalizar('Cañón'), 'canon')
+    
+    def test_tokenizar(self):
+        """Prueba que se descarten signos y palabras vacías"""
+        self.assertEqual(
+            tokenizar('Funda de Piel para iPhone, 128GB'),
+            ['funda', 'piel', 'iphone', '128gb']
+        )
+
+
+class BusquedaBaseDatosTest(APITestCase):
+    """
+    Pruebas del endpoint de búsqueda con el índice en base de datos.
+    """
+    
+    def setUp(self):
+        """Crea productos cuyo texto comparte términos en distintos campos"""
+        self.limpiar_indice()
+        self.laptop = Producto.objects.create(
+            nombre='Laptop Lenovo ThinkPad',
+            categoria='Computación',
+            marca='Lenovo',
+            precio=Decimal('999.00'),
+            cantidad=3
+        )
+        self.funda = Producto.objects.create(
+            nombre='Funda para laptop',
+            categoria='Accesorios',
+            marca='Genérica',
+            precio=Decimal('19.90'),
+            cantidad=10
+        )
+        self.mouse = Producto.objects.create(
+            nombre='Mouse inalámbrico',
+            categoria='Computación',
+            marca='Logitech',
+            precio=Decimal('25.00'),
+            cantidad=7
+        )
+        self.url = reverse('producto-buscar')
+    
+    def limpiar_indice(self):
+        """El índice en base de datos se revierte junto con cada prueba"""
+    
+    def _buscar(self, termino, **parametros):
+        response = self.client.get(self.url, {'q': termino, **parametros})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [p['id'] for p in response.data['resultados']]
+    
+    def test_ignora_acentos_y_mayusculas(self):
+        """Prueba que la búsqueda ignore acentos y mayúsculas"""
+        self.assertEqual(self._buscar('COMPUTACION'), [self.laptop.id, self.mouse.id])
+        self.assertEqual(self._buscar('inalambrico'), [self.mouse.id])
+    
+    def test_prefijo_y_relevancia(self):
+        """Prueba que acepte prefijos y ordene por relevancia"""
+        # "Lenovo" aparece en el nombre y la marca de la laptop
+        self.assertEqual(self._buscar('lapt'), [self.laptop.id, self.funda.id])
+        self.assertEqual(self._buscar('lenovo'), [self.laptop.id])
+    
+    def test_todos_los_terminos_deben_coincidir(self):
+        """Prueba que cada término de la consulta deba coincidir"""
+        self.assertEqual(self._buscar('laptop funda'), [self.funda.id])
+        self.assertEqual(self._buscar('laptop logitech'), [])
+    
+    def test_limite_y_formato(self):
+        """Prueba que se respete el límite y el formato de la respuesta"""
+        response = self.client.get(self.url, {'q': 'laptop', 'limit': 1})
+        
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['termino_busqueda'], 'laptop')
+        self.assertIn('precio_formateado', response.data['resultados'][0])
+    
+    def test_sincronizado_con_escrituras(self):
+        """Prueba que el índice siga las modificaciones y eliminaciones"""
+        self.assertEqual(self._buscar('mouse'), [self.mouse.id])
+        
+        self.mouse.nombre = 'Teclado mecánico'
+        self.mouse.save()
+        self.funda.delete()
+        
+        self.assertEqual(self._buscar('mouse'), [])
+        self.assertEqual(self._buscar('teclado'), [self.mouse.id])
+        self.assertEqual(self._buscar('funda'), [])
+
+
+@override_settings(PRODUCTOS_BUSQUEDA_BACKEND='productos.busqueda.BackendMemoria')
+class BusquedaMemoriaTest(BusquedaBaseDatosTest):
+    """
+    Las mismas pruebas de búsqueda con el índice en memoria del proceso.
+    """
+    
+    def limpiar_indice(self):
+        """Descarta el índice en memoria para reconstruirlo con los datos de la prueba"""
+        obtener_backend().limpiar()
+
+
+class ReducirStockLoteTest(APITestCase):
+    """
+    Pruebas para la reducción de stock en lote (todo o nada).
+    """
+    
+    def setUp(self):
+        """Crea dos productos con stock conocido"""
+        self.teclado = Producto.objects.create(
+            nombre='Teclado',
+            categoria='Accesorios',
+            marca='Logitech',
+            precio=Decimal('45.00'),
+            cantidad=5
+        )
+        self.monitor = Producto.objects.create(
+            nombre='Monitor',
+            categoria='Electrónicos',
+            marca='LG',
+            precio=Decimal('250.00'),
+            cantidad=2
+        )
+        self.url = reverse('producto-reducir-stock-lote')
+    
+    def test_reducir_lote(self):
+        """Prueba que se reduzca el stock de todas las líneas, acumulando repetidos"""
+        datos = {'productos': [
+            {'id': self.teclado.id, 'cantidad': 2},
+            {'id': self.monitor.id, 'cantidad': 2},
+            {'id': self.teclado.id, 'cantidad': 1},
+        ]}
+        response = self.client.post(self.url, datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['productos']), 2)
+        self.teclado.refresh_from_db()
+        self.monitor.refresh_from_db()
+        self.assertEqual(self.teclado.cantidad, 2)
+        self.assertEqual(self.monitor.cantidad, 0)
+    
+    def test_lote_todo_o_nada(self):
+        """Prueba que un faltante o un id inexistente no modifique ningún producto"""
+        datos = {'productos': [
+            {'id': self.teclado.id, 'cantidad': 1},
+            {'id': self.monitor.id, 'cantidad': 3},
+            {'id': 999999, 'cantidad': 1},
+        ]}
+        response = self.client.post(self.url, datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['sin_stock_suficiente'], [self.monitor.id])
+        self.assertEqual(response.data['no_encontrados'], [999999])
+        self.teclado.refresh_from_db()
+        self.assertEqual(self.teclado.cantidad, 5)
+    
+    def test_lote_invalido(self):
+        """Prueba la validación de las líneas del lote"""
+        for datos in ({'productos': []}, {'productos': [{'id': self.teclado.id, 'cantidad': 0}]}):
+            response = self.client.post(self.url, datos, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_reducir_stock_actualiza_solo_cantidad(self):
+        """Prueba que la reducción individual sea un UPDATE de cantidad y fecha"""
+        with self.assertNumQueries(2) as consultas:
+            self.assertTrue(self.teclado.reducir_stock(2))
+        
+        update = consultas.captured_queries[0]['sql']
+        self.assertTrue(update.startswith('UPDATE'))
+        self.assertNotIn('nombre', update)
+        self.assertEqual(self.teclado.cantidad, 3)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ReducirStockConcurrenciaTest(TransactionTestCase):
+    """
+    Prueba de contención: varios hilos reducen el stock del mismo producto.
+    
+    Requiere una base de datos que admita varias conexiones simultáneas
+    (por ejemplo MySQL; SQLite no la admite).
+    """
+    
+    def test_sin_actualizaciones_perdidas(self):
+        """Prueba que ninguna reducción se pierda ni deje el stock negativo"""
+        producto = Producto.objects.create(
+            nombre='Producto concurrido',
+            categoria='Test',
+            marca='Test',
+            precio=Decimal('10.00'),
+            cantidad=50
+        )
+        exitosas = []
+        candado = threading.Lock()
+        
+        def comprar():
+            try:
+                for _ in range(10):
+                    if Producto(pk=producto.pk).reducir_stock(1):
+                        with candado:
+                            exitosas.append(1)
+            finally:
+                connection.close()
+        
+        hilos = [threading.Thread(target=comprar) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        
+        producto.refresh_from_db()
+        self.assertEqual(len(exitosas), 50)
+        self.assertEqual(producto.cantidad, 0)
+
+
+class ProductoMasivoTest(APITestCase):
+    """
+    Pruebas para la creación y actualización masiva de productos.
+    """
+    
+    def setUp(self):
+        """Crea un producto existente para probar el upsert"""
+        self.existente = Producto.objects.create(
+            nombre='Audífonos',
+            categoria='Audio',
+            marca='Sony',
+            precio=Decimal('80.00'),
+            cantidad=4
+        )
+        self.url = reverse('producto-masivo')
+    
+    def _producto(self, nombre, **campos):
+        datos = {
+            'nombre': nombre,
+            'categoria': 'Audio',
+            'marca': 'Sony',
+            'precio': '10.00',
+            'cantidad': 1
+        }
+        datos.update(campos)
+        return datos
+    
+    @override_settings(PRODUCTOS_TAMANO_LOTE=2)
+    def test_crear_en_lotes(self):
+        """Prueba la creación en varios lotes con ids en el orden recibido"""
+        datos = [self._producto(f'Bocina {i}') for i in range(5)]
+        response = self.client.post(self.url, datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creados'], 5)
+        ids = [p['id'] for p in response.data['productos']]
+        nombres = Producto.objects.in_bulk(ids)
+        self.assertEqual([nombres[pk].nombre for pk in ids], [d['nombre'] for d in datos])
+        # Los productos creados quedan indexados para la búsqueda
+        busqueda = self.client.get(reverse('producto-buscar'), {'q': 'bocina'})
+        self.assertEqual(len(busqueda.data['resultados']), 5)
+    
+    def test_errores_por_elemento(self):
+        """Prueba que los elementos inválidos no aborten la carga"""
+        datos = [
+            self._producto('Válido'),
+            self._producto('Precio inválido', precio='-1'),
+            self._producto('Sin cantidad', cantidad=None),
+        ]
+        response = self.client.post(self.url, datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual([e['indice'] for e in response.data['errores']], [1, 2])
+        self.assertIn('precio', response.data['errores'][0]['errores'])
+        self.assertTrue(Producto.objects.filter(nombre='Válido').exists())
+    
+    def test_todos_invalidos(self):
+        """Prueba que una carga sin elementos válidos retorne 400"""
+        response = self.client.post(self.url, [self._producto('')], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(self.url, {'nombre': 'No es lista'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_upsert(self):
+        """Prueba que el upsert actualice por nombre y marca"""
+        datos = [
+            self._producto('Audífonos', precio='75.00', cantidad=9),
+            self._producto('Audífonos', marca='JBL'),
+        ]
+        response = self.client.post(self.url + '?upsert=true', datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual(response.data['productos'][0]['id'], self.existente.id)
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.precio, Decimal('75.00'))
+        self.assertEqual(self.existente.cantidad, 9)
+        self.assertEqual(Producto.objects.count(), 2)
+    
+    def test_ids_sin_returning(self):
+        """Prueba la asignación de ids en motores sin RETURNING (MySQL)"""
+        productos = [
+            Producto(nombre='Cable', categoria='Audio', marca='Sony',
+                     precio=Decimal('5.00'), cantidad=1)
+            for _ in range(3)
+        ]
+        with mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', False
+        ):
+            insertar_lote(productos)
+        
+        ids = [p.pk for p in productos]
+        self.assertNotIn(None, ids)
+        self.assertEqual(len(set(ids)), 3)
+
+
+class ProductoExportacionTest(APITestCase):
+    """
+    Pruebas para la exportación del catálogo en streaming.
+    """
+    
+    def setUp(self):
+        """Crea productos con y sin stock"""
+        for i in range(7):
+            Producto.objects.create(
+                nombre=f'Cámara {i}',
+                categoria='Fotografía',
+                marca='Canon',
+                precio=Decimal('100.00') + i,
+                cantidad=i % 2
+            )
+        self.url = reverse('producto-exportar')
+    
+    def _contenido(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+    
+    @override_settings(PRODUCTOS_EXPORTACION_LOTE=3)
+    def test_exportar_ndjson(self):
+        """Prueba que cada línea coincida con la representación de la API"""
+        response = self.client.get(self.url, {'orden': 'precio_desc'})
+        filas = [json.loads(linea) for linea in self._contenido(response).splitlines()]
+        
+        productos = Producto.objects.order_by('-precio')
+        esperado = ProductoSerializer(productos, many=True).data
+        self.assertEqual(len(filas), 7)
+        for fila, producto in zip(filas, esperado):
+            self.assertEqual(fila, {campo: producto[campo] for campo in fila})
+    
+    def test_exportar_csv_con_filtros(self):
+        """Prueba la exportación CSV respetando los filtros del listado"""
+        response = self.client.get(self.url, {'formato': 'csv', 'solo_con_stock': 'true'})
+        filas = list(csv.DictReader(io.StringIO(self._contenido(response))))
+        
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(filas), 3)
+        self.assertTrue(all(fila['cantidad'] == '1' for fila in filas))
+    
+    def test_formato_invalido(self):
+        """Prueba que un formato desconocido retorne 400"""
+        response = self.client.get(self.url, {'formato': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportarProductosTest(TransactionTestCase):
+    """
+    Pruebas para el comando de importación masiva.
+    """
+    
+    def setUp(self):
+        """Crea un archivo CSV con filas válidas e inválidas"""
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, 'proveedor.csv')
+        with open(self.ruta, 'w', encoding='utf-8', newline='') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['nombre', 'categoria', 'marca', 'precio', 'cantidad'])
+            for i in range(10):
+                escritor.writerow([f'Producto {i}', 'Hogar', 'Acme', '12.50', i])
+            escritor.writerow(['  ', 'Hogar', 'Acme', '12.50', 1])
+            escritor.writerow(['Precio cero', 'Hogar', 'Acme', '0', 1])
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def _importar(self, *argumentos):
+        salida = io.StringIO()
+        call_command('importar_productos', self.ruta, '--lote', '2',
+                     '--lotes-por-transaccion', '2', *argumentos, stdout=salida)
+        return salida.getvalue()
+    
+    def test_importar_csv(self):
+        """Prueba la importación con validación y reporte de velocidad"""
+        salida = self._importar()
+        
+        self.assertEqual(Producto.objects.count(), 10)
+        self.assertIn('filas/s', salida)
+        with open(self.ruta + '.errores', encoding='utf-8') as archivo:
+            errores = [json.loads(linea) for linea in archivo]
+        self.assertEqual([e['fila'] for e in errores], [11, 12])
+        self.assertIn('nombre', errores[0]['errores'])
+        # Terminada la importación no queda progreso para reanudar
+        self.assertFalse(ProgresoImportacion.objects.filter(archivo=os.path.abspath(self.ruta)).exists())
+    
+    def test_reanudar_tras_fallo(self):
+        """Prueba que --reanudar continúe desde el último bloque confirmado"""
+        from productos.management.commands import importar_productos
+        
+        original = importar_productos.insertar_lote
+        llamadas = []
+        
+        def insertar_con_fallo(productos):
+            llamadas.append(1)
+            if len(llamadas) == 4:
+                raise RuntimeError('Conexión perdida')
+            return original(productos)
+        
+        with mock.patch.object(importar_productos, 'insertar_lote', insertar_con_fallo):
+            with self.assertRaises(RuntimeError):
+                self._importar()
+        
+        # El primer bloque (4 filas) quedó confirmado; el segundo se revirtió
+        self.assertEqual(Producto.objects.count(), 4)
+        
+        self._importar('--reanudar')
+        nombres = Producto.objects.values_list('nombre', flat=True)
+        self.assertEqual(sorted(nombres), sorted(f'Producto {i}' for i in range(10)))
+    
+    def test_reanudar_tras_fallo_al_avisar(self):
+        """Prueba que un fallo tras los INSERT revierta el bloque y su progreso"""
+        llamadas = []
+        
+        def receptor_con_fallo(sender, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                raise RuntimeError('Proceso terminado')
+        
+        productos_modificados.connect(receptor_con_fallo, sender=Producto)
+        try:
+            with self.assertRaises(RuntimeError):
+                self._importar()
+        finally:
+            productos_modificados.disconnect(receptor_con_fallo, sender=Producto)
+        
+        self.assertEqual(Producto.objects.count(), 4)
+        self.assertEqual(ProgresoImportacion.objects.get().filas, 4)
+        
+        self._importar('--reanudar')
+        nombres = Producto.objects.values_list('nombre', flat=True)
+        self.assertEqual(sorted(nombres), sorted(f'Producto {i}' for i in range(10)))
+        self.assertEqual(leer_resumen(), {
+            clave: total for clave, total in contar_facetas(Producto.objects.all()).items() if total
+        })
+        self.assertFalse(ProgresoImportacion.objects.exists())
+        with open(self.ruta + '.errores', encoding='utf-8') as archivo:
+            self.assertEqual([json.loads(linea)['fila'] for linea in archivo], [11, 12])
+    
+    def test_importar_ndjson_con_trabajadores(self):
+        """Prueba la importación NDJSON validando en procesos trabajadores"""
+        ruta = os.path.join(self.directorio.name, 'proveedor.ndjson')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            for i in range(9):
+                archivo.write(json.dumps({
+                    'nombre': f'Lámpara {i}', 'categoria': 'Hogar',
+                    'marca': 'Acme', 'precio': '30.00', 'cantidad': 3
+                }) + '\n')
+            archivo.write('{no es json}\n')
+        
+        call_command('importar_productos', ruta, '--lote', '2',
+                     '--trabajadores', '2', stdout=io.StringIO())
+        
+        self.assertEqual(Producto.objects.filter(nombre__startswith='Lámpara').count(), 9)
+
+
+class ValoresSerializerTest(APITestCase):
+    """
+    Pruebas del serializador rápido basado en values().
+    
+    Su salida debe ser idéntica, byte a byte, a la del serializador DRF.
+    """
+    
+    def setUp(self):
+        """Crea productos con valores límite"""
+        for nombre, precio, cantidad in (
+            ('Cámara réflex "Pro"', Decimal('1234567.50'), 0),
+            ('Tornillo', Decimal('0.01'), 100000),
+            ('Café 日本', Decimal('99999999.99'), 1),
+        ):
+            Producto.objects.create(
+                nombre=nombre,
+                categoria='Categoría',
+                marca='Marca',
+                precio=precio,
+                cantidad=cantidad
+            )
+    
+    def _comparar(self, serializer_class):
+        productos = Producto.objects.order_by('id')
+        rapido = obtener_valores_serializer(serializer_class)
+        
+        esperado = JSONRenderer().render(serializer_class(productos, many=True).data)
+        obtenido = JSONRenderer().render(rapido.serializar(productos.values(*rapido.columnas)))
+        self.assertEqual(obtenido, esperado)
+    
+    def test_identico_a_list_serializer(self):
+        """Prueba la equivalencia con ProductoListSerializer"""
+        self._comparar(ProductoListSerializer)
+    
+    def test_identico_a_producto_serializer(self):
+        """Prueba la equivalencia con ProductoSerializer (incluye fechas)"""
+        self._comparar(ProductoSerializer)
+    
+    def test_listado_sin_instancias(self):
+        """Prueba que el listado use el serializador rápido con dos consultas"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('producto-list'))
+        
+        esperado = ProductoListSerializer(Producto.objects.all(), many=True).data
+        self.assertEqual(
+            JSONRenderer().render(response.data['productos']),
+            JSONRenderer().render(esperado)
+        )
+
+
+class ProductoJSONRendererTest(APITestCase):
+    """
+    Pruebas del renderizador JSON de la API.
+    
+    Su salida debe ser idéntica, byte a byte, a la de JSONRenderer.
+    """
+    
+    def _comparar(self, datos, accepted_media_type=None):
+        self.assertEqual(
+            ProductoJSONRenderer().render(datos, accepted_media_type),
+            JSONRenderer().render(datos, accepted_media_type)
+        )
+    
+    def test_tipos_no_nativos(self):
+        """Prueba Decimal, fechas, duraciones, UUID y texto no ASCII"""
+        self._comparar({
+            'precio': Decimal('1299.99'),
+            'fecha': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+            'fecha_local': datetime(2024, 5, 1, 12, 30, 15, 123456),
+            'dia': date(2024, 5, 1),
+            'duracion': timedelta(minutes=90),
+            'id': uuid.UUID(int=1),
+            'nombre': 'Café 日本 \u2028 "Pro"',
+            'lista': [1, 2.5, None, True],
+        })
+    
+    def test_indentacion(self):
+        """Prueba que las respuestas con indent también coincidan"""
+        self._comparar({'precio': Decimal('1.50')}, 'application/json; indent=4')
+    
+    @override_settings(PRODUCTOS_JSON_COMPACTO=False)
+    def test_modo_no_compacto(self):
+        """Prueba que sin modo compacto se usen espacios tras los separadores"""
+        self.assertEqual(
+            ProductoJSONRenderer().render({'a': [1, 2]}), b'{"a": [1, 2]}'
+        )
+    
+    def test_listado(self):
+        """Prueba que la API responda con el renderizador y el mismo contenido"""
+        Producto.objects.create(
+            nombre='Cámara', categoria='Foto', marca='Acme',
+            precio=Decimal('10.00'), cantidad=1
+        )
+        response = self.client.get(reverse('producto-list'))
+        
+        self.assertIsInstance(response.accepted_renderer, ProductoJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False)
+class PeticionesCondicionalesTest(APITestCase):
+    """
+    Pruebas de ETag / Last-Modified en el detalle y los listados.
+    """
+    
+    def setUp(self):
+        """Crea productos de prueba"""
+        self.producto = Producto.objects.create(
+            nombre='Monitor', categoria='Electrónicos', marca='LG',
+            precio=Decimal('300.00'), cantidad=5
+        )
+        Producto.objects.create(
+            nombre='Silla', categoria='Hogar', marca='Ikea',
+            precio=Decimal('80.00'), cantidad=0
+        )
+    
+    def test_detalle_304_con_etag(self):
+        """Prueba que el detalle responda 304 sin serializar si no cambió"""
+        url = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        
+        with mock.patch.object(ProductoSerializer, 'to_representation') as serializar:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        serializar.assert_not_called()
+        
+        self.producto.precio = Decimal('280.00')
+        self.producto.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_detalle_if_modified_since(self):
+        """Prueba If-Modified-Since con la fecha de última modificación"""
+        url = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+        ultima = self.client.get(url)['Last-Modified']
+        
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_listado_304_hasta_que_cambia_el_conjunto(self):
+        """Prueba la huella del listado: cambia al crear, modificar o eliminar"""
+        url = reverse('producto-list')
+        etag = self.client.get(url, {'categoria': 'Electrónicos'})['ETag']
+        
+        response = self.client.get(url, {'categoria': 'Electrónicos'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # Un cambio fuera del filtro no invalida el listado filtrado
+        Producto.objects.filter(nombre='Silla').update(cantidad=3)
+        response = self.client.get(url, {'categoria': 'Electrónicos'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.producto.delete()
+        response = self.client.get(url, {'categoria': 'Electrónicos'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_listado_una_consulta_con_304(self):
+        """Prueba que el 304 del listado cueste una sola consulta agregada"""
+        url = reverse('producto-list')
+        etag = self.client.get(url)['ETag']
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cursor_sin_huella(self):
+        """Prueba que el modo cursor valide con la página: un solo SELECT, sin agregados"""
+        for url in (reverse('producto-list'), reverse('producto-sin-stock')):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url, {'cursor': ''})
+            self.assertEqual(len(consultas), 1, url)
+            self.assertNotIn('COUNT(', consultas[0]['sql'].upper())
+            self.assertNotIn('MAX(', consultas[0]['sql'].upper())
+            self.assertNotIn('Last-Modified', response)
+
+            etag = response['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, {'cursor': ''}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+        url = reverse('producto-list')
+        etag = self.client.get(url, {'cursor': ''})['ETag']
+        self.producto.precio = Decimal('280.00')
+        self.producto.save()
+        response = self.client.get(url, {'cursor': ''}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conteo_estimado_sin_count_exacto(self):
+        """Prueba que conteo=estimado no ejecute COUNT(*) para los validadores"""
+        url = reverse('producto-list')
+        with mock.patch('productos.conteo.estimar_filas', return_value=2):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url, {'conteo': 'estimado'})
+            self.assertFalse(
+                any('COUNT(' in consulta['sql'].upper() for consulta in consultas)
+            )
+
+            response = self.client.get(
+                url, {'conteo': 'estimado'}, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_filtros(self):
+        """Prueba el 304 en por_categoria, por_marca y sin_stock"""
+        for url in (
+            reverse('producto-por-categoria', kwargs={'categoria': 'Hogar'}),
+            reverse('producto-por-marca', kwargs={'marca': 'LG'}),
+            reverse('producto-sin-stock'),
+        ):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+        
+        Producto.reducir_stock_lote([(self.producto.pk, 5)])
+        response = self.client.get(reverse('producto-sin-stock'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CacheRespuestasTest(APITestCase):
+    """
+    Pruebas de la cache de respuestas de los listados y su invalidación.
+    """
+    
+    def setUp(self):
+        """Crea productos de dos categorías con la cache vacía"""
+        cache.clear()
+        obtener_lru().limpiar()
+        self.monitor = Producto.objects.create(
+            nombre='Monitor', categoria='Electrónicos', marca='LG',
+            precio=Decimal('300.00'), cantidad=5
+        )
+        self.silla = Producto.objects.create(
+            nombre='Silla', categoria='Hogar', marca='Ikea',
+            precio=Decimal('80.00'), cantidad=2
+        )
+    
+    def test_segunda_peticion_sin_consultas(self):
+        """Prueba que la respuesta repetida salga de la cache"""
+        url = reverse('producto-list')
+        primera = self.client.get(url, {'orden': 'precio_asc'})
+        
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url, {'orden': 'precio_asc'})
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+    
+    def test_304_desde_cache(self):
+        """Prueba que las peticiones condicionales se resuelvan sin consultas"""
+        url = reverse('producto-por-marca', kwargs={'marca': 'LG'})
+        etag = self.client.get(url)['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_invalidacion_por_categoria(self):
+        """Prueba que una escritura solo invalide las categorías que toca"""
+        hogar = reverse('producto-por-categoria', kwargs={'categoria': 'Hogar'})
+        electronica = reverse('producto-list')
+        self.client.get(hogar)
+        self.client.get(electronica, {'categoria': 'elec'})
+        
+        self.monitor.precio = Decimal('250.00')
+        self.monitor.save()
+        
+        with self.assertNumQueries(0):
+            self.client.get(hogar)
+        response = self.client.get(electronica, {'categoria': 'elec'})
+        self.assertEqual(response.data['productos'][0]['precio'], '250.00')
+    
+    def test_cambio_de_categoria_invalida_ambas(self):
+        """Prueba que mover un producto invalide la categoría anterior y la nueva"""
+        hogar = reverse('producto-por-categoria', kwargs={'categoria': 'Hogar'})
+        electronica = reverse('producto-por-categoria', kwargs={'categoria': 'Electrónicos'})
+        self.client.get(hogar)
+        self.client.get(electronica)
+        
+        producto = Producto.objects.get(pk=self.monitor.pk)
+        producto.categoria = 'Hogar'
+        producto.save()
+        
+        self.assertEqual(self.client.get(hogar).data['total'], 2)
+        self.assertEqual(self.client.get(electronica).data['total'], 0)
+    
+    def test_invalidacion_masiva(self):
+        """Prueba la invalidación tras reducir stock en lote"""
+        url = reverse('producto-sin-stock')
+        self.assertEqual(self.client.get(url).data['total'], 0)
+        
+        Producto.reducir_stock_lote([(self.silla.pk, 2)])
+
+        self.assertEqual(self.client.get(url).data['total'], 1)
+
+    @override_settings(PRODUCTOS_CACHE_RESPUESTAS_FILTROS=1)
+    def test_registro_lleno_usa_version_global(self):
+        """Prueba que un filtro sin posición en el registro se invalide con cualquier escritura"""
+        hogar = reverse('producto-por-categoria', kwargs={'categoria': 'Hogar'})
+        electronica = reverse('producto-por-categoria', kwargs={'categoria': 'Electrónicos'})
+        self.client.get(hogar)
+        self.client.get(electronica)
+        self.assertEqual(filtros_registrados('categoria'), ['hogar'])
+
+        self.monitor.precio = Decimal('250.00')
+        self.monitor.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(hogar)
+        response = self.client.get(electronica)
+        self.assertEqual(response.data['productos'][0]['precio'], '250.00')
+
+    def test_registro_expulsado_no_sirve_respuestas_viejas(self):
+        """Prueba que perder la posición de un filtro descarte sus respuestas"""
+        url = reverse('producto-por-categoria', kwargs={'categoria': 'Electrónicos'})
+        self.client.get(url)
+        cache.delete(_clave_posicion('categoria', normalizar('Electrónicos')))
+        obtener_lru().limpiar()
+
+        self.monitor.precio = Decimal('250.00')
+        self.monitor.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['productos'][0]['precio'], '250.00')
+
+    def test_espera_al_calculo_en_curso(self):
+        """Prueba que solo un proceso calcule una clave mientras otro la calcula"""
+        cache.add('clave:calculando', True)
+        threading.Timer(0.05, lambda: cache.set('clave', 'calculado')).start()
+        calcular = mock.Mock(return_value='propio')
+        
+        valor, desde_cache = obtener_o_calcular('clave', calcular)
+        
+        self.assertEqual(valor, 'calculado')
+        self.assertTrue(desde_cache)
+        calcular.assert_not_called()
+    
+    def test_lru_descarta_la_menos_usada(self):
+        """Prueba el límite de entradas de la cache del proceso"""
+        lru = CacheLRU(2)
+        lru.guardar('a', 1, 60)
+        lru.guardar('b', 2, 60)
+        lru.obtener('a')
+        lru.guardar('c', 3, 60)
+        
+        self.assertEqual(lru.obtener('a'), 1)
+        self.assertIsNone(lru.obtener('b'))
+        self.assertEqual(len(lru), 2)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False)
+class CacheObjetosTest(TransactionTestCase):
+    """
+    Pruebas de la cache de objetos (write-through) del detalle y del stock.
+    
+    Usa TransactionTestCase para que las escrituras se confirmen y se
+    apliquen a la cache igual que en producción.
+    """
+    
+    def setUp(self):
+        """Crea un producto con la cache y los contadores vacíos"""
+        cache.clear()
+        estadisticas.reiniciar()
+        self.producto = Producto.objects.create(
+            nombre='Teclado', categoria='Accesorios', marca='Logitech',
+            precio=Decimal('50.00'), cantidad=10
+        )
+        self.url = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+    
+    def test_detalle_desde_cache(self):
+        """Prueba que el detalle no consulte la base de datos con la cache llena"""
+        cache.clear()
+        primera = self.client.get(self.url)
+        
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url)
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(estadisticas.aciertos, 1)
+        self.assertEqual(estadisticas.fallos, 1)
+    
+    def test_save_actualiza_la_cache(self):
+        """Prueba que save escriba los valores nuevos en la cache"""
+        self.producto.precio = Decimal('45.00')
+        self.producto.save()
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['precio'], '45.00')
+    
+    def test_reducir_stock_actualiza_la_cache(self):
+        """Prueba que las reducciones de stock decrementen la cantidad en cache"""
+        url = reverse('producto-reducir-stock', kwargs={'pk': self.producto.pk})
+        response = self.client.post(
+            url, json.dumps({'cantidad': 3}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Producto.reducir_stock_lote([(self.producto.pk, 2)])
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['cantidad'], 5)
+    
+    def test_llenado_con_lectura_anterior_a_una_reduccion(self):
+        """Prueba que un lector con la cantidad vieja no pise la que dejó una reducción"""
+        pk = self.producto.pk
+        cache.clear()
+        
+        def cargar():
+            # El lector lee la fila y, antes de guardarla, otra petición
+            # reduce el stock sin encontrar la cantidad en cache
+            leido = Producto.objects.get(pk=pk)
+            Producto.objects.get(pk=pk).reducir_stock(1)
+            return leido
+        
+        self.assertEqual(cache_objetos.obtener_o_cargar(pk, cargar).cantidad, 10)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['cantidad'], 9)
+    
+    def test_reduccion_no_pisa_un_guardado_concurrente(self):
+        """Prueba que una reducción no restaure la entrada anterior a un save concurrente"""
+        pk = self.producto.pk
+        self.client.get(self.url)
+        set_many = cache.set_many
+        concurrente = []
+        
+        def escribir(entradas, *args, **kwargs):
+            # El primer set_many de la reducción llega después del write-through
+            # de un save confirmado mientras se aplicaba
+            if not concurrente:
+                concurrente.append(True)
+                producto = Producto.objects.get(pk=pk)
+                producto.nombre = 'Renombrado'
+                producto.save()
+            return set_many(entradas, *args, **kwargs)
+        
+        with mock.patch.object(cache, 'set_many', side_effect=escribir):
+            Producto.objects.get(pk=pk).reducir_stock(1)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['nombre'], 'Renombrado')
+        self.assertEqual(response.json()['cantidad'], 9)
+    
+    def test_marcar_sin_stock_actualiza_la_cache(self):
+        """Prueba la acción masiva del admin"""
+        admin = ProductoAdmin(Producto, AdminSite())
+        with mock.patch.object(admin, 'message_user'):
+            admin.marcar_sin_stock(
+                RequestFactory().post('/'), Producto.objects.filter(pk=self.producto.pk)
+            )
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['cantidad'], 0)
+    
+    def test_eliminar_quita_de_la_cache(self):
+        """Prueba que el detalle de un producto eliminado responda 404"""
+        self.producto.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_transaccion_revertida(self):
+        """Prueba que una escritura revertida no deje valores en la cache"""
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                self.producto.precio = Decimal('1.00')
+                self.producto.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        
+        self.assertEqual(self.client.get(self.url).json()['precio'], '50.00')
+    
+    @override_settings(PRODUCTOS_CACHE_OBJETOS=False)
+    def test_deshabilitada(self):
+        """Prueba que la cache se pueda desactivar por configuración"""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_MAX_POR_PAGINA=10)
+class AccionesFiltroPaginadasTest(APITestCase):
+    """
+    Pruebas de paginación y streaming de por_categoria, por_marca y sin_stock.
+    """
+    
+    def setUp(self):
+        """Crea 25 productos de la misma categoría, 5 sin stock"""
+        for i in range(25):
+            Producto.objects.create(
+                nombre=f'Cable {i:02d}', categoria='Accesorios', marca='Ugreen',
+                precio=Decimal('10.00') + i, cantidad=0 if i % 5 == 0 else 3
+            )
+        self.url = reverse('producto-por-categoria', kwargs={'categoria': 'Accesorios'})
+    
+    def test_paginacion_por_pagina(self):
+        """Prueba que la acción pagine como el listado"""
+        response = self.client.get(self.url, {'page': 2, 'por_pagina': 5})
+        
+        self.assertEqual(len(response.data['productos']), 5)
+        self.assertEqual(response.data['total'], 25)
+        self.assertEqual(response.data['paginacion']['pagina_actual'], 2)
+        self.assertEqual(response.data['paginacion']['total_paginas'], 5)
+    
+    def test_maximo_por_pagina(self):
+        """Prueba que el servidor limite el tamaño de página"""
+        response = self.client.get(self.url, {'por_pagina': 1000})
+        self.assertEqual(len(response.data['productos']), 10)
+        self.assertEqual(response.data['paginacion']['productos_por_pagina'], 10)
+        
+        response = self.client.get(reverse('producto-list'), {'por_pagina': 1000})
+        self.assertEqual(len(response.data['productos']), 10)
+    
+    def test_paginacion_por_cursor(self):
+        """Prueba recorrer sin_stock completo con cursores"""
+        url = reverse('producto-sin-stock')
+        vistos = []
+        parametros = {'cursor': '', 'por_pagina': 2, 'orden': 'nombre'}
+        while True:
+            response = self.client.get(url, parametros)
+            vistos.extend(p['nombre'] for p in response.data['productos_sin_stock'])
+            if not response.data['paginacion']['tiene_siguiente']:
+                break
+            parametros['cursor'] = response.data['paginacion']['siguiente']
+        
+        self.assertEqual(vistos, [f'Cable {i:02d}' for i in range(0, 25, 5)])
+    
+    def test_completo_en_streaming(self):
+        """Prueba que completo=true envíe todas las filas sin paginar"""
+        response = self.client.get(
+            reverse('producto-por-marca', kwargs={'marca': 'ugreen'}),
+            {'completo': 'true', 'orden': 'precio_asc'}
+        )
+        
+        self.assertTrue(response.streaming)
+        datos = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(datos['marca'], 'ugreen')
+        self.assertEqual(datos['total'], 25)
+        self.assertEqual(datos['productos'][0]['nombre'], 'Cable 00')
+        self.assertEqual(
+            datos['productos'],
+            json.loads(JSONRenderer().render(ProductoListSerializer(
+                Producto.objects.order_by('precio'), many=True
+            ).data))
+        )
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False)
+class FiltrosNormalizadosTest(APITestCase):
+    """
+    Pruebas de las columnas normalizadas y los modos de coincidencia.
+    """
+    
+    def setUp(self):
+        """Crea productos con acentos y mayúsculas en categoría y marca"""
+        self.camara = Producto.objects.create(
+            nombre='Cámara', categoria='Fotografía Digital', marca='Canón',
+            precio=Decimal('500.00'), cantidad=2
+        )
+        self.lente = Producto.objects.create(
+            nombre='Lente', categoria='Accesorios de Fotografía', marca='CANON',
+            precio=Decimal('200.00'), cantidad=4
+        )
+        self.url = reverse('producto-list')
+    
+    def _ids(self, url, **parametros):
+        response = self.client.get(url, parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(p['id'] for p in response.data['productos'])
+    
+    def test_columnas_mantenidas_al_guardar(self):
+        """Prueba que save() calcule las columnas normalizadas"""
+        self.assertEqual(self.camara.categoria_normalizada, 'fotografia digital')
+        self.assertEqual(self.camara.marca_normalizada, 'canon')
+        
+        self.camara.marca = 'Nikón'
+        self.camara.save(update_fields=['marca'])
+        self.camara.refresh_from_db()
+        self.assertEqual(self.camara.marca_normalizada, 'nikon')
+    
+    def test_columnas_mantenidas_en_lote(self):
+        """Prueba que las escrituras en lote calculen las columnas"""
+        producto, = insertar_lote([Producto(
+            nombre='Trípode', categoria='Fotografía', marca='Ñandú',
+            precio=Decimal('30.00'), cantidad=1
+        )])
+        self.assertEqual(
+            Producto.objects.filter(pk=producto.pk)
+            .values_list('categoria_normalizada', 'marca_normalizada').get(),
+            ('fotografia', 'nandu')
+        )
+    
+    def test_modos_de_coincidencia(self):
+        """Prueba los modos exacto, prefijo y contiene"""
+        todos = sorted([self.camara.id, self.lente.id])
+        self.assertEqual(self._ids(self.url, marca='canon', coincidencia='exacto'), todos)
+        self.assertEqual(self._ids(self.url, marca='can', coincidencia='exacto'), [])
+        self.assertEqual(self._ids(self.url, categoria='FOTO', coincidencia='prefijo'),
+                         [self.camara.id])
+        self.assertEqual(self._ids(self.url, categoria='fotografía', coincidencia='contiene'),
+                         todos)
+    
+    def test_modo_por_defecto(self):
+        """Prueba que el modo por defecto sea prefijo y que sea configurable"""
+        self.assertEqual(self._ids(self.url, categoria='foto'), [self.camara.id])
+        self.assertEqual(self._ids(self.url, categoria='foto', coincidencia='otro'),
+                         [self.camara.id])
+        with self.settings(PRODUCTOS_COINCIDENCIA='contiene'):
+            self.assertEqual(self._ids(self.url, categoria='foto'),
+                             sorted([self.camara.id, self.lente.id]))
+    
+    def test_acciones_por_categoria_y_marca(self):
+        """Prueba los modos en las rutas categoria/ y marca/"""
+        url = reverse('producto-por-categoria', kwargs={'categoria': 'fotografia'})
+        self.assertEqual(self._ids(url), [self.camara.id])
+        self.assertEqual(self._ids(url, coincidencia='contiene'),
+                         sorted([self.camara.id, self.lente.id]))
+        
+        url = reverse('producto-por-marca', kwargs={'marca': 'Canon'})
+        self.assertEqual(self._ids(url, coincidencia='exacto'),
+                         sorted([self.camara.id, self.lente.id]))
+
+
+class PlanesConsultaTest(TestCase):
+    """
+    Pruebas de regresión de los planes de consulta de los listados.
+    
+    Ejecuta EXPLAIN sobre cada combinación de filtros y orden que produce
+    get_queryset() (y las acciones de filtro) y falla si alguna recorre la
+    tabla completa. El modo de coincidencia "contiene" queda fuera: no puede
+    usar índices y solo se usa si se pide.
+    """
+    
+    FILTROS = [
+        {},
+        {'categoria': 'Categoría 3', 'coincidencia': 'exacto'},
+        {'categoria': 'categ', 'coincidencia': 'prefijo'},
+        {'marca': 'Marca 7', 'coincidencia': 'exacto'},
+        {'marca': 'mar', 'coincidencia': 'prefijo'},
+        {'categoria': 'Categoría 3', 'marca': 'Marca 7', 'coincidencia': 'exacto'},
+        {'precio_min': '10', 'precio_max': '50'},
+        {'solo_con_stock': 'true'},
+        {'solo_con_stock': 'true', 'precio_min': '10'},
+    ]
+    
+    ORDENES = [None, 'precio_asc', 'precio_desc', 'nombre', 'fecha_desc']
+    
+    # Combinaciones que además deben leerse en el orden del índice, sin
+    # ordenar aparte (filesort / temp b-tree)
+    SIN_ORDENAMIENTO = [
+        {},
+        {'categoria': 'Categoría 3', 'coincidencia': 'exacto'},
+        {'marca': 'Marca 7', 'coincidencia': 'exacto'},
+        {'orden': 'precio_asc'},
+        {'orden': 'nombre'},
+        {'precio_min': '10', 'precio_max': '50', 'orden': 'precio_desc'},
+        {'solo_con_stock': 'true', 'orden': 'precio_asc'},
+    ]
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Crea suficientes productos para que el planificador prefiera los índices"""
+        insertar_lote([
+            Producto(
+                nombre=f'Producto {i:04d}',
+                categoria=f'Categoría {i % 50}',
+                marca=f'Marca {i % 40}',
+                precio=Decimal(i % 997),
+                cantidad=0 if i % 20 == 0 else i % 30 + 1
+            )
+            for i in range(2000)
+        ])
+    
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            self.skipTest('EXPLAIN solo se interpreta en SQLite y MySQL')
+        self.tabla = Producto._meta.db_table
+    
+    def _consulta(self, **parametros):
+        """Queryset del listado tal como lo arma la vista"""
+        vista = ProductoViewSet()
+        vista.request = Request(RequestFactory().get('/', parametros))
+        return vista.get_queryset()
+    
+    def _plan(self, queryset, tabla=None):
+        """
+        Ejecuta EXPLAIN sobre el queryset.
+        
+        Args:
+            queryset: QuerySet a analizar
+            tabla (str): Tabla que no debe recorrerse (por defecto la de productos)
+            
+        Returns:
+            tuple: (recorre la tabla completa, ordena aparte, plan legible)
+        """
+        sql, parametros = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, parametros)
+                pasos = [fila[-1] for fila in cursor.fetchall()]
+                completo = any(
+                    paso.startswith(f'SCAN {tabla or self.tabla}') and 'INDEX' not in paso
+                    for paso in pasos
+                )
+                ordena = any('TEMP B-TREE FOR ORDER BY' in paso for paso in pasos)
+                return completo, ordena, pasos
+            
+            cursor.execute('EXPLAIN ' + sql, parametros)
+            columnas = [columna[0].lower() for columna in cursor.description]
+            pasos = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+            completo = any(paso['type'] == 'ALL' for paso in pasos)
+            ordena = any('filesort' in (paso['extra'] or '') for paso in pasos)
+            return completo, ordena, pasos
+    
+    def test_listado_sin_recorrer_la_tabla(self):
+        """Prueba que ninguna combinación de filtros y orden recorra la tabla"""
+        for filtros, orden in itertools.product(self.FILTROS, self.ORDENES):
+            parametros = dict(filtros, **({'orden': orden} if orden else {}))
+            with self.subTest(**parametros):
+                completo, _, pasos = self._plan(self._consulta(**parametros)[:20])
+                self.assertFalse(completo, pasos)
+    
+    def test_acciones_de_filtro_sin_recorrer_la_tabla(self):
+        """Prueba sin_stock y los filtros por categoría y marca de las rutas"""
+        consultas = {
+            'sin_stock': Producto.objects.filter(cantidad=0),
+            'categoria': filtrar_texto(Producto.objects.all(), 'categoria', 'Categoría 3', 'exacto'),
+            'marca': filtrar_texto(Producto.objects.all(), 'marca', 'Marca 7', 'exacto'),
+        }
+        for nombre, queryset in consultas.items():
+            for orden in self.ORDENES:
+                with self.subTest(accion=nombre, orden=orden):
+                    completo, _, pasos = self._plan(
+                        queryset.order_by(obtener_orden(orden))[:20]
+                    )
+                    self.assertFalse(completo, pasos)
+        
+        _, ordena, pasos = self._plan(
+            consultas['sin_stock'].order_by(obtener_orden(None))[:20]
+        )
+        self.assertFalse(ordena, pasos)
+    
+    def test_busqueda_sin_recorrer_el_indice(self):
+        """Prueba que la búsqueda por prefijo use el índice (termino, producto)"""
+        BackendBaseDatos().reconstruir()
+        for termino in ('producto', 'marca 7', 'CATEG'):
+            with self.subTest(termino=termino):
+                consulta = BackendBaseDatos()._consulta(terminos_consulta(termino))
+                completo, _, pasos = self._plan(
+                    consulta[:20], TerminoBusqueda._meta.db_table
+                )
+                self.assertFalse(completo, pasos)
+                if connection.vendor == 'mysql':
+                    # Con LIKE BINARY, MySQL no elige el índice de los términos
+                    indice = TerminoBusqueda._meta.indexes[0].name
+                    self.assertTrue(any(paso['key'] == indice for paso in pasos), pasos)
+    
+    def test_combinaciones_frecuentes_sin_ordenar_aparte(self):
+        """Prueba que las combinaciones frecuentes lean en el orden del índice"""
+        for parametros in self.SIN_ORDENAMIENTO:
+            with self.subTest(**parametros):
+                _, ordena, pasos = self._plan(self._consulta(**parametros)[:20])
+                self.assertFalse(ordena, pasos)
+    
+    def test_paginacion_por_cursor(self):
+        """Prueba que las páginas siguientes del cursor no recorran la tabla"""
+        for parametros in self.SIN_ORDENAMIENTO:
+            with self.subTest(**parametros):
+                orden = obtener_orden(parametros.get('orden'))
+                ultimo = self._consulta(**parametros)[:20][19]
+                consulta = ordenar(
+                    filtrar_desde(
+                        self._consulta(**parametros), orden,
+                        getattr(ultimo, orden.lstrip('-')), ultimo.pk
+                    ),
+                    orden
+                )
+                completo, _, pasos = self._plan(consulta[:21])
+                self.assertFalse(completo, pasos)
+
+
+@override_settings(PRODUCTOS_FACETAS_RANGOS_PRECIO=['0', '50', '500'])
+class FacetasTest(APITestCase):
+    """
+    Pruebas de la acción facetas y del resumen que la sirve sin filtros.
+    """
+    
+    def setUp(self):
+        """Crea productos en distintas categorías, marcas y rangos de precio"""
+        self.monitor = Producto.objects.create(
+            nombre='Monitor', categoria='Electrónicos', marca='LG',
+            precio=Decimal('300.00'), cantidad=2
+        )
+        self.cable = Producto.objects.create(
+            nombre='Cable', categoria='Accesorios', marca='LG',
+            precio=Decimal('10.00'), cantidad=0
+        )
+        self.laptop = Producto.objects.create(
+            nombre='Laptop', categoria='Electrónicos', marca='Dell',
+            precio=Decimal('1200.00'), cantidad=5
+        )
+        self.url = reverse('producto-facetas')
+    
+    def assertResumenSincronizado(self):
+        """Compara el resumen incremental con un recálculo completo"""
+        esperado = {
+            clave: total
+            for clave, total in contar_facetas(Producto.objects.all()).items() if total
+        }
+        self.assertEqual(leer_resumen(), esperado)
+    
+    def test_facetas_sin_filtros_desde_el_resumen(self):
+        """Prueba que sin filtros las facetas se lean con una consulta"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['categorias'], [
+            {'valor': 'Electrónicos', 'total': 2}, {'valor': 'Accesorios', 'total': 1}
+        ])
+        self.assertEqual(response.data['marcas'][0], {'valor': 'LG', 'total': 2})
+        self.assertEqual(response.data['stock'], {'con_stock': 2, 'sin_stock': 1})
+        self.assertEqual(response.data['precios'], [
+            {'desde': '0', 'hasta': '50', 'total': 1},
+            {'desde': '50', 'hasta': '500', 'total': 1},
+            {'desde': '500', 'hasta': None, 'total': 1},
+        ])
+    
+    def test_facetas_con_filtros(self):
+        """Prueba que con filtros se cuente sobre el conjunto filtrado"""
+        response = self.client.get(self.url, {'marca': 'lg', 'solo_con_stock': 'true'})
+        
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['categorias'], [{'valor': 'Electrónicos', 'total': 1}])
+        self.assertEqual(response.data['stock'], {'con_stock': 1, 'sin_stock': 0})
+        self.assertEqual(response.data['precios'][1]['total'], 1)
+    
+    def test_resumen_sigue_las_escrituras(self):
+        """Prueba que cada tipo de escritura mantenga el resumen"""
+        self.assertResumenSincronizado()
+        
+        self.monitor.categoria = 'Monitores'
+        self.monitor.precio = Decimal('600.00')
+        self.monitor.save()
+        self.assertResumenSincronizado()
+        
+        self.monitor.reducir_stock(2)
+        self.assertResumenSincronizado()
+        
+        Producto.reducir_stock_lote([(self.laptop.id, 5)])
+        self.assertResumenSincronizado()
+        
+        admin = ProductoAdmin(Producto, AdminSite())
+        with mock.patch.object(admin, 'message_user'):
+            admin.marcar_sin_stock(
+                RequestFactory().post('/'), Producto.objects.filter(pk=self.laptop.pk)
+            )
+        self.assertResumenSincronizado()
+        
+        crear_en_lotes([
+            Producto(nombre='Cable', categoria='Cables', marca='LG',
+                     precio=Decimal('60.00'), cantidad=3),
+            Producto(nombre='Mouse', categoria='Accesorios', marca='Logitech',
+                     precio=Decimal('20.00'), cantidad=8),
+        ], upsert=True)
+        self.assertResumenSincronizado()
+        
+        self.cable.refresh_from_db()
+        self.cable.delete()
+        self.assertResumenSincronizado()
+    
+    def test_guardado_parcial(self):
+        """Prueba instancias con campos diferidos y update_fields"""
+        producto = Producto.objects.only('pk', 'nombre', 'cantidad').get(pk=self.cable.pk)
+        producto.cantidad = 4
+        producto.save(update_fields=['cantidad'])
+        self.assertResumenSincronizado()
+    
+    def test_recalcular_facetas(self):
+        """Prueba que el comando reconstruya un resumen desincronizado"""
+        ResumenFaceta.objects.update(total=99)
+        
+        call_command('recalcular_facetas', stdout=io.StringIO())
+        
+        self.assertResumenSincronizado()
+
+
+# Configuraciones de URL con las lecturas síncronas y con las async
+class UrlsSincronas:
+    urlpatterns = rutas(asincronas=False)
+
+
+class UrlsAsync:
+    urlpatterns = rutas(asincronas=True)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_CACHE_OBJETOS=False)
+class VistasAsyncTest(TestCase):
+    """
+    Pruebas de las vistas async de lectura (views_async): deben responder
+    igual que las vistas síncronas del ViewSet.
+    """
+    
+    def setUp(self):
+        """Crea productos de dos categorías y marcas"""
+        cache.clear()
+        for i in range(12):
+            Producto.objects.create(
+                nombre=f'Teclado {i:02d}', categoria='Accesorios' if i % 2 else 'Periféricos',
+                marca='Logitech' if i % 3 else 'Razer',
+                precio=Decimal('20.00') + i, cantidad=i % 4
+            )
+        self.producto = Producto.objects.order_by('pk').first()
+    
+    def obtener(self, url, asincrona, **kwargs):
+        """GET con la vista síncrona o con la async"""
+        if asincrona:
+            with override_settings(ROOT_URLCONF=UrlsAsync):
+                return async_to_sync(self.async_client.get)(url, **kwargs)
+        with override_settings(ROOT_URLCONF=UrlsSincronas):
+            return self.client.get(url, **kwargs)
+    
+    def assertMismaRespuesta(self, url, **kwargs):
+        """Compara estado, cabeceras de validación y cuerpo de ambas vistas"""
+        sincrona = self.obtener(url, False, **kwargs)
+        asincrona = self.obtener(url, True, **kwargs)
+        self.assertEqual(asincrona.status_code, sincrona.status_code)
+        self.assertEqual(asincrona.get('ETag'), sincrona.get('ETag'))
+        self.assertEqual(asincrona.get('Content-Type'), sincrona.get('Content-Type'))
+        if sincrona.streaming:
+            self.assertEqual(
+                b''.join(async_to_sync(self._consumir)(asincrona)),
+                b''.join(sincrona.streaming_content)
+            )
+        else:
+            self.assertEqual(asincrona.content, sincrona.content)
+        return asincrona
+    
+    async def _consumir(self, respuesta):
+        return [parte async for parte in respuesta.streaming_content]
+    
+    def test_rutas_async(self):
+        """Prueba que solo las lecturas indicadas usen vistas async"""
+        patrones = {patron.name: patron for patron in UrlsAsync.urlpatterns[0].url_patterns}
+        for nombre in ('producto-list', 'producto-detail', 'producto-buscar',
+                       'producto-por-categoria', 'producto-por-marca'):
+            self.assertTrue(asyncio.iscoroutinefunction(patrones[nombre].callback), nombre)
+        self.assertFalse(asyncio.iscoroutinefunction(patrones['producto-sin-stock'].callback))
+    
+    def test_listado(self):
+        """Prueba el listado con filtros, páginas, conteos y cursores"""
+        url = '/api/productos/'
+        self.assertMismaRespuesta(url)
+        self.assertMismaRespuesta(url, data={'page': 2, 'por_pagina': 5, 'orden': 'precio_asc'})
+        self.assertMismaRespuesta(url, data={'categoria': 'acc', 'solo_con_stock': 'true'})
+        self.assertMismaRespuesta(url, data={'conteo': 'cache', 'marca': 'razer'})
+        self.assertMismaRespuesta(url, data={'cursor': 'invalido'})
+        nulo = base64.urlsafe_b64encode(
+            json.dumps({'o': '-fecha_creacion', 'v': None, 'id': 1, 'd': 'sig'}).encode()
+        ).decode()
+        self.assertEqual(self.assertMismaRespuesta(url, data={'cursor': nulo}).status_code, 400)
+        
+        respuesta = self.assertMismaRespuesta(url, data={'cursor': '', 'por_pagina': 4})
+        siguiente = json.loads(respuesta.content)['paginacion']['siguiente']
+        self.assertMismaRespuesta(url, data={'cursor': siguiente, 'por_pagina': 4})
+    
+    def test_detalle(self):
+        """Prueba el detalle, el 404 y la respuesta 304"""
+        url = f'/api/productos/{self.producto.pk}/'
+        respuesta = self.assertMismaRespuesta(url)
+        self.assertMismaRespuesta('/api/productos/999999/')
+        self.assertMismaRespuesta('/api/productos/abc/')
+        
+        no_modificada = self.obtener(url, True, headers={'If-None-Match': respuesta['ETag']})
+        self.assertEqual(no_modificada.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    @override_settings(PRODUCTOS_CACHE_OBJETOS=True)
+    def test_detalle_desde_cache_de_objetos(self):
+        """Prueba que el detalle async llene y use la cache de objetos"""
+        url = f'/api/productos/{self.producto.pk}/'
+        self.obtener(url, True)
+        with self.assertNumQueries(0):
+            respuesta = self.obtener(url, True)
+        self.assertEqual(json.loads(respuesta.content)['nombre'], self.producto.nombre)
+    
+    def test_buscar(self):
+        """Prueba la búsqueda async"""
+        self.assertMismaRespuesta('/api/productos/buscar/', data={'q': 'tecl', 'limit': 5})
+        self.assertMismaRespuesta('/api/productos/buscar/')
+    
+    def test_filtros(self):
+        """Prueba por_categoria y por_marca, paginados y completos"""
+        url = '/api/productos/categoria/Accesorios/'
+        respuesta = self.assertMismaRespuesta(url, data={'por_pagina': 3, 'page': 2})
+        self.assertEqual(json.loads(respuesta.content)['total'], 6)
+        self.assertMismaRespuesta(url, data={'coincidencia': 'exacto', 'cursor': ''})
+        self.assertMismaRespuesta('/api/productos/marca/razer/', data={'completo': 'true'})
+    
+    @override_settings(PRODUCTOS_CACHE_RESPUESTAS=True)
+    def test_cache_de_respuestas(self):
+        """Prueba que el listado async se guarde en la cache de respuestas"""
+        url = '/api/productos/categoria/Accesorios/'
+        primera = self.obtener(url, True)
+        with self.assertNumQueries(0):
+            segunda = self.obtener(url, True)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+    
+    def test_escrituras_se_delegan(self):
+        """Prueba que POST y DELETE sigan usando la vista síncrona"""
+        with override_settings(ROOT_URLCONF=UrlsAsync):
+            respuesta = async_to_sync(self.async_client.post)(
+                '/api/productos/',
+                {'nombre': 'Mouse', 'categoria': 'Accesorios', 'marca': 'Logitech',
+                 'precio': '15.00', 'cantidad': 2},
+                content_type='application/json'
+            )
+            self.assertEqual(respuesta.status_code, status.HTTP_201_CREATED)
+            
+            respuesta = async_to_sync(self.async_client.delete)(
+                f'/api/productos/{self.producto.pk}/'
+            )
+            self.assertEqual(respuesta.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Producto.objects.filter(pk=self.producto.pk).exists())
+        self.assertTrue(Producto.objects.filter(nombre='Mouse').exists())
+
+
+class ConexionFalsa:
+    """Conexión física simulada para las pruebas del pool"""
+    
+    def __init__(self):
+        self.usable = True
+        self.cerrada = False
+        self.rollbacks = 0
+
+
+class PoolConexionesTest(TestCase):
+    """
+    Pruebas del pool de conexiones (api_productos.db_pool).
+    """
+    
+    def crear_pool(self, **opciones):
+        """Pool sobre conexiones falsas; las abiertas quedan en self.conexiones"""
+        self.conexiones = []
+        
+        def conectar():
+            conexion = ConexionFalsa()
+            self.conexiones.append(conexion)
+            return conexion
+        
+        def comprobar(conexion):
+            if not conexion.usable:
+                raise ConnectionError('conexión perdida')
+        
+        def reiniciar(conexion):
+            conexion.rollbacks += 1
+        
+        def cerrar(conexion):
+            conexion.cerrada = True
+        
+        return Pool(conectar, cerrar, comprobar, reiniciar, **opciones)
+    
+    def test_reutiliza_conexiones(self):
+        """Prueba que préstamos sucesivos usen la misma conexión física"""
+        pool = self.crear_pool(minimo=1, maximo=3)
+        pool.llenar()
+        for _ in range(5):
+            pool.devolver(pool.obtener(), reiniciar=False)
+        
+        estadisticas = pool.estadisticas()
+        self.assertEqual(len(self.conexiones), 1)
+        self.assertEqual(estadisticas['prestamos'], 5)
+        self.assertEqual(estadisticas['libres'], 1)
+        self.assertEqual(estadisticas['en_uso'], 0)
+        self.assertEqual(self.conexiones[0].rollbacks, 0)
+    
+    def test_reinicia_y_descarta_al_devolver(self):
+        """Prueba el rollback al devolver y el cierre de las descartadas"""
+        pool = self.crear_pool(maximo=2)
+        prestada = pool.obtener()
+        pool.devolver(prestada)
+        self.assertEqual(prestada.conexion.rollbacks, 1)
+        
+        pool.devolver(pool.obtener(), descartar=True)
+        self.assertTrue(prestada.conexion.cerrada)
+        self.assertEqual(pool.estadisticas()['abiertas'], 0)
+    
+    def test_maximo_y_tiempo_de_espera(self):
+        """Prueba que al llegar al máximo se espere y luego falle"""
+        pool = self.crear_pool(maximo=1, espera=0.05)
+        prestada = pool.obtener()
+        
+        with self.assertRaises(PoolAgotado):
+            pool.obtener()
+        
+        threading.Timer(0.02, pool.devolver, [prestada]).start()
+        pool.espera = 2
+        self.assertIs(pool.obtener(), prestada)
+        
+        estadisticas = pool.estadisticas()
+        self.assertEqual(estadisticas['agotados'], 1)
+        self.assertEqual(estadisticas['esperas'], 2)
+        self.assertGreater(estadisticas['espera_maxima_ms'], 0)
+        self.assertEqual(len(self.conexiones), 1)
+    
+    def test_verificacion_reemplaza_conexiones_caidas(self):
+        """Prueba que una conexión que no responde se reemplace al prestarla"""
+        pool = self.crear_pool(maximo=1)
+        pool.devolver(pool.obtener())
+        self.conexiones[0].usable = False
+        
+        prestada = pool.obtener()
+        
+        self.assertIs(prestada.conexion, self.conexiones[1])
+        self.assertTrue(self.conexiones[0].cerrada)
+        self.assertEqual(pool.estadisticas()['verificaciones_fallidas'], 1)
+        self.assertEqual(pool.estadisticas()['abiertas'], 1)
+    
+    def test_vida_e_inactividad_maximas(self):
+        """Prueba el cierre de conexiones viejas o inactivas de más"""
+        pool = self.crear_pool(minimo=1, maximo=2, vida_maxima=60, inactividad_maxima=0)
+        primera, segunda = pool.obtener(), pool.obtener()
+        pool.devolver(primera)
+        pool.devolver(segunda)
+        
+        # Por encima de minimo, la conexión inactiva se cierra
+        pool.devolver(pool.obtener())
+        self.assertEqual(sum(conexion.cerrada for conexion in self.conexiones), 1)
+        self.assertEqual(pool.estadisticas()['abiertas'], 1)
+        
+        # Al superar vida_maxima se cierra aunque sea la última
+        pool.vida_maxima = 0
+        pool.devolver(pool.obtener())
+        self.assertEqual(pool.estadisticas()['abiertas'], 0)
+        self.assertTrue(all(conexion.cerrada for conexion in self.conexiones))
+    
+    def test_concurrencia(self):
+        """Prueba que el pool nunca preste más de maximo conexiones a la vez"""
+        pool = self.crear_pool(maximo=3)
+        en_uso = []
+        maximo_visto = []
+        candado = threading.Lock()
+        
+        def trabajador():
+            for _ in range(20):
+                prestada = pool.obtener()
+                with candado:
+                    en_uso.append(prestada)
+                    maximo_visto.append(len(en_uso))
+                with candado:
+                    en_uso.remove(prestada)
+                pool.devolver(prestada, reiniciar=False)
+        
+        hilos = [threading.Thread(target=trabajador) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        
+        self.assertLessEqual(max(maximo_visto), 3)
+        self.assertLessEqual(len(self.conexiones), 3)
+        self.assertEqual(pool.estadisticas()['prestamos'], 160)
+        self.assertEqual(pool.estadisticas()['en_uso'], 0)
+    
+    def test_estadisticas_pool_sin_pool(self):
+        """Prueba la acción estadisticas_pool con un backend sin pool"""
+        response = self.client.get(reverse('producto-estadisticas-pool'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {})
+
+
+@skipUnless('replica' in settings.DATABASES, 'Requiere api_productos.settings_pruebas')
+@override_settings(
+    PRODUCTOS_REPLICAS=['replica'], PRODUCTOS_REPLICAS_VENTANA=60,
+    PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_CACHE_OBJETOS=False
+)
+class ReplicasLecturaTest(APITestCase):
+    """
+    Pruebas del enrutamiento de lecturas a réplicas con dos bases SQLite:
+    default (primaria) y replica, que solo recibe las filas copiadas con
+    replicar().
+    """
+    
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        """Crea un producto replicado y otro que la réplica aún no tiene"""
+        replicas.disponibilidad.reiniciar()
+        self.replicado = Producto.objects.create(
+            nombre='Replicado', categoria='Hogar', marca='Philips',
+            precio=Decimal('40.00'), cantidad=5
+        )
+        self.replicar()
+        self.pendiente = Producto.objects.create(
+            nombre='Pendiente', categoria='Hogar', marca='Philips',
+            precio=Decimal('45.00'), cantidad=5
+        )
+        self.url = reverse('producto-list')
+    
+    def replicar(self):
+        """Copia a la réplica las filas de la primaria que no tiene"""
+        copiados = Producto.objects.using('replica').values_list('pk', flat=True)
+        Producto.objects.using('replica').bulk_create(
+            Producto.objects.using('default').exclude(pk__in=list(copiados))
+        )
+    
+    def nombres(self, response):
+        return sorted(producto['nombre'] for producto in response.data['productos'])
+    
+    def test_lecturas_desde_la_replica(self):
+        """Prueba que las lecturas de la API no vean lo que falta replicar"""
+        self.assertEqual(self.nombres(self.client.get(self.url)), ['Replicado'])
+        
+        response = self.client.get(reverse('producto-detail', kwargs={'pk': self.pendiente.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(PRODUCTOS_REPLICAS=[])
+    def test_sin_replicas(self):
+        """Prueba que sin réplicas configuradas se lea de la primaria"""
+        self.assertEqual(self.nombres(self.client.get(self.url)), ['Pendiente', 'Replicado'])
+    
+    def test_escrituras_en_la_primaria_y_lectura_propia(self):
+        """Prueba que quien escribe lea de la primaria durante la ventana"""
+        response = self.client.post(self.url, {
+            'nombre': 'Nuevo', 'categoria': 'Hogar', 'marca': 'Philips',
+            'precio': '10.00', 'cantidad': 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(replicas.COOKIE, response.cookies)
+        self.assertTrue(Producto.objects.using('default').filter(nombre='Nuevo').exists())
+        self.assertFalse(Producto.objects.using('replica').filter(nombre='Nuevo').exists())
+        
+        self.assertEqual(
+            self.nombres(self.client.get(self.url)), ['Nuevo', 'Pendiente', 'Replicado']
+        )
+        
+        # Vencida la ventana vuelve a leer de la réplica
+        self.client.cookies[replicas.COOKIE] = '0'
+        self.assertEqual(self.nombres(self.client.get(self.url)), ['Replicado'])
+    
+    def test_reducir_stock_fija_a_la_primaria(self):
+        """Prueba que reducir_stock también fije al cliente a la primaria"""
+        detalle = reverse('producto-detail', kwargs={'pk': self.replicado.pk})
+        response = self.client.post(
+            reverse('producto-reducir-stock', kwargs={'pk': self.replicado.pk}),
+            {'cantidad': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(self.client.get(detalle).data['cantidad'], 3)
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(detalle).data['cantidad'], 5)
+    
+    def test_lote_por_post_lee_de_la_replica(self):
+        """Prueba que el lote por POST se lea de la réplica sin fijar a la primaria"""
+        response = self.client.post(
+            reverse('producto-lote'), {'ids': [self.replicado.pk, self.pendiente.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['no_encontrados'], [self.pendiente.pk])
+        self.assertNotIn(replicas.COOKIE, response.cookies)
+    
+    def test_replica_caida(self):
+        """Prueba que si la réplica no conecta se lea de la primaria"""
+        with mock.patch.object(
+            connections['replica'], 'ensure_connection', side_effect=OperationalError
+        ):
+            self.assertEqual(
+                self.nombres(self.client.get(self.url)), ['Pendiente', 'Replicado']
+            )
+        
+        # Queda fuera de uso hasta PRODUCTOS_REPLICAS_REINTENTO
+        self.assertFalse(replicas.disponibilidad.disponible('replica'))
+        self.assertEqual(self.nombres(self.client.get(self.url)), ['Pendiente', 'Replicado'])
+        
+        replicas.disponibilidad.reiniciar()
+        self.assertEqual(self.nombres(self.client.get(self.url)), ['Replicado'])
+
+    @override_settings(PRODUCTOS_CACHE_RESPUESTAS=True)
+    def test_cache_de_respuestas_tras_escribir(self):
+        """Prueba que otro cliente no guarde en cache lo que lee de la réplica atrasada"""
+        cache.clear()
+        obtener_lru().limpiar()
+        response = self.client.post(self.url, {
+            'nombre': 'Nuevo', 'categoria': 'Hogar', 'marca': 'Philips',
+            'precio': '10.00', 'cantidad': 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        otro = self.client_class()
+        self.assertEqual(self.nombres(otro.get(self.url)), ['Replicado'])
+
+        self.replicar()
+        self.assertEqual(
+            self.nombres(otro.get(self.url)), ['Nuevo', 'Pendiente', 'Replicado']
+        )
+
+        # Sin invalidaciones recientes, las lecturas de la réplica llenan la cache
+        cache.clear()
+        otro.get(self.url)
+        with self.assertNumQueries(0, using='replica'):
+            otro.get(self.url)
+
+    def test_vistas_async(self):
+        """Prueba que las vistas async también lean de la réplica"""
+        with override_settings(ROOT_URLCONF=UrlsAsync):
+            response = async_to_sync(self.async_client.get)('/api/productos/')
+        self.assertEqual(
+            [producto['nombre'] for producto in json.loads(response.content)['productos']],
+            ['Replicado']
+        )
+
+
+class MetricasTest(APITestCase):
+    """
+    Pruebas de MetricasMiddleware, la cabecera Server-Timing y GET /metrics.
+    """
+    
+    def setUp(self):
+        """Crea productos y vacía las métricas del proceso"""
+        cache.clear()
+        metricas.reiniciar()
+        for i in range(5):
+            Producto.objects.create(
+                nombre=f'Monitor {i}', categoria='Electrónicos', marca='LG',
+                precio=Decimal('150.00') + i, cantidad=i
+            )
+        self.producto = Producto.objects.order_by('pk').first()
+    
+    def test_metricas_por_accion(self):
+        """Prueba que se cuenten peticiones, consultas y bytes por acción DRF"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('producto-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(metricas.PETICIONES.valor(accion='list', metodo='GET', estado='200'), 1)
+        self.assertEqual(metricas.DURACION.cantidad(accion='list'), 1)
+        self.assertEqual(metricas.CONSULTAS.suma(accion='list'), len(consultas))
+        self.assertGreater(metricas.TIEMPO_BD.valor(accion='list'), 0)
+        self.assertGreater(metricas.TIEMPO_SERIALIZACION.valor(accion='list'), 0)
+        self.assertGreater(metricas.TIEMPO_RENDERIZADO.valor(accion='list'), 0)
+        self.assertEqual(metricas.BYTES.suma(accion='list'), len(response.content))
+        
+        self.client.get(reverse('producto-detail', kwargs={'pk': 999999}))
+        self.assertEqual(metricas.PETICIONES.valor(accion='retrieve', metodo='GET', estado='404'), 1)
+    
+    def test_server_timing(self):
+        """Prueba la cabecera Server-Timing y que se pueda desactivar"""
+        response = self.client.get(reverse('producto-detail', kwargs={'pk': self.producto.pk}))
+        partes = [parte.split(';')[0] for parte in response['Server-Timing'].split(', ')]
+        self.assertEqual(partes, ['bd', 'serializacion', 'renderizado', 'total'])
+        self.assertIn('consultas"', response['Server-Timing'])
+        
+        with override_settings(PRODUCTOS_SERVER_TIMING=False):
+            response = self.client.get(reverse('producto-list'))
+        self.assertNotIn('Server-Timing', response)
+    
+    def test_streaming_se_registra_al_terminar(self):
+        """Prueba que las consultas y el tamaño de una exportación se registren al consumirla"""
+        response = self.client.get(reverse('producto-exportar'))
+        self.assertEqual(metricas.BYTES.cantidad(accion='exportar'), 0)
+        with CaptureQueriesContext(connection) as consultas:
+            contenido = b''.join(response.streaming_content)
+        self.assertEqual(metricas.BYTES.suma(accion='exportar'), len(contenido))
+        self.assertEqual(metricas.CONSULTAS.suma(accion='exportar'), len(consultas))
+        self.assertGreater(len(consultas), 0)
+    
+    def test_vistas_async(self):
+        """Prueba que se midan las vistas async y sus consultas en otros hilos"""
+        with override_settings(ROOT_URLCONF=UrlsAsync):
+            response = async_to_sync(self.async_client.get)('/api/productos/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(metricas.PETICIONES.valor(accion='list', metodo='GET', estado='200'), 1)
+        self.assertGreater(metricas.CONSULTAS.suma(accion='list'), 0)
+    
+    def test_exposicion_prometheus(self):
+        """Prueba el formato de texto de GET /metrics"""
+        self.client.get(reverse('producto-detail', kwargs={'pk': self.producto.pk}))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], metricas.CONTENT_TYPE)
+        
+        lineas = response.content.decode().splitlines()
+        self.assertIn(
+            'productos_peticiones_total{accion="retrieve",metodo="GET",estado="200"} 1', lineas
+        )
+        self.assertIn('# TYPE productos_peticion_duracion_segundos histogram', lineas)
+        self.assertIn('productos_peticion_duracion_segundos_count{accion="retrieve"} 1', lineas)
+        self.assertIn('productos_respuesta_bytes_bucket{accion="retrieve",le="+Inf"} 1', lineas)
+        self.assertIn('# TYPE productos_cache_objetos_aciertos_total counter', lineas)
+    
+    def test_histograma(self):
+        """Prueba las cubetas acumuladas, la suma y el escapado de etiquetas"""
+        histograma = metricas.Histograma('prueba', 'Prueba', ('accion',), limites=(1, 5))
+        for valor in (0, 1, 3, 10):
+            histograma.observar(valor, accion='a"b')
+        self.assertEqual(histograma.exponer()[2:], [
+            'prueba_bucket{accion="a\\"b",le="1"} 2',
+            'prueba_bucket{accion="a\\"b",le="5"} 3',
+            'prueba_bucket{accion="a\\"b",le="+Inf"} 4',
+            'prueba_sum{accion="a\\"b"} 14',
+            'prueba_count{accion="a\\"b"} 4',
+        ])
+
+
+class CatalogoSinteticoTest(TestCase):
+    """
+    Pruebas del catálogo sintético (benchmarks.catalogo) y de sembrar_productos.
+    """
+    
+    def filas(self, cantidad, semilla=42):
+        return [
+            (p.nombre, p.categoria, p.marca, p.precio, p.cantidad)
+            for p in generar_productos(cantidad, semilla)
+        ]
+    
+    def test_determinista(self):
+        """Prueba que la misma semilla genere siempre los mismos productos"""
+        self.assertEqual(self.filas(200), self.filas(200))
+        self.assertNotEqual(self.filas(200), self.filas(200, semilla=7))
+        # Las primeras filas no dependen del total
+        self.assertEqual(self.filas(300)[:200], self.filas(200))
+    
+    def test_distribucion(self):
+        """Prueba la concentración por categoría y marca, precios y stock"""
+        productos = list(generar_productos(5000))
+        por_categoria = {}
+        categoria_de_marca = {}
+        for producto in productos:
+            por_categoria[producto.categoria] = por_categoria.get(producto.categoria, 0) + 1
+            self.assertEqual(
+                categoria_de_marca.setdefault(producto.marca, producto.categoria),
+                producto.categoria
+            )
+            minimo, maximo, _ = CATEGORIAS[producto.categoria]
+            self.assertTrue(minimo <= producto.precio <= maximo)
+        
+        totales = sorted(por_categoria.values(), reverse=True)
+        self.assertEqual(len(totales), len(CATEGORIAS))
+        self.assertGreater(totales[0], 3 * totales[-1])
+        sin_stock = sum(1 for p in productos if p.cantidad == 0) / len(productos)
+        self.assertTrue(0.08 < sin_stock < 0.16)
+        self.assertEqual(len({p.nombre for p in productos}), len(productos))
+    
+    def test_sembrar(self):
+        """Prueba la inserción por bloques y el resumen de facetas"""
+        avances = []
+        self.assertEqual(sembrar(450, tamano_lote=100, lotes_por_transaccion=2, progreso=avances.append), 450)
+        self.assertEqual(avances, [200, 400, 450])
+        self.assertEqual(Producto.objects.count(), 450)
+        self.assertEqual(
+            list(Producto.objects.order_by('pk').values_list('nombre', flat=True)[:3]),
+            [nombre for nombre, *_ in self.filas(3)]
+        )
+        esperado = {
+            clave: total
+            for clave, total in contar_facetas(Producto.objects.all()).items() if total
+        }
+        self.assertEqual(leer_resumen(), esperado)
+    
+    def test_comando(self):
+        """Prueba sembrar_productos y que no siembre sobre una tabla con datos"""
+        salida = io.StringIO()
+        call_command('sembrar_productos', filas=120, lote=50, stdout=salida)
+        self.assertEqual(Producto.objects.count(), 120)
+        self.assertIn('Catálogo sembrado: 120 productos', salida.getvalue())
+        
+        with self.assertRaisesMessage(CommandError, 'ya tiene 120 productos'):
+            call_command('sembrar_productos', filas=10, stdout=io.StringIO())
+
+
+class CargaTest(TestCase):
+    """
+    Pruebas del benchmark de carga: escenarios y comparación con la línea base.
+    """
+    
+    def test_escenarios_cubren_el_viewset(self):
+        """Prueba que haya un escenario para cada acción de ProductoViewSet"""
+        sembrar(300)
+        por_accion = carga.escenarios(carga._datos(20))
+        self.assertEqual(set(carga.acciones_del_viewset()) - set(por_accion), set())
+        for accion, generar in por_accion.items():
+            metodo, ruta, parametros, cuerpo = generar(3)
+            self.assertTrue(ruta.startswith('/api/productos/'), accion)
+    
+    def test_linea_base_incluida(self):
+        """Prueba que la línea base del repositorio cubra todas las acciones"""
+        ruta = os.path.join(os.path.dirname(carga.__file__), 'linea_base.json')
+        with open(ruta, encoding='utf-8') as archivo:
+            linea_base = json.load(archivo)
+        self.assertEqual(set(linea_base['acciones']), set(carga.acciones_del_viewset()))
+    
+    def test_comparar(self):
+        """Prueba la detección de regresiones y sus tolerancias"""
+        base = {'acciones': {
+            'list': {'rps': 100.0, 'p95_ms': 20.0, 'consultas': 2.0, 'errores': 0},
+            'sin_stock': {'rps': 100.0, 'p95_ms': 2.0, 'consultas': 0.05, 'errores': 0},
+        }}
+        igual = {'list': dict(base['acciones']['list']), 'sin_stock': {
+            'rps': 90.0, 'p95_ms': 2.9, 'consultas': 0.3, 'errores': 0
+        }}
+        self.assertEqual(carga.comparar(igual, base, 0.25), [])
+        
+        peor = {'list': {'rps': 70.0, 'p95_ms': 26.0, 'consultas': 3.0, 'errores': 2}}
+        self.assertEqual(carga.comparar(peor, base, 0.25), [
+            'list: p95_ms 20.0 -> 26.0',
+            'list: rps 100.0 -> 70.0',
+            'list: consultas 2.0 -> 3.0',
+            'list: errores 0 -> 2',
+        ])
+        self.assertEqual(carga.comparar(peor, base, 0.25, solo_consultas=True), [
+            'list: consultas 2.0 -> 3.0',
+            'list: errores 0 -> 2',
+        ])
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_CACHE_OBJETOS=False)
+class CamposTest(APITestCase):
+    """
+    Pruebas del parámetro campos (selección de campos de la respuesta).
+    """
+    
+    def setUp(self):
+        """Crea productos de prueba"""
+        cache.clear()
+        for i in range(4):
+            Producto.objects.create(
+                nombre=f'Parlante {i}', categoria='Audio', marca='JBL',
+                precio=Decimal('80.50') + i, cantidad=i
+            )
+        self.producto = Producto.objects.order_by('pk').first()
+    
+    def consultas_productos(self, consultas):
+        """SQL de las consultas que leen filas de productos"""
+        return [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('SELECT') and 'COUNT(' not in consulta['sql']
+            and 'MAX(' not in consulta['sql']
+        ]
+    
+    def test_listado(self):
+        """Prueba que el listado envíe y lea solo los campos pedidos"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('producto-list'), {'campos': 'precio,nombre, id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for producto in response.data['productos']:
+            self.assertEqual(list(producto), ['id', 'nombre', 'precio'])
+        
+        sql = self.consultas_productos(consultas)
+        self.assertTrue(sql)
+        for consulta in sql:
+            self.assertNotIn('"marca"', consulta)
+            self.assertNotIn('"categoria"', consulta)
+    
+    def test_campo_calculado(self):
+        """Prueba que un campo calculado lea solo sus columnas"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('producto-list'), {'campos': 'precio_formateado'})
+        self.assertEqual(
+            response.data['productos'][-1], {'precio_formateado': self.producto.get_precio_formateado()}
+        )
+        for consulta in self.consultas_productos(consultas):
+            self.assertIn('"precio"', consulta)
+            self.assertNotIn('"nombre"', consulta)
+    
+    def test_detalle(self):
+        """Prueba el detalle con campos, leyendo solo sus columnas"""
+        url = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'campos': 'nombre,tiene_stock'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'nombre': self.producto.nombre, 'tiene_stock': False})
+        self.assertIn('ETag', response)
+        for consulta in self.consultas_productos(consultas):
+            self.assertNotIn('"marca"', consulta)
+        
+        completo = self.client.get(url)
+        self.assertIn('fecha_creacion', completo.data)
+    
+    @override_settings(PRODUCTOS_CACHE_OBJETOS=True)
+    def test_detalle_desde_cache_de_objetos(self):
+        """Prueba que la cache de objetos guarde el producto completo"""
+        url = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+        response = self.client.get(url, {'campos': 'id'})
+        self.assertEqual(response.data, {'id': self.producto.pk})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'campos': 'marca'})
+        self.assertEqual(response.data, {'marca': 'JBL'})
+    
+    def test_busqueda_y_filtros(self):
+        """Prueba la búsqueda y los filtros, paginados y completos"""
+        response = self.client.get(reverse('producto-buscar'), {'q': 'parlante', 'campos': 'nombre'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['resultados'])
+        self.assertEqual({tuple(p) for p in response.data['resultados']}, {('nombre',)})
+        
+        url = reverse('producto-por-categoria', kwargs={'categoria': 'Audio'})
+        response = self.client.get(url, {'campos': 'id,cantidad'})
+        self.assertEqual({tuple(p) for p in response.data['productos']}, {('id', 'cantidad')})
+        
+        response = self.client.get(url, {'campos': 'marca', 'completo': 'true'})
+        datos = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(datos['productos'], [{'marca': 'JBL'}] * 4)
+    
+    def test_campos_desconocidos(self):
+        """Prueba el error 400 con los campos disponibles"""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('producto-list'), {'campos': 'nombre,costo,stock'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Campos desconocidos: costo, stock')
+        self.assertEqual(response.data['campos_disponibles'], ProductoListSerializer.Meta.fields)
+        
+        # El listado no tiene las fechas del detalle
+        response = self.client.get(reverse('producto-list'), {'campos': 'fecha_creacion'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            reverse('producto-detail', kwargs={'pk': self.producto.pk}), {'campos': 'fecha_creacion'}
+        )
+        self.assertEqual(list(response.data), ['fecha_creacion'])
+    
+    def test_vistas_async(self):
+        """Prueba que las vistas async respondan igual que las síncronas"""
+        for url, campos in (
+            ('/api/productos/', 'id,precio'),
+            (f'/api/productos/{self.producto.pk}/', 'nombre'),
+            ('/api/productos/buscar/', 'marca'),
+            ('/api/productos/', 'desconocido'),
+        ):
+            parametros = {'campos': campos, 'q': 'parlante'}
+            with override_settings(ROOT_URLCONF=UrlsSincronas):
+                sincrona = self.client.get(url, parametros)
+            with override_settings(ROOT_URLCONF=UrlsAsync):
+                asincrona = async_to_sync(self.async_client.get)(url, parametros)
+            self.assertEqual(asincrona.status_code, sincrona.status_code)
+            self.assertEqual(asincrona.content, sincrona.content)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False, PRODUCTOS_CACHE_OBJETOS=False)
+class LoteProductosTest(APITestCase):
+    """
+    Pruebas de la obtención de varios productos por id (GET/POST lote).
+    """
+    
+    def setUp(self):
+        """Crea productos de prueba"""
+        cache.clear()
+        estadisticas.reiniciar()
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Cable {i}', categoria='Accesorios', marca='Belkin',
+                precio=Decimal('9.90') + i, cantidad=i
+            )
+            for i in range(6)
+        ]
+        self.url = reverse('producto-lote')
+    
+    def test_orden_y_no_encontrados(self):
+        """Prueba el orden pedido, los repetidos y los ids inexistentes"""
+        a, b, c = self.productos[4], self.productos[0], self.productos[2]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': f'{a.pk},999999,{b.pk}, {c.pk},{a.pk}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['productos']], [a.pk, b.pk, c.pk])
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['no_encontrados'], [999999])
+        self.assertEqual(response.data['productos'][0], ProductoSerializer(a).data)
+    
+    def test_post_en_bloques(self):
+        """Prueba el POST con una consulta id__in por bloque"""
+        ids = [p.pk for p in reversed(self.productos)]
+        with override_settings(PRODUCTOS_TAMANO_LOTE=4):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.post(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['productos']], ids)
+        self.assertEqual(len(consultas), 2)
+    
+    def test_campos(self):
+        """Prueba el parámetro campos con los campos del detalle"""
+        producto = self.productos[1]
+        response = self.client.get(self.url, {'ids': producto.pk, 'campos': 'nombre,fecha_creacion'})
+        self.assertEqual(list(response.data['productos'][0]), ['nombre', 'fecha_creacion'])
+    
+    @override_settings(PRODUCTOS_CACHE_OBJETOS=True)
+    def test_cache_de_objetos(self):
+        """Prueba que los productos se lean de la cache de objetos"""
+        ids = [p.pk for p in self.productos[:3]]
+        primera = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(estadisticas.fallos, 3)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids + [999999]))})
+        self.assertEqual(estadisticas.aciertos, 3)
+        self.assertEqual(response.data['productos'], primera.data['productos'])
+        self.assertEqual(response.data['no_encontrados'], [999999])
+    
+    def test_errores(self):
+        """Prueba los ids vacíos, inválidos y el máximo por petición"""
+        for datos in ({}, {'ids': ''}, {'ids': '1,abc'}, {'ids': '0'}):
+            response = self.client.get(self.url, datos)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, datos)
+            self.assertIn('ids', response.data)
+        
+        with override_settings(PRODUCTOS_MAX_ELEMENTOS_LOTE=2):
+            response = self.client.post(self.url, {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PRODUCTOS_CACHE_RESPUESTAS=False)
+class ActualizacionMasivaTest(APITestCase):
+    """
+    Pruebas de la actualización parcial en lote (PATCH masivo).
+    """
+    
+    def setUp(self):
+        """Crea productos de prueba"""
+        cache.clear()
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Lámpara {i}', categoria='Hogar', marca='Philips',
+                precio=Decimal('30.00') + i, cantidad=10 + i
+            )
+            for i in range(5)
+        ]
+        self.url = reverse('producto-masivo')
+    
+    def actualizar(self, datos, **parametros):
+        url = self.url + ('?' + '&'.join(f'{k}={v}' for k, v in parametros.items()) if parametros else '')
+        return self.client.patch(url, datos, format='json')
+    
+    def test_actualizar(self):
+        """Prueba la actualización de solo los campos enviados"""
+        a, b, c = self.productos[:3]
+        response = self.actualizar([
+            {'id': a.pk, 'precio': '12.50'},
+            {'id': b.pk, 'precio': '8.00', 'cantidad': 0},
+            {'id': c.pk, 'cantidad': c.cantidad},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['actualizados'], 2)
+        self.assertEqual(response.data['sin_cambios'], 1)
+        self.assertEqual(
+            [(p['indice'], p['id'], p['estado']) for p in response.data['productos']],
+            [(0, a.pk, 'actualizado'), (1, b.pk, 'actualizado'), (2, c.pk, 'sin_cambios')]
+        )
+        
+        anterior = a.fecha_actualizacion
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.precio, a.cantidad), (Decimal('12.50'), 10))
+        self.assertEqual((b.precio, b.cantidad), (Decimal('8.00'), 0))
+        self.assertGreater(a.fecha_actualizacion, anterior)
+        self.assertEqual(
+            Producto.objects.get(pk=c.pk).fecha_actualizacion, c.fecha_actualizacion
+        )
+        
+        # Las estructuras derivadas ven el cambio
+        sin_stock = self.client.get(reverse('producto-sin-stock'))
+        self.assertEqual([p['id'] for p in sin_stock.data['productos_sin_stock']], [b.pk])
+        esperado = {
+            clave: total
+            for clave, total in contar_facetas(Producto.objects.all()).items() if total
+        }
+        self.assertEqual(leer_resumen(), esperado)
+    
+    def test_una_sentencia_por_combinacion_de_campos(self):
+        """Prueba que cada lote escriba solo las columnas modificadas"""
+        ids = [p.pk for p in self.productos]
+        with override_settings(PRODUCTOS_TAMANO_LOTE=3):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.actualizar([
+                    {'id': pk, 'precio': f'{50 + i}.00'} for i, pk in enumerate(ids)
+                ])
+        self.assertEqual(response.data['actualizados'], 5)
+        updates = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith('UPDATE "productos_producto"')
+        ]
+        self.assertEqual(len(updates), 2)
+        for sql in updates:
+            self.assertIn('"precio"', sql)
+            self.assertIn('"fecha_actualizacion"', sql)
+            self.assertNotIn('"cantidad"', sql)
+            self.assertNotIn('"nombre"', sql)
+    
+    def test_categoria_actualiza_normalizada(self):
+        """Prueba que cambiar la categoría actualice su columna normalizada y la búsqueda"""
+        producto = self.productos[0]
+        self.actualizar([{'id': producto.pk, 'categoria': 'Iluminación'}])
+        producto.refresh_from_db()
+        self.assertEqual(producto.categoria_normalizada, 'iluminacion')
+        response = self.client.get(reverse('producto-buscar'), {'q': 'ilumin'})
+        self.assertEqual([p['id'] for p in response.data['resultados']], [producto.pk])
+    
+    def test_exito_parcial(self):
+        """Prueba que los errores y los ids inexistentes no aborten la carga"""
+        a, b = self.productos[:2]
+        response = self.actualizar([
+            {'id': a.pk, 'precio': '15.00'},
+            {'id': b.pk, 'precio': '-1'},
+            {'id': 999999, 'cantidad': 3},
+            {'id': a.pk, 'cantidad': 1},
+            {'precio': '5.00'},
+            {'id': b.pk},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['actualizados'], 1)
+        self.assertEqual(response.data['no_encontrados'], [999999])
+        self.assertEqual([e['indice'] for e in response.data['errores']], [1, 3, 4, 5])
+        self.assertIn('precio', response.data['errores'][0]['errores'])
+        a.refresh_from_db()
+        self.assertEqual((a.precio, a.cantidad), (Decimal('15.00'), 10))
+        
+        response = self.actualizar([{'id': 999999, 'precio': '1.00'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.actualizar({'id': a.pk, 'precio': '1.00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_atomico(self):
+        """Prueba que el modo atómico no modifique nada ante cualquier error"""
+        a, b = self.productos[:2]
+        with override_settings(PRODUCTOS_TAMANO_LOTE=1):
+            response = self.actualizar(
+                [{'id': a.pk, 'precio': '15.00'}, {'id': 999999, 'precio': '1.00'}], atomico='true'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['no_encontrados'], [999999])
+        self.assertEqual(Producto.objects.get(pk=a.pk).precio, a.precio)
+        
+        response = self.actualizar(
+            [{'id': a.pk, 'precio': '15.00'}, {'id': b.pk, 'cantidad': -2}], atomico='true'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['indice'] for e in response.data['errores']], [1])
+        self.assertEqual(Producto.objects.get(pk=a.pk).precio, a.precio)
+        
+        response = self.actualizar(
+            [{'id': a.pk, 'precio': '15.00'}, {'id': b.pk, 'cantidad': 2}], atomico='true'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['actualizados'], 2)
+    
+    @override_settings(PRODUCTOS_CACHE_OBJETOS=True)
+    def test_cache_de_objetos(self):
+        """Prueba que el detalle en cache vea la cantidad actualizada"""
+        producto = self.productos[0]
+        url = reverse('producto-detail', kwargs={'pk': producto.pk})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actualizar([{'id': producto.pk, 'cantidad': 77}])
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['cantidad'], 77)
+
+
+@override_settings(PRODUCTOS_ADMIN_TABLA_GRANDE=True)
+class AdminTablaGrandeTest(TestCase):
+    """
+    Pruebas del modo para tablas grandes de ProductoAdmin y de la acción
+    duplicar_productos.
+    """
+    
+    def setUp(self):
+        """Crea productos y un superusuario con sesión iniciada"""
+        cache.clear()
+        for i in range(7):
+            Producto.objects.create(
+                nombre=f'Silla {i}', categoria='Hogar' if i % 3 else 'Oficina',
+                marca='Ikea' if i % 2 else 'Herman', precio=Decimal('40.00') + i % 4, cantidad=i
+            )
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+        self.url = reverse('admin:productos_producto_changelist')
+    
+    def consultas_productos(self, consultas):
+        """SQL de las consultas sobre la tabla de productos"""
+        return [c['sql'] for c in consultas.captured_queries if 'productos_producto' in c['sql']]
+    
+    def test_listado_sin_distinct_ni_conteo_total(self):
+        """Prueba que el listado no calcule las opciones con DISTINCT ni el total completo"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = self.consultas_productos(consultas)
+        self.assertFalse([consulta for consulta in sql if 'DISTINCT' in consulta])
+        self.assertLessEqual(len([consulta for consulta in sql if 'COUNT(' in consulta]), 1)
+        # Opciones desde el resumen de facetas, con sus totales
+        self.assertContains(response, 'Hogar (4)')
+        self.assertContains(response, 'Ikea (3)')
+    
+    @override_settings(PRODUCTOS_ADMIN_TABLA_GRANDE=False)
+    def test_modo_normal(self):
+        """Prueba que sin el modo para tablas grandes el admin no cambie"""
+        response = self.client.get(self.url, {'q': 'sill', 'marca': 'Ikea'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertEqual(response.context['cl'].full_result_count, 7)
+    
+    def test_filtros_y_busqueda(self):
+        """Prueba los filtros por columna normalizada y la búsqueda con el índice"""
+        response = self.client.get(self.url, {'categoria': 'Oficina', 'marca': 'Herman'})
+        self.assertEqual(
+            {p.nombre for p in response.context['cl'].result_list}, {'Silla 0', 'Silla 6'}
+        )
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, {'q': 'silla 3'})
+        self.assertEqual([p.nombre for p in response.context['cl'].result_list], ['Silla 3'])
+        self.assertFalse([c for c in self.consultas_productos(consultas) if 'LIKE' in c])
+    
+    def test_busqueda_sin_resultados(self):
+        """Prueba que una búsqueda sin coincidencias muestre el listado vacío"""
+        response = self.client.get(self.url, {'q': 'zzzzqq'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        self.assertEqual(response.context['cl'].result_count, 0)
+    
+    def test_paginas_con_keyset(self):
+        """Prueba que la página siguiente continúe desde la anterior sin OFFSET"""
+        for orden in (['-fecha_creacion', '-pk'], ['precio', '-pk'], ['nombre', 'pk']):
+            queryset = Producto.objects.order_by(*orden)
+            esperado = [p.pk for p in queryset]
+            paginador = PaginadorTablaGrande(queryset, 3)
+            obtenidos = [p.pk for p in paginador.page(1)]
+            for numero in (2, 3):
+                with CaptureQueriesContext(connection) as consultas:
+                    obtenidos += [p.pk for p in paginador.page(numero)]
+                self.assertNotIn('OFFSET', consultas.captured_queries[-1]['sql'], orden)
+            self.assertEqual(obtenidos, esperado, orden)
+        
+        # También entre peticiones al listado del admin
+        with mock.patch.object(ProductoAdmin, 'list_per_page', 3):
+            primera = self.client.get(self.url, {'p': 1})
+            with CaptureQueriesContext(connection) as consultas:
+                segunda = self.client.get(self.url, {'p': 2})
+        self.assertFalse([c for c in self.consultas_productos(consultas) if 'OFFSET' in c])
+        self.assertEqual(
+            [p.pk for respuesta in (primera, segunda) for p in respuesta.context['cl'].result_list],
+            [p.pk for p in Producto.objects.order_by('-fecha_creacion', '-pk')[:6]]
+        )
+        
+        # Sin la página anterior se usa OFFSET
+        paginador = PaginadorTablaGrande(Producto.objects.order_by('cantidad', '-pk'), 3)
+        with CaptureQueriesContext(connection) as consultas:
+            pagina = paginador.page(2)
+        self.assertIn('OFFSET', consultas.captured_queries[-1]['sql'])
+        self.assertEqual([p.cantidad for p in pagina], [3, 4, 5])
+    
+    def test_duplicar_productos(self):
+        """Prueba que la acción duplique con un solo INSERT y mantenga la búsqueda"""
+        admin = ProductoAdmin(Producto, AdminSite())
+        seleccion = Producto.objects.filter(categoria='Hogar')
+        with CaptureQueriesContext(connection) as consultas:
+            with mock.patch.object(admin, 'message_user'):
+                admin.duplicar_productos(RequestFactory().post('/'), seleccion)
+        inserts = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith('INSERT INTO "productos_producto"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        
+        copias = Producto.objects.filter(nombre__endswith='(Copia)')
+        self.assertEqual(copias.count(), 4)
+        self.assertFalse(copias.filter(cantidad__gt=0).exists())
+        self.assertEqual(copias.filter(categoria_normalizada='hogar').count(), 4)
+        response = self.client.get(self.url, {'q': 'copia'})
+        self.assertEqual(len(response.context['cl'].result_list), 4)
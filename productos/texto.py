@@ -0,0 +1,52 @@
+"""
+Normalización de texto para búsquedas y comparaciones.
+
+Los datos del catálogo están en español, por lo que las comparaciones
+ignoran mayúsculas y acentos: "Electrónicos" y "electronicos" se
+consideran iguales.
+"""
+import re
+import unicodedata
+
+
+# Palabras demasiado frecuentes para aportar a una búsqueda
+PALABRAS_VACIAS = frozenset([
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'sin', 'u', 'un', 'una', 'y',
+])
+
+LONGITUD_MAXIMA_TERMINO = 100
+
+_PATRON_TERMINO = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    """
+    Convierte el texto a minúsculas y elimina acentos y diacríticos.
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        str: Texto normalizado (por ejemplo "Electrónicos" -> "electronicos")
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.split())
+
+
+def tokenizar(texto):
+    """
+    Divide el texto en términos normalizados, descartando palabras vacías.
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        list: Términos normalizados en el orden en que aparecen
+    """
+    return [
+        termino[:LONGITUD_MAXIMA_TERMINO]
+        for termino in _PATRON_TERMINO.findall(normalizar(texto))
+        if termino not in PALABRAS_VACIAS
+    ]
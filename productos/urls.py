@@ -1,12 +1,32 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ProductoViewSet
+from .views_async import rutas_async
 
 # Crear router para las URLs del ViewSet
 router = DefaultRouter()
 router.register(r'productos', ProductoViewSet, basename='producto')
 
+
+def rutas(asincronas=None):
+    """
+    URLs de la app productos.
+    
+    Args:
+        asincronas (bool): Atender las lecturas con las vistas async de
+            views_async (por defecto PRODUCTOS_VISTAS_ASYNC)
+            
+    Returns:
+        list: Patrones de URL
+    """
+    if asincronas is None:
+        asincronas = getattr(settings, 'PRODUCTOS_VISTAS_ASYNC', False)
+    patrones = rutas_async(router.urls) if asincronas else router.urls
+    return [
+        path('api/', include(patrones)),
+    ]
+
+
 # URLs de la app productos
-urlpatterns = [
-    path('api/', include(router.urls)),
-]
+urlpatterns = rutas()
@@ -2,16 +2,48 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Q
-from django.core.paginator import Paginator
-from .models import Producto
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from api_productos import db_pool as pool_conexiones
+from api_productos import replicas
+from .models import Producto, StockInsuficienteError
+from . import cache_objetos
+from .busqueda import obtener_backend
+from .cache_respuestas import respuesta_en_cache
+from .condicionales import Validadores, huella
+from .exportacion import FORMATOS, exportar_json, filas_exportacion
+from .facetas import contar_facetas, formatear_facetas, leer_resumen
+from .filtros import filtrar_texto
+from .lotes import ProductosNoEncontrados, obtener_tamano_lote
+from .conteo import EXACTO, PaginadorConteo, contar, obtener_estrategia
+from .paginacion import PaginadorCursor, CursorInvalido, iterar_por_lotes, obtener_orden
 from .serializers import (
     ProductoSerializer, 
     ProductoListSerializer, 
-    ProductoCreateUpdateSerializer
+    ProductoCreateUpdateSerializer,
+    ProductoActualizacionLoteSerializer,
+    ReduccionStockLoteSerializer,
+    LoteIdsSerializer,
+    obtener_valores_serializer,
+    seleccionar_campos
 )
 
 
+# Parámetros de consulta que filtran el queryset de get_queryset()
+FILTROS_LISTADO = frozenset(['categoria', 'marca', 'precio_min', 'precio_max', 'solo_con_stock'])
+
+# Acciones que aceptan el parámetro campos
+ACCIONES_CAMPOS = frozenset([
+    'list', 'retrieve', 'lote', 'buscar', 'por_categoria', 'por_marca', 'sin_stock'
+])
+
+# Acciones que responden con los campos del detalle (ProductoSerializer)
+ACCIONES_DETALLE = frozenset(['retrieve', 'lote'])
+
+# Columnas que el detalle lee siempre (ETag y Last-Modified)
+COLUMNAS_VALIDADORES = ['id', 'fecha_actualizacion', 'cantidad']
+
+
 class ProductoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar productos.
@@ -25,15 +57,59 @@ class ProductoViewSet(viewsets.ModelViewSet):
     
     Acciones adicionales:
     - GET /productos/buscar/ - Buscar productos por nombre, categoría o marca
+    - GET/POST /productos/lote/ - Obtener varios productos por id
     - GET /productos/categoria/{categoria}/ - Filtrar por categoría
     - GET /productos/marca/{marca}/ - Filtrar por marca
     - GET /productos/sin-stock/ - Productos sin stock
+    - GET /productos/estadisticas_cache/ - Aciertos y fallos de la cache de objetos
+    - GET /productos/estadisticas_pool/ - Estado del pool de conexiones
+    - GET /productos/facetas/ - Conteos por categoría, marca, stock y precio
     - POST /productos/{id}/reducir-stock/ - Reducir stock de un producto
+    - POST /productos/reducir_stock_lote/ - Reducir stock de varios productos
+    - POST /productos/masivo/ - Crear o actualizar (upsert) productos en lote
+    - PATCH /productos/masivo/ - Actualizar parcialmente productos por id en lote
+    - GET /productos/exportar/ - Exportar el catálogo filtrado (NDJSON o CSV)
+    
+    El detalle, el lote, el listado, la búsqueda y los filtros aceptan
+    campos=a,b,... para leer y enviar solo esos campos.
+    
+    El detalle, el listado y los filtros por categoría, marca y sin stock
+    responden con ETag y Last-Modified, y devuelven 304 a las peticiones
+    condicionales (If-None-Match / If-Modified-Since) sin serializar. Las
+    respuestas del listado y de los filtros se guardan además en cache
+    (ver cache_respuestas).
+    
+    Las peticiones de lectura usan las réplicas de PRODUCTOS_REPLICAS (ver
+    api_productos.replicas).
     """
     
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     permission_classes = [AllowAny]  # Para desarrollo, en producción usar autenticación
+    tamano_pagina = 20
+    # Acciones que aceptan POST (para cuerpos largos) pero solo leen
+    acciones_lectura = ('lote',)
+    
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Atiende las peticiones seguras leyendo de una réplica (si hay
+        réplicas configuradas) y fija a la base primaria, durante la ventana
+        de consistencia, a los clientes que escriben.
+        """
+        segura = self.es_lectura(request)
+        with replicas.lecturas(request, segura):
+            response = super().dispatch(request, *args, **kwargs)
+        if not segura:
+            replicas.fijar_primaria(response)
+        return response
+    
+    def es_lectura(self, request):
+        """
+        Indica si la petición solo lee: por su método o por ser una de las
+        acciones_lectura (acciones POST que no escriben).
+        """
+        accion = getattr(self, 'action_map', {}).get(request.method.lower())
+        return replicas.es_segura(request) or accion in self.acciones_lectura
     
     def get_serializer_class(self):
         """
@@ -48,6 +124,157 @@ class ProductoViewSet(viewsets.ModelViewSet):
             return ProductoCreateUpdateSerializer
         return ProductoSerializer
     
+    def get_serializer(self, *args, **kwargs):
+        """Aplica el parámetro campos al serializador del detalle"""
+        if self.action == 'retrieve':
+            kwargs.setdefault('campos', self.get_campos())
+        return super().get_serializer(*args, **kwargs)
+    
+    def initial(self, request, *args, **kwargs):
+        """Valida el parámetro campos antes de consultar la base de datos"""
+        super().initial(request, *args, **kwargs)
+        self.get_campos()
+    
+    def get_campos(self):
+        """
+        Campos pedidos con el parámetro "campos" para la acción en curso.
+        
+        Returns:
+            tuple: Campos en el orden del serializador, o None para todos
+            
+        Raises:
+            CamposInvalidos: Si se pide un campo que la acción no tiene (400)
+        """
+        if self.action not in ACCIONES_CAMPOS:
+            return None
+        return seleccionar_campos(
+            self.request.query_params.get('campos'),
+            obtener_valores_serializer(self.get_serializer_campos()).campos
+        )
+    
+    def get_serializer_campos(self):
+        """Serializador cuyos campos emite la acción: el del detalle o el del listado"""
+        if self.action in ACCIONES_DETALLE:
+            return ProductoSerializer
+        return ProductoListSerializer
+    
+    def usa_cache_objetos(self):
+        """
+        Indica si el detalle o reducir_stock leen el producto de la cache de
+        objetos. Las peticiones con filtros en la URL se resuelven siempre
+        con la consulta, ya que get_queryset() puede excluir el producto.
+        """
+        return (self.action in ('retrieve', 'reducir_stock')
+                and cache_objetos.habilitada()
+                and not FILTROS_LISTADO.intersection(self.request.query_params))
+    
+    def get_object(self):
+        """
+        Obtiene el producto del detalle o de reducir_stock desde la cache de
+        objetos (PRODUCTOS_CACHE_OBJETOS) y, si no está, desde la base de
+        datos guardándolo en cache (ver usa_cache_objetos).
+        
+        Returns:
+            Producto: Instancia del producto
+        """
+        if not self.usa_cache_objetos():
+            return super().get_object()
+        
+        producto = cache_objetos.obtener_o_cargar(
+            self.kwargs[self.lookup_field], super().get_object
+        )
+        self.check_object_permissions(self.request, producto)
+        return producto
+    
+    def verificar_vigencia(self, validadores):
+        """
+        Registra los validadores de la respuesta y evalúa las cabeceras
+        condicionales de la petición.
+        
+        Args:
+            validadores (Validadores): ETag y última modificación del recurso
+            
+        Returns:
+            HttpResponse: 304 si la copia del cliente sigue vigente, o None
+        """
+        self.validadores = validadores
+        return validadores.respuesta_no_modificada(self.request)
+    
+    def verificar_vigencia_conjunto(self, queryset, estrategia=None):
+        """
+        Igual que verificar_vigencia, usando la huella del conjunto filtrado
+        (última fecha_actualizacion y total de filas).
+        
+        La huella solo se calcula con conteo exacto por número de página,
+        donde su total reemplaza al COUNT(*). En modo cursor y con las
+        estrategias cache y estimado no se consulta nada: los validadores se
+        arman después con la página (ver verificar_vigencia_pagina).
+        
+        Args:
+            queryset: QuerySet filtrado de productos
+            estrategia (str): Estrategia de conteo (por defecto PRODUCTOS_CONTEO)
+            
+        Returns:
+            tuple: (respuesta 304 o None, total exacto de filas del conjunto,
+                o None si no se calculó la huella)
+        """
+        estrategia = estrategia or obtener_estrategia()
+        if estrategia != EXACTO or 'cursor' in self.request.query_params:
+            return None, None
+        ultima, total = huella(queryset)
+        return self.verificar_vigencia(Validadores.de_conjunto(ultima, total)), total
+    
+    def verificar_vigencia_pagina(self, filas, paginacion):
+        """
+        Igual que verificar_vigencia, con validadores tomados de las filas de
+        la página ya leída (sin consultas adicionales).
+        
+        Args:
+            filas (list): Filas de values() de la página
+            paginacion (dict): Datos de paginación de la respuesta
+            
+        Returns:
+            HttpResponse: 304 si la copia del cliente sigue vigente, o None
+        """
+        return self.verificar_vigencia(Validadores.de_pagina(filas, paginacion))
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Agrega ETag y Last-Modified a las respuestas exitosas de lectura"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validadores = getattr(self, 'validadores', None)
+        if validadores is not None and response.status_code == status.HTTP_200_OK:
+            validadores.aplicar(response)
+        return response
+    
+    def get_valores_serializer(self):
+        """
+        Retorna el serializador rápido para las acciones de solo lectura.
+        
+        Produce la misma salida que ProductoListSerializer, o que
+        ProductoSerializer en el lote (limitada al parámetro campos), a
+        partir de diccionarios de values(), sin crear instancias de Producto.
+        
+        Returns:
+            ValoresSerializer: Serializador precompilado
+        """
+        return obtener_valores_serializer(self.get_serializer_campos(), self.get_campos())
+    
+    def get_valores(self, queryset):
+        """
+        Convierte el queryset en values() con las columnas que necesita el
+        serializador rápido (más el campo de ordenamiento, usado por el cursor,
+        y fecha_actualizacion, usada por los validadores de la página).
+        
+        Args:
+            queryset: QuerySet de productos
+            
+        Returns:
+            QuerySet: QuerySet de diccionarios
+        """
+        columnas = self.get_valores_serializer().columnas
+        columnas = columnas + ['id', 'fecha_actualizacion', self.get_orden().lstrip('-')]
+        return queryset.values(*dict.fromkeys(columnas))
+    
     def get_queryset(self):
         """
         Filtra el queryset según los parámetros de consulta.
@@ -56,16 +283,17 @@ class ProductoViewSet(viewsets.ModelViewSet):
             QuerySet: Queryset filtrado según los parámetros
         """
         queryset = Producto.objects.all()
+        coincidencia = self.request.query_params.get('coincidencia', None)
         
         # Filtro por categoría
         categoria = self.request.query_params.get('categoria', None)
         if categoria:
-            queryset = queryset.filter(categoria__icontains=categoria)
+            queryset = filtrar_texto(queryset, 'categoria', categoria, coincidencia)
         
         # Filtro por marca
         marca = self.request.query_params.get('marca', None)
         if marca:
-            queryset = queryset.filter(marca__icontains=marca)
+            queryset = filtrar_texto(queryset, 'marca', marca, coincidencia)
         
         # Filtro por rango de precio
         precio_min = self.request.query_params.get('precio_min', None)
@@ -81,29 +309,39 @@ class ProductoViewSet(viewsets.ModelViewSet):
         if solo_con_stock and solo_con_stock.lower() == 'true':
             queryset = queryset.filter(cantidad__gt=0)
         
-        # Ordenamiento
-        orden = self.request.query_params.get('orden', None)
-        if orden == 'precio_asc':
-            queryset = queryset.order_by('precio')
-        elif orden == 'precio_desc':
-            queryset = queryset.order_by('-precio')
-        elif orden == 'nombre':
-            queryset = queryset.order_by('nombre')
-        elif orden == 'fecha_desc':
-            queryset = queryset.order_by('-fecha_creacion')
-        else:
-            queryset = queryset.order_by('-fecha_creacion')  # Orden por defecto
+        # Ordenamiento (por defecto: fecha de creación descendente)
+        queryset = queryset.order_by(self.get_orden())
+        
+        # Detalle con campos: leer solo sus columnas (salvo que el producto
+        # se guarde completo en la cache de objetos)
+        campos = self.get_campos() if getattr(self, 'action', None) == 'retrieve' else None
+        if campos is not None and not self.usa_cache_objetos():
+            columnas = obtener_valores_serializer(ProductoSerializer, campos).columnas
+            queryset = queryset.only(*dict.fromkeys(columnas + COLUMNAS_VALIDADORES))
         
         return queryset
     
+    def get_orden(self):
+        """
+        Retorna el campo de ordenamiento activo según el parámetro "orden".
+        
+        Returns:
+            str: Campo de ordenamiento (por ejemplo '-fecha_creacion')
+        """
+        return obtener_orden(self.request.query_params.get('orden', None))
+    
     @action(detail=False, methods=['get'])
     def buscar(self, request):
         """
         Buscar productos por nombre, categoría o marca.
         
+        La búsqueda ignora mayúsculas y acentos, acepta prefijos ("sams"
+        encuentra "Samsung") y ordena los resultados por relevancia.
+        
         Parámetros:
         - q: Término de búsqueda
         - limit: Límite de resultados (por defecto: 20)
+        - campos: Campos de cada producto separados por comas
         
         Returns:
             Response: Lista de productos que coinciden con la búsqueda
@@ -117,77 +355,216 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Búsqueda en nombre, categoría y marca
-        productos = Producto.objects.filter(
-            Q(nombre__icontains=termino) |
-            Q(categoria__icontains=termino) |
-            Q(marca__icontains=termino)
-        )[:limite]
-        
-        serializer = ProductoListSerializer(productos, many=True)
+        # Búsqueda en el índice de nombre, categoría y marca (ordenada por relevancia)
+        ids = obtener_backend().buscar(termino, limite)
+        filas = self.get_valores(Producto.objects.filter(pk__in=ids))
+        encontrados = {fila['id']: fila for fila in filas}
+        productos = self.get_valores_serializer().serializar(
+            encontrados[pk] for pk in ids if pk in encontrados
+        )
         
         return Response({
-            'resultados': serializer.data,
-            'total': len(serializer.data),
+            'resultados': productos,
+            'total': len(productos),
             'termino_busqueda': termino
         })
     
+    @action(detail=False, methods=['get', 'post'])
+    def lote(self, request):
+        """
+        Obtener varios productos por id en una sola petición.
+        
+        Los productos se leen con una consulta id__in por cada
+        PRODUCTOS_TAMANO_LOTE ids (los que están en la cache de objetos, con
+        una sola lectura de la cache) y se devuelven en el orden pedido con
+        la misma salida que el detalle. Los ids repetidos se devuelven una
+        vez y los inexistentes se informan en no_encontrados.
+        
+        Parámetros:
+        - ids: Ids separados por comas (GET)
+        - campos: Campos de cada producto separados por comas
+        
+        Body (POST, para listas largas):
+        {
+            "ids": [12, 7, 31]
+        }
+        
+        Returns:
+            Response: Productos encontrados, total e ids no encontrados
+        """
+        if request.method == 'GET':
+            datos = {'ids': [
+                parte for parte in request.query_params.get('ids', '').split(',') if parte.strip()
+            ]}
+        else:
+            datos = request.data
+        entrada = LoteIdsSerializer(
+            data=datos,
+            context={'max_ids': getattr(settings, 'PRODUCTOS_MAX_ELEMENTOS_LOTE', 10000)}
+        )
+        entrada.is_valid(raise_exception=True)
+        ids = entrada.validated_data['ids']
+        
+        filas = self.leer_lote(ids)
+        productos = self.get_valores_serializer().serializar(
+            filas[pk] for pk in ids if pk in filas
+        )
+        
+        return Response({
+            'productos': productos,
+            'total': len(productos),
+            'no_encontrados': [pk for pk in ids if pk not in filas]
+        })
+    
+    def leer_lote(self, ids):
+        """
+        Lee las filas de varios productos por id para get_valores_serializer().
+        
+        Con la cache de objetos activa, los productos se buscan primero en
+        la cache y los que faltan se leen completos y se guardan en ella;
+        sin cache se leen con values() solo las columnas necesarias.
+        
+        Args:
+            ids (list): Ids de los productos
+            
+        Returns:
+            dict: Id -> fila de los productos encontrados
+        """
+        columnas = self.get_valores_serializer().columnas
+        usa_cache = cache_objetos.habilitada()
+        filas = {}
+        
+        pendientes = ids
+        if usa_cache:
+            for pk, producto in cache_objetos.obtener_varios(ids).items():
+                filas[pk] = {columna: getattr(producto, columna) for columna in columnas}
+            pendientes = [pk for pk in ids if pk not in filas]
+        
+        tamano_lote = obtener_tamano_lote()
+        for inicio in range(0, len(pendientes), tamano_lote):
+            queryset = Producto.objects.filter(pk__in=pendientes[inicio:inicio + tamano_lote])
+            if usa_cache:
+                productos = list(queryset)
+                cache_objetos.llenar(productos)
+                for producto in productos:
+                    filas[producto.pk] = {columna: getattr(producto, columna) for columna in columnas}
+            else:
+                for fila in queryset.values(*dict.fromkeys(columnas + ['id'])):
+                    filas[fila['id']] = fila
+        return filas
+    
     @action(detail=False, methods=['get'], url_path='categoria/(?P<categoria>[^/.]+)')
+    @respuesta_en_cache
     def por_categoria(self, request, categoria=None):
         """
         Filtrar productos por categoría específica.
         
+        Acepta la misma paginación que el listado (page, cursor, por_pagina,
+        orden), coincidencia (exacto, prefijo o contiene) y completo=true
+        para recibir todas las filas en streaming.
+        
         Args:
             categoria: Nombre de la categoría
             
         Returns:
             Response: Lista de productos de la categoría
         """
-        productos = Producto.objects.filter(categoria__icontains=categoria)
-        serializer = ProductoListSerializer(productos, many=True)
-        
-        return Response({
-            'categoria': categoria,
-            'productos': serializer.data,
-            'total': len(serializer.data)
-        })
+        return self._listar_filtrado(
+            request,
+            filtrar_texto(
+                Producto.objects.all(), 'categoria', categoria,
+                request.query_params.get('coincidencia')
+            ),
+            {'categoria': categoria}
+        )
     
     @action(detail=False, methods=['get'], url_path='marca/(?P<marca>[^/.]+)')
+    @respuesta_en_cache
     def por_marca(self, request, marca=None):
         """
         Filtrar productos por marca específica.
         
+        Acepta la misma paginación que el listado (page, cursor, por_pagina,
+        orden), coincidencia (exacto, prefijo o contiene) y completo=true
+        para recibir todas las filas en streaming.
+        
         Args:
             marca: Nombre de la marca
             
         Returns:
             Response: Lista de productos de la marca
         """
-        productos = Producto.objects.filter(marca__icontains=marca)
-        serializer = ProductoListSerializer(productos, many=True)
-        
-        return Response({
-            'marca': marca,
-            'productos': serializer.data,
-            'total': len(serializer.data)
-        })
+        return self._listar_filtrado(
+            request,
+            filtrar_texto(
+                Producto.objects.all(), 'marca', marca,
+                request.query_params.get('coincidencia')
+            ),
+            {'marca': marca}
+        )
     
     @action(detail=False, methods=['get'])
+    @respuesta_en_cache
     def sin_stock(self, request):
         """
         Obtener productos sin stock disponible.
         
+        Acepta la misma paginación que el listado (page, cursor, por_pagina,
+        orden) y completo=true para recibir todas las filas en streaming.
+        
         Returns:
             Response: Lista de productos con cantidad = 0
         """
-        productos = Producto.objects.filter(cantidad=0)
-        serializer = ProductoListSerializer(productos, many=True)
+        return self._listar_filtrado(
+            request,
+            Producto.objects.filter(cantidad=0),
+            {},
+            clave='productos_sin_stock'
+        )
+    
+    @action(detail=False, methods=['get'])
+    def facetas(self, request):
+        """
+        Conteos por categoría, marca, stock y rango de precio.
+        
+        Acepta los mismos filtros que el listado y cuenta sobre el conjunto
+        filtrado. Sin filtros, los conteos se leen del resumen que mantienen
+        las señales, sin recorrer la tabla de productos.
         
+        Returns:
+            Response: Total, categorias, marcas, stock y precios
+        """
+        if FILTROS_LISTADO.intersection(request.query_params):
+            conteos = contar_facetas(self.get_queryset())
+        else:
+            conteos = leer_resumen()
+        return Response(formatear_facetas(conteos))
+    
+    @action(detail=False, methods=['get'])
+    def estadisticas_cache(self, request):
+        """
+        Contadores de la cache de objetos en el proceso que atiende la petición.
+        
+        Returns:
+            Response: Aciertos, fallos y tasa de aciertos
+        """
         return Response({
-            'productos_sin_stock': serializer.data,
-            'total': len(serializer.data)
+            'habilitada': cache_objetos.habilitada(),
+            **cache_objetos.estadisticas.como_dict()
         })
     
+    @action(detail=False, methods=['get'])
+    def estadisticas_pool(self, request):
+        """
+        Estado del pool de conexiones a la base de datos en el proceso que
+        atiende la petición.
+        
+        Returns:
+            Response: Conexiones en uso y libres y tiempos de espera por alias
+                (vacío si el backend no usa pool)
+        """
+        return Response(pool_conexiones.estadisticas())
+    
     @action(detail=True, methods=['post'])
     def reducir_stock(self, request, pk=None):
         """
@@ -222,6 +599,216 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'])
+    def reducir_stock_lote(self, request):
+        """
+        Reducir el stock de varios productos en una sola transacción.
+        
+        La operación es todo o nada: si algún producto no existe o no tiene
+        stock suficiente, no se modifica ninguno.
+        
+        Body:
+        {
+            "productos": [
+                {"id": 1, "cantidad": 2},
+                {"id": 7, "cantidad": 1}
+            ]
+        }
+        
+        Returns:
+            Response: Productos actualizados o detalle de los que fallaron
+        """
+        entrada = ReduccionStockLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        reducciones = [
+            (linea['id'], linea['cantidad'])
+            for linea in entrada.validated_data['productos']
+        ]
+        
+        try:
+            productos = Producto.reducir_stock_lote(reducciones)
+        except StockInsuficienteError as error:
+            return Response(
+                {
+                    'error': str(error),
+                    'sin_stock_suficiente': error.sin_stock,
+                    'no_encontrados': error.no_encontrados,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = ProductoSerializer(productos, many=True)
+        return Response({
+            'mensaje': f'Stock reducido exitosamente en {len(productos)} producto(s)',
+            'productos': serializer.data
+        })
+    
+    @action(detail=False, methods=['post'])
+    def masivo(self, request):
+        """
+        Crear productos en lote a partir de una lista JSON.
+        
+        Cada elemento se valida por separado: los inválidos se reportan con
+        su índice sin abortar el resto de la carga. Los válidos se insertan
+        con INSERT de varias filas (PRODUCTOS_TAMANO_LOTE por sentencia).
+        
+        Parámetros:
+        - upsert: Si es true, los productos existentes con el mismo nombre
+          y marca se actualizan en lugar de duplicarse
+        
+        Body:
+        [
+            {"nombre": "...", "categoria": "...", "marca": "...",
+             "precio": "10.00", "cantidad": 5},
+            ...
+        ]
+        
+        Returns:
+            Response: Resultado por elemento y errores de validación
+        """
+        serializer = ProductoCreateUpdateSerializer(
+            data=request.data,
+            many=True,
+            max_length=getattr(settings, 'PRODUCTOS_MAX_ELEMENTOS_LOTE', 10000)
+        )
+        validos, errores = serializer.validar_elementos()
+        
+        upsert = request.query_params.get('upsert', '').lower() == 'true'
+        productos = serializer.guardar(validos, upsert=upsert) if validos else []
+        creados = sum(1 for p in productos if p['estado'] == 'creado')
+        
+        if not productos:
+            codigo = status.HTTP_400_BAD_REQUEST
+        elif errores:
+            codigo = status.HTTP_207_MULTI_STATUS
+        elif creados:
+            codigo = status.HTTP_201_CREATED
+        else:
+            codigo = status.HTTP_200_OK
+        
+        return Response({
+            'creados': creados,
+            'actualizados': len(productos) - creados,
+            'errores': errores,
+            'productos': productos
+        }, status=codigo)
+    
+    @masivo.mapping.patch
+    def actualizar_masivo(self, request):
+        """
+        Actualizar parcialmente productos por id en lote.
+        
+        Cada elemento lleva el id y los campos a modificar, validados con
+        las reglas de ProductoCreateUpdateSerializer. Por cada lote de
+        PRODUCTOS_TAMANO_LOTE productos se hace una consulta id__in y un
+        UPDATE por combinación de campos modificados, que escribe solo esas
+        columnas y fecha_actualizacion.
+        
+        Parámetros:
+        - atomico: Si es true, la carga es todo o nada: con algún elemento
+          inválido o algún id inexistente no se modifica ningún producto
+        
+        Body:
+        [
+            {"id": 1, "precio": "12.50"},
+            {"id": 7, "precio": "8.00", "cantidad": 30},
+            ...
+        ]
+        
+        Returns:
+            Response: Resultado por id (actualizado, sin_cambios o
+                no_encontrado) y errores de validación
+        """
+        serializer = ProductoActualizacionLoteSerializer(
+            data=request.data,
+            many=True,
+            partial=True,
+            max_length=getattr(settings, 'PRODUCTOS_MAX_ELEMENTOS_LOTE', 10000)
+        )
+        validos, errores = serializer.validar_actualizaciones()
+        
+        atomico = request.query_params.get('atomico', '').lower() == 'true'
+        if atomico and errores:
+            return Response(
+                {'error': 'La carga tiene elementos inválidos', 'errores': errores},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            productos = serializer.actualizar(validos, atomico=atomico) if validos else []
+        except ProductosNoEncontrados as error:
+            return Response(
+                {'error': str(error), 'no_encontrados': error.ids},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        estados = [p['estado'] for p in productos]
+        no_encontrados = [p['id'] for p in productos if p['estado'] == 'no_encontrado']
+        
+        if len(no_encontrados) == len(productos):
+            codigo = status.HTTP_400_BAD_REQUEST
+        elif errores or no_encontrados:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_200_OK
+        
+        return Response({
+            'actualizados': estados.count('actualizado'),
+            'sin_cambios': estados.count('sin_cambios'),
+            'no_encontrados': no_encontrados,
+            'errores': errores,
+            'productos': productos
+        }, status=codigo)
+    
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exportar el catálogo completo en streaming.
+        
+        Acepta los mismos filtros y ordenamiento que el listado. Las filas
+        se leen en lotes y se envían a medida que se generan, por lo que la
+        memoria no depende del número de productos exportados.
+        
+        Parámetros:
+        - formato: ndjson (por defecto) o csv
+        
+        Returns:
+            StreamingHttpResponse: Archivo con una fila por producto
+        """
+        formato = request.query_params.get('formato', 'ndjson')
+        if formato not in FORMATOS:
+            return Response(
+                {'error': f'Formato no soportado. Opciones: {", ".join(FORMATOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        generador, content_type, extension = FORMATOS[formato]
+        filas = filas_exportacion(self.get_queryset(), self.get_orden())
+        response = StreamingHttpResponse(generador(filas), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="productos.{extension}"'
+        return response
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Obtener un producto específico.
+        
+        Si la copia del cliente sigue vigente según fecha_actualizacion
+        (If-None-Match / If-Modified-Since), responde 304 sin serializar.
+        Con el parámetro campos responde (y, sin cache de objetos, lee) solo
+        esos campos.
+        
+        Returns:
+            Response: Datos del producto
+        """
+        producto = self.get_object()
+        no_modificada = self.verificar_vigencia(Validadores.de_producto(producto))
+        if no_modificada is not None:
+            return no_modificada
+        
+        serializer = self.get_serializer(producto)
+        return Response(serializer.data)
+    
+    @respuesta_en_cache
     def list(self, request, *args, **kwargs):
         """
         Lista productos con paginación y filtros.
@@ -230,42 +817,176 @@ class ProductoViewSet(viewsets.ModelViewSet):
         - page: Número de página
         - categoria: Filtrar por categoría
         - marca: Filtrar por marca
+        - coincidencia: Modo de los filtros de texto (exacto, prefijo o contiene)
         - precio_min: Precio mínimo
         - precio_max: Precio máximo
         - solo_con_stock: Solo productos con stock
         - orden: Ordenamiento (precio_asc, precio_desc, nombre, fecha_desc)
+        - cursor: Activa la paginación por cursor (vacío para la primera página)
+        - por_pagina: Productos por página (máximo PRODUCTOS_MAX_POR_PAGINA)
+        - conteo: Estrategia de conteo del total (exacto, cache, estimado)
+        - campos: Campos de cada producto separados por comas (por defecto todos)
         
         Returns:
             Response: Lista paginada de productos
         """
         queryset = self.get_queryset()
+        estrategia = obtener_estrategia(request.query_params.get('conteo'))
+        no_modificada, total_filas = self.verificar_vigencia_conjunto(queryset, estrategia)
+        if no_modificada is not None:
+            return no_modificada
+        
+        try:
+            filas, paginacion = self.paginar(queryset, total_filas, estrategia)
+        except CursorInvalido as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Paginación manual para mayor control
-        page_size = 20
-        page_number = request.query_params.get('page', 1)
+        if total_filas is None:
+            no_modificada = self.verificar_vigencia_pagina(filas, paginacion)
+            if no_modificada is not None:
+                return no_modificada
         
+        return Response({
+            'productos': self.get_valores_serializer().serializar(filas),
+            'paginacion': paginacion
+        })
+    
+    def get_tamano_pagina(self):
+        """
+        Retorna el tamaño de página solicitado con el parámetro "por_pagina",
+        limitado por PRODUCTOS_MAX_POR_PAGINA.
+        
+        Returns:
+            int: Productos por página
+        """
+        maximo = getattr(settings, 'PRODUCTOS_MAX_POR_PAGINA', 100)
         try:
-            page_number = int(page_number)
+            tamano = int(self.request.query_params.get('por_pagina', self.tamano_pagina))
         except (ValueError, TypeError):
-            page_number = 1
+            tamano = self.tamano_pagina
+        return max(1, min(tamano, maximo))
+    
+    def paginar(self, queryset, total_filas, estrategia=None):
+        """
+        Obtiene una página de productos del queryset ya filtrado.
+        
+        Con el parámetro "cursor" usa paginación keyset (sin COUNT(*) ni
+        OFFSET); si no, paginación por número de página con la estrategia de
+        conteo indicada.
+        
+        Args:
+            queryset: QuerySet filtrado de productos
+            total_filas (int): Total exacto de filas (de la huella del conjunto),
+                o None si hay que obtenerlo con la estrategia de conteo
+            estrategia (str): Estrategia de conteo (por defecto PRODUCTOS_CONTEO)
+            
+        Returns:
+            tuple: (lista de filas de values() de la página, diccionario de
+                paginación)
+            
+        Raises:
+            CursorInvalido: Si el cursor recibido no es válido
+        """
+        params = self.request.query_params
+        tamano = self.get_tamano_pagina()
         
-        paginator = Paginator(queryset, page_size)
+        if 'cursor' in params:
+            paginador = PaginadorCursor(self.get_valores(queryset), self.get_orden(), tamano)
+            return paginador.pagina(params.get('cursor'))
         
+        # La huella ya contó las filas: el conteo exacto no repite la consulta
+        if total_filas is not None:
+            total, total_exacto = total_filas, True
+        else:
+            total, total_exacto = contar(queryset, estrategia or obtener_estrategia())
+        
+        filas, paginacion = self.pagina_numerada(queryset, total, total_exacto)
+        return list(filas), paginacion
+    
+    def pagina_numerada(self, queryset, total, total_exacto):
+        """
+        Arma la página del parámetro "page" a partir de un total ya contado.
+        
+        Args:
+            queryset: QuerySet filtrado de productos
+            total (int): Total de filas según la estrategia de conteo
+            total_exacto (bool): Si el total es exacto
+            
+        Returns:
+            tuple: (QuerySet de values() de la página, sin evaluar,
+                diccionario de paginación)
+        """
+        tamano = self.get_tamano_pagina()
+        try:
+            numero = int(self.request.query_params.get('page', 1))
+        except (ValueError, TypeError):
+            numero = 1
+        
+        paginator = PaginadorConteo(self.get_valores(queryset), tamano, total)
         try:
-            page_obj = paginator.page(page_number)
+            page_obj = paginator.page(numero)
         except:
             page_obj = paginator.page(1)
         
-        serializer = self.get_serializer(page_obj.object_list, many=True)
+        return page_obj.object_list, {
+            'pagina_actual': page_obj.number,
+            'total_paginas': paginator.num_pages,
+            'total_productos': paginator.count,
+            'total_exacto': total_exacto,
+            'productos_por_pagina': tamano,
+            'tiene_siguiente': page_obj.has_next(),
+            'tiene_anterior': page_obj.has_previous(),
+        }
+    
+    def _listar_filtrado(self, request, queryset, encabezado, clave='productos'):
+        """
+        Responde una acción de filtro con la misma paginación que el listado.
+        
+        Args:
+            request: Petición HTTP
+            queryset: QuerySet filtrado de productos
+            encabezado (dict): Datos que preceden a la lista en la respuesta
+            clave (str): Nombre de la lista de productos en la respuesta
+            
+        Returns:
+            Response: Página de productos, total (None en modo cursor) y
+                paginación, o la lista completa en streaming con completo=true
+        """
+        queryset = queryset.order_by(self.get_orden())
+        
+        if request.query_params.get('completo', '').lower() == 'true':
+            filas = iterar_por_lotes(
+                self.get_valores(queryset), self.get_orden(),
+                getattr(settings, 'PRODUCTOS_EXPORTACION_LOTE', 2000)
+            )
+            contenido = exportar_json(
+                map(self.get_valores_serializer().convertir, filas), encabezado, clave
+            )
+            return StreamingHttpResponse(contenido, content_type='application/json')
+        
+        no_modificada, total_filas = self.verificar_vigencia_conjunto(queryset)
+        if no_modificada is not None:
+            return no_modificada
+        
+        try:
+            filas, paginacion = self.paginar(queryset, total_filas)
+        except CursorInvalido as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if total_filas is None:
+            no_modificada = self.verificar_vigencia_pagina(filas, paginacion)
+            if no_modificada is not None:
+                return no_modificada
         
         return Response({
-            'productos': serializer.data,
-            'paginacion': {
-                'pagina_actual': page_obj.number,
-                'total_paginas': paginator.num_pages,
-                'total_productos': paginator.count,
-                'productos_por_pagina': page_size,
-                'tiene_siguiente': page_obj.has_next(),
-                'tiene_anterior': page_obj.has_previous(),
-            }
-        })
\ No newline at end of file
+            **encabezado,
+            clave: self.get_valores_serializer().serializar(filas),
+            'total': paginacion.get('total_productos'),
+            'paginacion': paginacion
+        })
@@ -0,0 +1,396 @@
+"""
+Vistas async de lectura para la aplicación ASGI.
+
+Bajo ASGI, las vistas síncronas de DRF se ejecutan en un hilo del pool de
+asgiref, por lo que cada petición en curso ocupa un hilo mientras espera a
+la base de datos. Estas vistas atienden las lecturas más frecuentes con el
+ORM async de Django sin ocupar hilos:
+
+- GET /api/productos/ (listado)
+- GET /api/productos/{id}/ (detalle)
+- GET /api/productos/buscar/
+- GET /api/productos/categoria/{categoria}/
+- GET /api/productos/marca/{marca}/
+
+Reutilizan ProductoViewSet para los filtros, el ordenamiento, la
+serialización, los validadores condicionales y el manejo de errores, así
+que las respuestas son las mismas que las de la vista síncrona. El resto de
+los métodos de esas rutas (POST, PUT, PATCH, DELETE) se delegan a la vista
+síncrona (ver rutas_async). Como en el ViewSet, las lecturas usan las
+réplicas configuradas (api_productos.replicas).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from api_productos import replicas
+from . import cache_objetos
+from .busqueda import obtener_backend
+from .cache_respuestas import respuesta_en_cache
+from .condicionales import Validadores, ahuella
+from .conteo import EXACTO, acontar, obtener_estrategia
+from .exportacion import exportar_json
+from .filtros import filtrar_texto
+from .models import Producto
+from .paginacion import PaginadorCursor, CursorInvalido, iterar_por_lotes
+from .views import ProductoViewSet
+
+
+async def _en_hilo(iterable):
+    """Recorre un iterador síncrono que consulta la base de datos desde código async"""
+    iterador = iter(iterable)
+    siguiente = sync_to_async(next)
+    fin = object()
+    while (elemento := await siguiente(iterador, fin)) is not fin:
+        yield elemento
+
+
+class LecturaAsync(View):
+    """
+    Base de las vistas async: prepara un ProductoViewSet para la acción y
+    entrega la respuesta ya renderizada.
+
+    Las subclases implementan responder(request, *args, **kwargs), que
+    recibe la petición de DRF y retorna una respuesta como la acción
+    equivalente del ViewSet.
+    """
+
+    accion = None
+    detalle = False
+
+    async def get(self, request, *args, **kwargs):
+        async with replicas.alecturas(request):
+            return await self.atender(request, *args, **kwargs)
+
+    async def atender(self, request, *args, **kwargs):
+        vista = ProductoViewSet(
+            action_map={'get': self.accion, 'head': self.accion},
+            basename='producto', detail=self.detalle, suffix=None
+        )
+        vista.args, vista.kwargs = args, kwargs
+        vista.request = request
+        request = vista.initialize_request(request, *args, **kwargs)
+        vista.request = request
+        vista.headers = vista.default_response_headers
+        self.vista = vista
+
+        try:
+            vista.format_kwarg = vista.get_format_suffix(**kwargs)
+            request.accepted_renderer, request.accepted_media_type = (
+                vista.perform_content_negotiation(request)
+            )
+            request.version, request.versioning_scheme = (
+                vista.determine_version(request, *args, **kwargs)
+            )
+            await self.verificar_acceso(request)
+            vista.get_campos()
+            respuesta = await self.responder(request, *args, **kwargs)
+        except Exception as exc:
+            respuesta = vista.handle_exception(exc)
+
+        respuesta = vista.finalize_response(request, respuesta, *args, **kwargs)
+        return self.entregar(respuesta)
+
+    async def responder(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def verificar_acceso(self, request):
+        """
+        Evalúa los permisos y límites de ProductoViewSet.
+
+        Con AllowAny y sin throttling no hace falta autenticar; en otro caso
+        se evalúan en un hilo, ya que la autenticación puede consultar la
+        sesión en la base de datos.
+        """
+        vista = self.vista
+        if vista.get_throttles() or not all(
+            isinstance(permiso, AllowAny) for permiso in vista.get_permissions()
+        ):
+            await sync_to_async(vista.initial)(request)
+
+    def entregar(self, respuesta):
+        """
+        Renderiza las respuestas de DRF aquí para que el manejador ASGI no
+        lo haga en un hilo.
+        """
+        if not isinstance(respuesta, Response):
+            return respuesta
+        respuesta.render()
+        return HttpResponse(
+            respuesta.content, status=respuesta.status_code, headers=dict(respuesta.items())
+        )
+
+    def verificar_vigencia(self, validadores):
+        """Igual que ProductoViewSet.verificar_vigencia"""
+        return self.vista.verificar_vigencia(validadores)
+
+    @property
+    def validadores(self):
+        return getattr(self.vista, 'validadores', None)
+
+    async def verificar_vigencia_conjunto(self, queryset, estrategia=None):
+        """Versión async de ProductoViewSet.verificar_vigencia_conjunto"""
+        estrategia = estrategia or obtener_estrategia()
+        if estrategia != EXACTO or 'cursor' in self.vista.request.query_params:
+            return None, None
+        ultima, total = await ahuella(queryset)
+        return self.verificar_vigencia(Validadores.de_conjunto(ultima, total)), total
+
+    def verificar_vigencia_pagina(self, filas, paginacion):
+        """Igual que ProductoViewSet.verificar_vigencia_pagina"""
+        return self.vista.verificar_vigencia_pagina(filas, paginacion)
+
+    async def paginar(self, queryset, total_filas, estrategia=None):
+        """Versión async de ProductoViewSet.paginar"""
+        vista = self.vista
+        params = vista.request.query_params
+
+        if 'cursor' in params:
+            paginador = PaginadorCursor(
+                vista.get_valores(queryset), vista.get_orden(), vista.get_tamano_pagina()
+            )
+            return await paginador.apagina(params.get('cursor'))
+
+        if total_filas is not None:
+            total, total_exacto = total_filas, True
+        else:
+            total, total_exacto = await acontar(queryset, estrategia or obtener_estrategia())
+
+        filas, paginacion = vista.pagina_numerada(queryset, total, total_exacto)
+        return [fila async for fila in filas], paginacion
+
+
+class ListadoAsync(LecturaAsync):
+    """GET /productos/ (ProductoViewSet.list)"""
+
+    accion = 'list'
+
+    @respuesta_en_cache
+    async def responder(self, request, *args, **kwargs):
+        queryset = self.vista.get_queryset()
+        estrategia = obtener_estrategia(request.query_params.get('conteo'))
+        no_modificada, total_filas = await self.verificar_vigencia_conjunto(queryset, estrategia)
+        if no_modificada is not None:
+            return no_modificada
+
+        try:
+            filas, paginacion = await self.paginar(queryset, total_filas, estrategia)
+        except CursorInvalido as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if total_filas is None:
+            no_modificada = self.verificar_vigencia_pagina(filas, paginacion)
+            if no_modificada is not None:
+                return no_modificada
+
+        return Response({
+            'productos': self.vista.get_valores_serializer().serializar(filas),
+            'paginacion': paginacion
+        })
+
+
+class DetalleAsync(LecturaAsync):
+    """GET /productos/{id}/ (ProductoViewSet.retrieve)"""
+
+    accion = 'retrieve'
+    detalle = True
+
+    async def responder(self, request, *args, **kwargs):
+        producto = await self.obtener_producto(kwargs)
+        no_modificada = self.verificar_vigencia(Validadores.de_producto(producto))
+        if no_modificada is not None:
+            return no_modificada
+
+        return Response(self.vista.get_serializer(producto).data)
+
+    async def obtener_producto(self, kwargs):
+        """Versión async de ProductoViewSet.get_object"""
+        vista = self.vista
+        pk = kwargs[vista.lookup_url_kwarg or vista.lookup_field]
+
+        async def cargar():
+            try:
+                return await vista.get_queryset().aget(**{vista.lookup_field: pk})
+            except Producto.DoesNotExist:
+                raise Http404('No Producto matches the given query.')
+            except (TypeError, ValueError, ValidationError):
+                raise Http404
+
+        if vista.usa_cache_objetos():
+            producto = await cache_objetos.aobtener_o_cargar(pk, cargar)
+        else:
+            producto = await cargar()
+        vista.check_object_permissions(vista.request, producto)
+        return producto
+
+
+class BusquedaAsync(LecturaAsync):
+    """GET /productos/buscar/ (ProductoViewSet.buscar)"""
+
+    accion = 'buscar'
+
+    async def responder(self, request, *args, **kwargs):
+        termino = request.query_params.get('q', '')
+        limite = int(request.query_params.get('limit', 20))
+
+        if not termino:
+            return Response(
+                {'error': 'Parámetro de búsqueda "q" es requerido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        vista = self.vista
+        ids = await obtener_backend().abuscar(termino, limite)
+        filas = vista.get_valores(Producto.objects.filter(pk__in=ids))
+        encontrados = {fila['id']: fila async for fila in filas}
+        productos = vista.get_valores_serializer().serializar(
+            encontrados[pk] for pk in ids if pk in encontrados
+        )
+
+        return Response({
+            'resultados': productos,
+            'total': len(productos),
+            'termino_busqueda': termino
+        })
+
+
+class FiltroAsync(LecturaAsync):
+    """Base de las acciones de filtro (ProductoViewSet._listar_filtrado)"""
+
+    async def listar_filtrado(self, request, queryset, encabezado, clave='productos'):
+        vista = self.vista
+        queryset = queryset.order_by(vista.get_orden())
+
+        if request.query_params.get('completo', '').lower() == 'true':
+            filas = iterar_por_lotes(
+                vista.get_valores(queryset), vista.get_orden(),
+                getattr(settings, 'PRODUCTOS_EXPORTACION_LOTE', 2000)
+            )
+            contenido = exportar_json(
+                map(vista.get_valores_serializer().convertir, filas), encabezado, clave
+            )
+            return StreamingHttpResponse(_en_hilo(contenido), content_type='application/json')
+
+        no_modificada, total_filas = await self.verificar_vigencia_conjunto(queryset)
+        if no_modificada is not None:
+            return no_modificada
+
+        try:
+            filas, paginacion = await self.paginar(queryset, total_filas)
+        except CursorInvalido as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if total_filas is None:
+            no_modificada = self.verificar_vigencia_pagina(filas, paginacion)
+            if no_modificada is not None:
+                return no_modificada
+
+        return Response({
+            **encabezado,
+            clave: vista.get_valores_serializer().serializar(filas),
+            'total': paginacion.get('total_productos'),
+            'paginacion': paginacion
+        })
+
+
+class PorCategoriaAsync(FiltroAsync):
+    """GET /productos/categoria/{categoria}/ (ProductoViewSet.por_categoria)"""
+
+    accion = 'por_categoria'
+
+    @respuesta_en_cache
+    async def responder(self, request, *args, categoria=None, **kwargs):
+        return await self.listar_filtrado(
+            request,
+            filtrar_texto(
+                Producto.objects.all(), 'categoria', categoria,
+                request.query_params.get('coincidencia')
+            ),
+            {'categoria': categoria}
+        )
+
+
+class PorMarcaAsync(FiltroAsync):
+    """GET /productos/marca/{marca}/ (ProductoViewSet.por_marca)"""
+
+    accion = 'por_marca'
+
+    @respuesta_en_cache
+    async def responder(self, request, *args, marca=None, **kwargs):
+        return await self.listar_filtrado(
+            request,
+            filtrar_texto(
+                Producto.objects.all(), 'marca', marca,
+                request.query_params.get('coincidencia')
+            ),
+            {'marca': marca}
+        )
+
+
+# Nombre de la ruta del router -> vista async que atiende sus GET
+VISTAS_ASYNC = {
+    'producto-list': ListadoAsync,
+    'producto-detail': DetalleAsync,
+    'producto-buscar': BusquedaAsync,
+    'producto-por-categoria': PorCategoriaAsync,
+    'producto-por-marca': PorMarcaAsync,
+}
+
+# Formatos que las vistas async saben responder (el resto va a la síncrona)
+FORMATOS_ASYNC = (None, 'json')
+
+
+def despachador(vista_async, vista_sincrona):
+    """
+    Vista que atiende GET/HEAD con la vista async y delega los demás
+    métodos (y los formatos distintos de JSON) a la vista síncrona.
+
+    Args:
+        vista_async: Subclase de LecturaAsync
+        vista_sincrona: Callback del router para la misma ruta
+
+    Returns:
+        Vista async
+    """
+    lectura = vista_async.as_view()
+    sincrona = sync_to_async(vista_sincrona)
+
+    async def vista(request, *args, **kwargs):
+        formato = kwargs.get('format', request.GET.get('format'))
+        if request.method in ('GET', 'HEAD') and formato in FORMATOS_ASYNC:
+            return await lectura(request, *args, **kwargs)
+        return await sincrona(request, *args, **kwargs)
+
+    # Atributos del ViewSet (acciones por método) para el esquema y las métricas
+    for atributo in ('cls', 'initkwargs', 'actions'):
+        setattr(vista, atributo, getattr(vista_sincrona, atributo))
+    return csrf_exempt(vista)
+
+
+def rutas_async(patrones):
+    """
+    Reemplaza en las rutas del router las vistas de VISTAS_ASYNC por su
+    despachador async.
+
+    Args:
+        patrones (list): URLPattern generados por el router
+
+    Returns:
+        list: Las mismas rutas, con las lecturas atendidas de forma async
+    """
+    resultado = []
+    for patron in patrones:
+        vista_async = VISTAS_ASYNC.get(patron.name)
+        if vista_async is not None:
+            patron = type(patron)(
+                patron.pattern, despachador(vista_async, patron.callback),
+                patron.default_args, patron.name
+            )
+        resultado.append(patron)
+    return resultado